@@ -1,171 +1,204 @@
-import os
-import hashlib
-import fnmatch
-from typing import List, Dict, Optional
+import time
+import threading
+from typing import Iterator, List, Optional, Union
 from .models import FileNode
+from .core.compare_engine import CompareEngine
+from .core.hash_cache import HashCache
+from .core.compare_policy import make_policy
+from .core.columnar import ColumnarTree
+from .core.file_equality import DIGEST_ALGO, file_digest
+from .core.move_detection import MoveDetector
+from .core.content_index import ContentIndex
+from .core.dir_digest import DirDigestStore
+from .core.manifest import Manifest, build_manifest
+from .core.filesystem import FsPath, is_remote, open_root
+
+# A compare root: a local path, a remote URL (see core.filesystem), a remote FsPath or a Manifest
+Root = Union[str, FsPath, Manifest]
+
+
+class CompareCancelled(Exception):
+    pass
+
+
+def _until_cancelled(walk, cancelled: Optional[threading.Event]):
+    """The walk's items until `cancelled` is set; then the walk is closed (stopping its workers) and CompareCancelled raised."""
+    if cancelled is None:
+        yield from walk
+        return
+    try:
+        for item in walk:
+            if cancelled.is_set():
+                raise CompareCancelled()
+            yield item
+    finally:
+        walk.close()
 
 
 def get_file_hash(filepath: str, block_size=65536) -> str:
-    hasher = hashlib.md5()
+    """MD5 hex digest of the file ("" if unreadable)."""
+    return file_digest(filepath, "md5", block_size)
+
+def _cached_hash(hash_cache: Optional[HashCache]):
+    if hash_cache is None:
+        return None
+    return lambda path, algo=DIGEST_ALGO: hash_cache.hash_file(path, lambda p: file_digest(p, algo), algo=algo)
+
+def _open_roots(left_root: Root, right_root: Root):
+    """Remote URLs opened as FsPaths; everything else unchanged."""
+    return tuple(open_root(root) if isinstance(root, str) else root for root in (left_root, right_root))
+
+def _on_disk(left_root: Root, right_root: Root) -> bool:
+    """Both roots are local folders (moves and the content index read files of both)."""
+    return isinstance(left_root, str) and isinstance(right_root, str)
+
+def _make_engine(workers: int, hash_cache: Optional[HashCache], compare_mode: str, symlinks: str = "follow",
+                 content_index: Optional[ContentIndex] = None, collapse_same: bool = False) -> CompareEngine:
+    # Directory digests need content digests, i.e. a full compare with the hash cache
+    digest_store = None
+    if compare_mode == "full" and hash_cache is not None:
+        digest_store = DirDigestStore(hash_cache)
+    hash_file = _cached_hash(hash_cache)
+    return CompareEngine(make_policy(compare_mode, hash_file), workers=workers, symlinks=symlinks, content_index=content_index,
+                         digest_store=digest_store, collapse_same=collapse_same, hash_file=hash_file)
+
+def _move_detector(left_root: str, right_root: str, workers: int, hash_cache: Optional[HashCache]) -> MoveDetector:
+    return MoveDetector(left_root, right_root, _cached_hash(hash_cache), workers)
+
+def compare_folders(left_root: Root, right_root: Root, exclude_files: List[str] = [], exclude_folders: List[str] = [], workers: int = 1, hash_cache: Optional[HashCache] = None, compare_mode: str = "full", rel_path: str = "", max_depth: Optional[int] = None, ignore_file_names: List[str] = [], symlinks: str = "follow", detect_moves: bool = False, content_index: Optional[ContentIndex] = None, collapse_same: bool = False, cancelled: Optional[threading.Event] = None) -> FileNode:
+    """
+    Compares two folder trees. `workers` > 1 spreads listing, stat and hashing
+    over a thread pool; the resulting tree is identical either way.
+    With a `hash_cache`, files whose size/mtime/inode are unchanged since they
+    were last hashed are not read again; without one, same-size files are
+    byte-compared and reading stops at the first difference. A full compare
+    with a hash cache also records a Merkle digest per directory, and the file
+    digests of directories whose listing is unchanged are taken from there.
+    `compare_mode` picks how same-size files are checked: "quick" (size + mtime),
+    "sampled" (head/middle/tail blocks) or "full" (whole-content hash).
+    `rel_path` compares only that subdirectory; `max_depth` stops descending
+    after that many levels and marks the cut-off directories unexplored.
+    Exclude patterns use .gitignore syntax; files named in `ignore_file_names`
+    (e.g. ".gitignore") add their rules for the directory they are found in.
+    `symlinks` is "follow", "skip" or "link" (compare link targets).
+    `detect_moves` pairs one-sided files with equal content as moved/renamed;
+    it is skipped when `max_depth` limits the walk.
+    A `content_index` is filled with every file seen (see duplicate_report).
+    Either root may be a Manifest (see export_manifest) standing in for a tree
+    that is not at hand, or a remote URL such as sftp://host/path (see
+    core.filesystem); moves and the content index need both trees on local
+    disk and are skipped otherwise.
+    With `collapse_same`, directories below the start whose whole subtree is
+    the same come back unexplored, without children.
+    Setting `cancelled` stops the walk between directories with CompareCancelled.
+    """
+    left_root, right_root = _open_roots(left_root, right_root)
+    on_disk = _on_disk(left_root, right_root)
+    engine = _make_engine(workers, hash_cache, compare_mode, symlinks, content_index if on_disk else None, collapse_same)
     try:
-        with open(filepath, 'rb') as f:
-            buf = f.read(block_size)
-            while len(buf) > 0:
-                hasher.update(buf)
-                buf = f.read(block_size)
-        return hasher.hexdigest()
-    except Exception:
-        return ""
-
-def load_ignore_file(filepath: str) -> List[str]:
-    patterns = []
+        walk = _until_cancelled(engine.walk(left_root, right_root, exclude_files, exclude_folders, rel_path, max_depth, ignore_file_names), cancelled)
+        if not detect_moves or max_depth is not None or not on_disk:
+            return CompareEngine.build_tree(walk)
+        moves = _move_detector(left_root, right_root, workers, hash_cache)
+        root = CompareEngine.build_tree(moves.watch(walk))
+        moves.detect()
+        return root
+    finally:
+        if hash_cache is not None:
+            hash_cache.flush()
+
+def compare_folders_columnar(left_root: Root, right_root: Root, exclude_files: List[str] = [], exclude_folders: List[str] = [], workers: int = 1, hash_cache: Optional[HashCache] = None, compare_mode: str = "full", ignore_file_names: List[str] = [], symlinks: str = "follow", detect_moves: bool = False, cancelled: Optional[threading.Event] = None) -> ColumnarTree:
+    """Same compare as compare_folders, collected into parallel arrays instead of a FileNode tree."""
+    left_root, right_root = _open_roots(left_root, right_root)
+    engine = _make_engine(workers, hash_cache, compare_mode, symlinks)
+    try:
+        walk = _until_cancelled(engine.walk(left_root, right_root, exclude_files, exclude_folders, ignore_file_names=ignore_file_names), cancelled)
+        if not detect_moves or not _on_disk(left_root, right_root):
+            return ColumnarTree.from_walk(walk)
+        moves = _move_detector(left_root, right_root, workers, hash_cache)
+        tree = ColumnarTree.from_walk(moves.watch(walk))
+        tree.apply_moves(moves.detect())
+        return tree
+    finally:
+        if hash_cache is not None:
+            hash_cache.flush()
+
+def iter_compare_records(left_root: Root, right_root: Root, exclude_files: List[str] = [], exclude_folders: List[str] = [], workers: int = 1, hash_cache: Optional[HashCache] = None, compare_mode: str = "full", ignore_file_names: List[str] = [], symlinks: str = "follow", detect_moves: bool = False) -> Iterator[dict]:
+    """
+    Same compare as compare_folders, emitted as flat records while the walk runs.
+
+    Every node becomes one {"kind": "node", ...} record carrying its parent's path
+    (None for the root). A directory's children are emitted together once all of
+    them are settled. With `detect_moves`, one-sided files are streamed as
+    added/removed first; once the walk is done, a {"kind": "move", "from",
+    "to", "status"} record follows for each pair found. The stream ends with
+    a {"kind": "summary"} record.
+    """
+    started = time.perf_counter()
+    counts = {"same": 0, "modified": 0, "added": 0, "removed": 0, "moved": 0, "renamed": 0}
+    total = 0
+
+    def record(node: FileNode, parent: Optional[str]) -> dict:
+        nonlocal total
+        total += 1
+        counts[node.status] += 1
+        rec = {"kind": "node", "path": node.path, "name": node.name, "type": node.type, "status": node.status, "parent": parent}
+        if node.left_name is not None or node.right_name is not None:
+            rec["left_name"] = node.left_name
+            rec["right_name"] = node.right_name
+        return rec
+
+    left_root, right_root = _open_roots(left_root, right_root)
+    engine = _make_engine(workers, hash_cache, compare_mode, symlinks)
     try:
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    patterns.append(line)
-    except:
-        pass
-    return patterns
-
-def load_ignore_file(filepath: str) -> List[str]:
-    patterns = []
+        walk = engine.walk(left_root, right_root, exclude_files, exclude_folders, ignore_file_names=ignore_file_names)
+        moves = _move_detector(left_root, right_root, workers, hash_cache) if detect_moves and _on_disk(left_root, right_root) else None
+        first = True
+        for node, children in (moves.watch(walk) if moves else walk):
+            if first:
+                yield record(node, None)
+                first = False
+            for child in children or []:
+                yield record(child, node.path)
+        for left, right, status in (moves.detect() if moves else []):
+            counts["removed"] -= 1
+            counts["added"] -= 1
+            counts[status] += 2
+            yield {"kind": "move", "from": left, "to": right, "status": status}
+    finally:
+        if hash_cache is not None:
+            hash_cache.flush()
+
+    yield {
+        "kind": "summary",
+        "total": total,
+        "counts": counts,
+        "elapsed": round(time.perf_counter() - started, 3)
+    }
+
+def export_manifest(root: str, output_path: str, exclude_files: List[str] = [], exclude_folders: List[str] = [], workers: int = 1,
+                    hash_cache: Optional[HashCache] = None, ignore_file_names: List[str] = [], symlinks: str = "follow") -> dict:
+    """
+    Snapshots root into a manifest file: every entry left after the exclude
+    rules, with size, mtime and content digest. Returns a summary. root must
+    be a local folder (ValueError otherwise).
+    """
+    if is_remote(root):
+        raise ValueError("Manifests can only be exported from local folders")
+    started = time.perf_counter()
+    engine = CompareEngine(make_policy("quick"), workers=workers, symlinks=symlinks)
     try:
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    patterns.append(line)
-    except:
-        pass
-    return patterns
-
-def compare_folders(left_root: str, right_root: str, exclude_files: List[str] = [], exclude_folders: List[str] = []) -> FileNode:
-    return _compare_recursive(left_root, right_root, "", exclude_files, exclude_folders)
-
-def _compare_recursive(left_root: str, right_root: str, rel_path: str, exclude_files: List[str], exclude_folders: List[str]) -> FileNode:
-    left_abs = os.path.join(left_root, rel_path)
-
-    right_abs = os.path.join(right_root, rel_path)
-
-    left_exists = os.path.exists(left_abs)
-    right_exists = os.path.exists(right_abs)
-
-    name = os.path.basename(rel_path) if rel_path else os.path.basename(left_root)
-    
-    left_name = None
-    right_name = None
-    if not rel_path:
-        left_name = os.path.basename(left_root)
-        right_name = os.path.basename(right_root)
-
-    if not left_exists and not right_exists:
-        # Should not happen if driven by parent listing
-        return FileNode(name=name, path=rel_path, type="file", status="removed") # Fallback
-
-    is_dir = False
-    if left_exists:
-        is_dir = os.path.isdir(left_abs)
-    elif right_exists:
-        is_dir = os.path.isdir(right_abs)
-
-    node = FileNode(
-        name=name,
-        left_name=left_name,
-        right_name=right_name,
-        path=rel_path,
-        type="directory" if is_dir else "file",
-        status="same"
-    )
-
-    if not left_exists:
-        node.status = "added"
-    elif not right_exists:
-        node.status = "removed"
-    else:
-        # Both exist
-        if is_dir:
-            if not os.path.isdir(right_abs):
-                 # Type mismatch (Dir vs File)
-                 node.status = "modified"
-        else:
-            if os.path.isdir(right_abs):
-                 # Type mismatch
-                 node.status = "modified"
-            else:
-                 # Both files
-                 # Simple size check first
-                 if os.path.getsize(left_abs) != os.path.getsize(right_abs):
-                     node.status = "modified"
-                 else:
-                     # Hash check for exactness
-                     if get_file_hash(left_abs) != get_file_hash(right_abs):
-                         node.status = "modified"
-                     else:
-                         node.status = "same"
-    
-    if is_dir:
-        children = []
-        left_items = set()
-        if left_exists and os.path.isdir(left_abs):
-            left_items = set(os.listdir(left_abs))
-            
-        right_items = set()
-        if right_exists and os.path.isdir(right_abs):
-            right_items = set(os.listdir(right_abs))
-        
-        all_items = sorted(list(left_items | right_items))
-        
-        for item in all_items:
-            # Check exclusions
-            # Whether it's file or folder isn't fully known if it exists only on one side or both.
-            # But we can check if it matches folder patterns or file patterns.
-            # Usually we filter by name.
-            
-            # Simple heuristic: checks against both? 
-            # Or check actual type on disk?
-            item_left_abs = os.path.join(left_abs, item)
-            item_right_abs = os.path.join(right_abs, item)
-            
-            is_item_dir = False
-            if os.path.exists(item_left_abs):
-                is_item_dir = os.path.isdir(item_left_abs)
-            elif os.path.exists(item_right_abs):
-                is_item_dir = os.path.isdir(item_right_abs)
-            
-            # Apply exclusion
-            if is_item_dir:
-                exclude = False
-                for pattern in exclude_folders:
-                    if fnmatch.fnmatch(item, pattern):
-                        exclude = True
-                        break
-                if exclude: continue
-            else:
-                exclude = False
-                for pattern in exclude_files:
-                    if fnmatch.fnmatch(item, pattern):
-                        exclude = True
-                        break
-                if exclude: continue
-
-            child_rel = os.path.join(rel_path, item)
-            child_node = _compare_recursive(left_root, right_root, child_rel, exclude_files, exclude_folders)
-            children.append(child_node)
-        
-        node.children = children
-        
-        # Aggregate status for directories
-        # If any child is not "same", directory is "modified" (conceptually)
-        # But usually we just want to see the diffs inside.
-        # Let's mark it as same unless it itself is added/removed, 
-        # but UI might want to highlight if children have changes.
-        # Araxis marks folders as 'containing changes'.
-        # For now, keep simple status, UI can compute aggregations.
-    
-    return node
+        manifest = build_manifest(root, engine.scan(root, exclude_files, exclude_folders, ignore_file_names),
+                                  _cached_hash(hash_cache), workers, symlinks)
+    finally:
+        if hash_cache is not None:
+            hash_cache.flush()
+    size = manifest.save(output_path)
+    return {
+        "output_path": output_path,
+        "root": manifest.root,
+        "algo": manifest.algo,
+        "entries": len(manifest),
+        "bytes": size,
+        "elapsed": round(time.perf_counter() - started, 3)
+    }
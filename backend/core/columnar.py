@@ -0,0 +1,142 @@
+import sys
+import json
+import struct
+from array import array
+from typing import Iterator, List, Optional, Tuple
+from ..models import FileNode
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is used otherwise
+    orjson = None
+
+TYPE_CODES = ("file", "directory")
+STATUS_CODES = ("same", "modified", "added", "removed", "moved", "renamed")
+
+_TYPE_INDEX = {t: i for i, t in enumerate(TYPE_CODES)}
+_STATUS_INDEX = {s: i for i, s in enumerate(STATUS_CODES)}
+
+BINARY_MAGIC = b"JFMC"
+BINARY_VERSION = 1
+
+
+class ColumnarTree:
+    """
+    Compare result as parallel arrays, one slot per node in walk order.
+
+    names   - interned entry names (each distinct name stored once)
+    name    - index into names
+    parent  - index of the parent node (-1 for the root)
+    type    - index into TYPE_CODES
+    status  - index into STATUS_CODES
+    moves   - [left-only index, right-only index] of each moved/renamed pair
+
+    A node's path is the join of its ancestors' names; the root's path is "".
+    """
+    __slots__ = ("names", "_name_index", "name", "parent", "type", "status", "left_name", "right_name", "moves", "_one_sided")
+
+    def __init__(self):
+        self.names: List[str] = []
+        self._name_index = {}
+        self.name = array("I")
+        self.parent = array("i")
+        self.type = array("B")
+        self.status = array("B")
+        self.left_name: Optional[str] = None
+        self.right_name: Optional[str] = None
+        self.moves: List[Tuple[int, int]] = []
+        self._one_sided = {}  # path -> index of files on one side only, for apply_moves
+
+    def __len__(self):
+        return len(self.name)
+
+    def add(self, node: FileNode, parent: int) -> int:
+        idx = self._name_index.get(node.name)
+        if idx is None:
+            idx = len(self.names)
+            self._name_index[node.name] = idx
+            self.names.append(node.name)
+        self.name.append(idx)
+        self.parent.append(parent)
+        self.type.append(_TYPE_INDEX[node.type])
+        self.status.append(_STATUS_INDEX[node.status])
+        if node.type == "file" and node.status in ("added", "removed"):
+            self._one_sided[node.path] = len(self.name) - 1
+        return len(self.name) - 1
+
+    def apply_moves(self, pairs):
+        """Marks (left path, right path, status) pairs from move detection."""
+        for left, right, status in pairs:
+            source, target = self._one_sided[left], self._one_sided[right]
+            self.status[source] = self.status[target] = _STATUS_INDEX[status]
+            self.moves.append((source, target))
+
+    @classmethod
+    def from_walk(cls, walk: Iterator[Tuple[FileNode, Optional[List[FileNode]]]]) -> "ColumnarTree":
+        """Builds the arrays straight from CompareEngine.walk() without materializing the FileNode tree."""
+        tree = cls()
+        dir_index = {}  # directory path -> node index, dropped once its children are added
+        for node, children in walk:
+            if len(tree) == 0:
+                tree.left_name = node.left_name
+                tree.right_name = node.right_name
+                dir_index[node.path] = tree.add(node, -1)
+            parent = dir_index.pop(node.path)
+            for child in children or []:
+                idx = tree.add(child, parent)
+                if child.type == "directory":
+                    dir_index[child.path] = idx
+        return tree
+
+    def to_dict(self) -> dict:
+        return {
+            "format": "columnar",
+            "version": BINARY_VERSION,
+            "left_name": self.left_name,
+            "right_name": self.right_name,
+            "type_codes": list(TYPE_CODES),
+            "status_codes": list(STATUS_CODES),
+            "names": self.names,
+            "name": self.name.tolist(),
+            "parent": self.parent.tolist(),
+            "type": self.type.tolist(),
+            "status": self.status.tolist(),
+            "moves": [list(pair) for pair in self.moves],
+        }
+
+    def to_json(self) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(self.to_dict())
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def to_binary(self) -> bytes:
+        """
+        Binary frame, all integers little-endian:
+          magic "JFMC", u8 version, u32 node count, u32 name count,
+          u32 byte length + UTF-8 JSON header (root names, code tables, moves),
+          u32 byte length + NUL separated UTF-8 names,
+          u32 name[n], i32 parent[n], u8 type[n], u8 status[n]
+        """
+        header = json.dumps({
+            "left_name": self.left_name,
+            "right_name": self.right_name,
+            "type_codes": TYPE_CODES,
+            "status_codes": STATUS_CODES,
+            "moves": self.moves,
+        }).encode("utf-8")
+        names = "\0".join(self.names).encode("utf-8")
+
+        return b"".join([
+            BINARY_MAGIC,
+            struct.pack("<BII", BINARY_VERSION, len(self), len(self.names)),
+            struct.pack("<I", len(header)), header,
+            struct.pack("<I", len(names)), names,
+            _pack_int32(self.name, "I"), _pack_int32(self.parent, "i"),
+            self.type.tobytes(), self.status.tobytes(),
+        ])
+
+
+def _pack_int32(arr: array, code: str) -> bytes:
+    if arr.itemsize == 4 and sys.byteorder == "little":
+        return arr.tobytes()
+    return struct.pack(f"<{len(arr)}{code}", *arr)
@@ -0,0 +1,578 @@
+import os
+import stat
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from ..models import FileNode, DirectoryHint
+from .compare_policy import ComparePolicy, EntryInfo
+from .ignore_rules import IgnoreMatcher, load_ignore_file, parse_ignore_text
+from .content_index import ContentIndex
+from .dir_digest import DirDigestStore, DirState, KIND_DIR, KIND_FILE, KIND_LINK, link_digest, listing_signature
+from .file_equality import DIGEST_ALGO, file_digest
+from .filesystem import FileSystem, FsPath, connection_lost
+from .manifest import Manifest
+
+
+def default_compare_workers() -> int:
+    """Same default as ThreadPoolExecutor: the work here is almost entirely I/O bound."""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+# How symbolic links below the roots are treated:
+#   follow  compared as what they point to (dangling ones as links)
+#   skip    left out
+#   link    compared as links: equal if both are links with the same target
+SYMLINK_POLICIES = ("follow", "skip", "link")
+
+_DIR_INFO = EntryInfo(True, 0, 0)
+
+
+def _stat_entry(path: str) -> Optional[EntryInfo]:
+    """Returns (is_dir, size, mtime_ns) for an existing path, None if it does not exist (or is a broken link)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return EntryInfo(stat.S_ISDIR(st.st_mode), st.st_size, st.st_mtime_ns)
+
+
+def _scan_dir(path: str, info: Optional[EntryInfo], symlinks: str) -> Dict[str, Tuple[bool, os.DirEntry]]:
+    """
+    name -> (is_dir, DirEntry) for one directory. The types come from the
+    directory listing itself, so no entry is stat'ed here (except links
+    followed to find out what they point to).
+    """
+    if info is None or not info[0]:
+        return {}
+    found = {}
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_symlink():
+                        if symlinks == "skip":
+                            continue
+                        if symlinks == "link":
+                            found[entry.name] = (False, entry)
+                            continue
+                    found[entry.name] = (entry.is_dir(), entry)
+                except OSError:
+                    continue
+    except OSError:
+        return {}
+    return found
+
+
+def _entry_info(is_dir: bool, entry: os.DirEntry, symlinks: str) -> Optional[EntryInfo]:
+    """
+    Size and mtime of a file entry: one stat call, none on Windows or for
+    directories. Dangling links are compared as links even when following.
+    None if the entry vanished.
+    """
+    if is_dir:
+        return _DIR_INFO
+    try:
+        if not (symlinks == "link" and entry.is_symlink()):
+            st = entry.stat()
+            return EntryInfo(False, st.st_size, st.st_mtime_ns)
+    except OSError:
+        if not entry.is_symlink():
+            return None
+    try:
+        st = entry.stat(follow_symlinks=False)
+        return EntryInfo(False, st.st_size, st.st_mtime_ns, os.readlink(entry.path))
+    except OSError:
+        return None
+
+
+class CompareEngine:
+    """
+    Level-order folder compare that fans directory listing, stat calls and
+    content hashing out to a thread pool.
+
+    The walk is driven from the calling thread: each round scans every pending
+    directory pair in parallel, builds the child nodes, and queues the next level.
+    Same-size file pairs are handed to the ComparePolicy; content-reading policies
+    run in the pool while the next level is being listed.
+    With workers=1 everything runs inline, without a pool.
+
+    With a `digest_store`, same-size pairs are compared by content digest
+    instead, and each directory's Merkle digest is recorded once its subtree is
+    settled (see dir_digest). With `collapse_same`, directories whose whole
+    subtree is the same on both sides are turned into unexplored directories
+    without children once that is known.
+
+    Either root may be a Manifest instead of a path. That side is then never
+    touched on disk: its listings, sizes and mtimes come from the manifest, and
+    content-reading policies compare the live side's digests (`hash_file`)
+    with the recorded ones.
+
+    Either root may also be an FsPath on a remote filesystem (see filesystem).
+    Its listings come with sizes and mtimes, so nothing is stat'ed one by
+    one, and content-reading policies compare digests there too: in an
+    algorithm the server computes itself if both sides can produce it (a
+    local side can produce any), otherwise in DIGEST_ALGO over the downloaded
+    content. Directory records are not used on such a compare.
+    """
+
+    def __init__(self, policy: ComparePolicy, workers: int = 1, symlinks: str = "follow", content_index: Optional[ContentIndex] = None,
+                 digest_store: Optional[DirDigestStore] = None, collapse_same: bool = False, hash_file: Optional[Callable[..., str]] = None):
+        if symlinks not in SYMLINK_POLICIES:
+            raise ValueError(f"Unknown symlink policy: {symlinks}")
+        self.policy = policy
+        self.workers = max(1, workers or 1)
+        self.symlinks = symlinks
+        # Filled with every file seen, sizes only (see content_index)
+        self.content_index = content_index
+        self.digest_store = digest_store
+        self.collapse_same = collapse_same
+        # hash_file(path, algo=DIGEST_ALGO) -> hex digest of a local file
+        self.hash_file = hash_file or (lambda path, algo=DIGEST_ALGO: file_digest(path, algo))
+        # Per side, the Manifest standing in for that root, or the remote filesystem it is on (set by walk())
+        self.manifests: Tuple[Optional[Manifest], Optional[Manifest]] = (None, None)
+        self.filesystems: Tuple[Optional[FileSystem], Optional[FileSystem]] = (None, None)
+
+    def compare(self, left_root: Union[str, Manifest, FsPath], right_root: Union[str, Manifest, FsPath], exclude_files: List[str], exclude_folders: List[str], rel_path: str = "", max_depth: Optional[int] = None,
+                ignore_file_names: Sequence[str] = ()) -> FileNode:
+        return self.build_tree(self.walk(left_root, right_root, exclude_files, exclude_folders, rel_path, max_depth, ignore_file_names))
+
+    @staticmethod
+    def build_tree(walk: Iterator[Tuple[FileNode, Optional[List[FileNode]]]]) -> FileNode:
+        """Attaches the children of a walk() to their directories and returns the root."""
+        root = None
+        for node, children in walk:
+            if root is None:
+                root = node
+            node.children = children
+        return root
+
+    def walk(self, left_root: Union[str, Manifest, FsPath], right_root: Union[str, Manifest, FsPath], exclude_files: List[str], exclude_folders: List[str], rel_path: str = "", max_depth: Optional[int] = None,
+             ignore_file_names: Sequence[str] = ()) -> Iterator[Tuple[FileNode, Optional[List[FileNode]]]]:
+        """
+        Yields (directory node, children) as soon as every child of that directory
+        has a final status, root first. Children are not attached to their parent,
+        so a consumer that doesn't keep them holds at most one level of the tree.
+
+        `rel_path` starts the walk at that subdirectory of both roots (node paths
+        keep the prefix). With `max_depth`, directories that deep below the start
+        are listed once for a DirectoryHint but not descended into; they come out
+        with unexplored=True and no children.
+
+        Exclude patterns follow .gitignore rules (see ignore_rules). Files named
+        in `ignore_file_names` (e.g. ".gitignore") found in a directory on either
+        side add their rules for that directory's subtree (ignore files are not
+        read from a manifest). Excluded directories are dropped before they are
+        listed.
+        """
+        self.ignore_file_names = tuple(ignore_file_names)
+        matcher = IgnoreMatcher.from_excludes(exclude_files, exclude_folders)
+        roots = (left_root, right_root)
+        self.manifests = tuple(root if isinstance(root, Manifest) else None for root in roots)
+        self.filesystems = tuple(root.fs if isinstance(root, FsPath) else None for root in roots)
+        names = tuple(root.name if isinstance(root, (Manifest, FsPath)) else os.path.basename(root) for root in roots)
+        # A manifest side's paths are relative to its root, a remote side's are paths on its filesystem
+        left_root, right_root = ("" if isinstance(root, Manifest) else root.path if isinstance(root, FsPath) else root for root in roots)
+
+        with self._pool() as pool:
+            yield from self._walk(left_root, right_root, names, rel_path, max_depth, matcher, pool)
+
+    def scan(self, root: str, exclude_files: Sequence[str] = (), exclude_folders: Sequence[str] = (),
+             ignore_file_names: Sequence[str] = ()) -> Iterator[Tuple[str, EntryInfo]]:
+        """
+        (rel path, info) of every entry below one root, parents first, with the
+        listing, exclusion and symlink rules of walk(). Nothing is compared.
+        """
+        self.ignore_file_names = tuple(ignore_file_names)
+        self.manifests = (None, None)
+        self.filesystems = (None, None)
+        matcher = IgnoreMatcher.from_excludes(exclude_files, exclude_folders)
+        pending = [("", root, _stat_entry(root), matcher)]
+        with self._pool() as pool:
+            while pending:
+                scans = [self._submit(pool, self._list_pair, rel_dir, path, None, info, None, dir_matcher) for rel_dir, path, info, dir_matcher in pending]
+                next_pending = []
+                for (rel_dir, path, _, _), scan in zip(pending, scans):
+                    dir_matcher, entries = self._result(scan)
+                    for item, info, _ in entries:
+                        rel_path = os.path.join(rel_dir, item)
+                        yield rel_path, info
+                        if info.is_dir:
+                            next_pending.append((rel_path, os.path.join(path, item), info, dir_matcher))
+                pending = next_pending
+
+    @contextmanager
+    def _pool(self):
+        if self.workers == 1:
+            yield None
+            return
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="compare")
+        try:
+            yield pool
+        finally:
+            # Also reached when the consumer stops early (e.g. a client disconnect)
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _walk(self, left_root: str, right_root: str, names: Tuple[str, str], rel_path: str, max_depth: Optional[int], matcher: IgnoreMatcher,
+              pool: Optional[ThreadPoolExecutor]):
+        left_abs = os.path.join(left_root, rel_path) if rel_path else left_root
+        right_abs = os.path.join(right_root, rel_path) if rel_path else right_root
+        left_info = self._stat(0, left_abs)
+        right_info = self._stat(1, right_abs)
+
+        if rel_path:
+            root = self._make_node(os.path.basename(rel_path), rel_path, left_info, right_info)
+        else:
+            root = self._make_node(names[0], "", left_info, right_info, left_name=names[0], right_name=names[1])
+
+        if root.type != "directory":
+            if root.status == "same":
+                self._settle([(root, self._check_files(pool, left_abs, right_abs, left_info, right_info))])
+            yield root, None
+            return
+
+        # Manifest sides need their recorded digests, which come with the directory states
+        tracking = self.digest_store is not None or self.collapse_same or self.manifests != (None, None)
+        open_dirs: Dict[str, DirState] = {}  # node path -> directory pairs whose subtree is not settled yet
+
+        if rel_path:
+            matcher = self._ancestor_rules(left_root, right_root, rel_path, matcher)
+        # (node, left_abs, right_abs, left_info, right_info, matcher)
+        pending = [(root, left_abs, right_abs, left_info, right_info, matcher)]
+        scans = [self._submit(pool, self._scan_pair, job, tracking) for job in pending]
+        depth = 0
+
+        while pending:
+            depth += 1  # depth of the children built in this round
+            at_limit = max_depth is not None and depth >= max_depth
+            level = []
+            next_pending = []
+            frontier = []
+            file_checks = []  # (node, result) where result is a Future or a bool
+            indexed = []  # (node, left_info, right_info) for the content index
+            states = []
+            tracked = []  # (state, child, infos, file check) for the directory states
+
+            for (node, left_abs, right_abs, _, _, _), scan in zip(pending, scans):
+                children = []
+                dir_matcher, entries, sides = self._result(scan)
+                state = None
+                if sides is not None:
+                    state = DirState(node, open_dirs.get(os.path.dirname(node.path)) if node is not root else None, sides)
+                    open_dirs[node.path] = state
+                    states.append(state)
+                for item, item_left, item_right in entries:
+                    child_rel = os.path.join(node.path, item)
+                    child = self._make_node(item, child_rel, item_left, item_right)
+                    children.append(child)
+                    if self.content_index is not None:
+                        indexed.append((child, item_left, item_right))
+
+                    child_left_abs = os.path.join(left_abs, item)
+                    child_right_abs = os.path.join(right_abs, item)
+                    check = None
+                    if child.type == "directory":
+                        job = (child, child_left_abs, child_right_abs, item_left, item_right, dir_matcher)
+                        (frontier if at_limit else next_pending).append(job)
+                    elif child.status == "same":
+                        # Both sides are files of equal size; the policy decides
+                        known = (state.known(0, item), state.known(1, item)) if state is not None else (None, None)
+                        check = self._check_files(pool, child_left_abs, child_right_abs, item_left, item_right, known)
+                        file_checks.append((child, check))
+                    if state is not None:
+                        tracked.append((state, child, (item_left, item_right), check, at_limit))
+                level.append((node, children))
+
+            # Start listing the next level while this level's file checks finish
+            scans = [self._submit(pool, self._scan_pair, job, tracking) for job in next_pending]
+            frontier_scans = [self._submit(pool, self._scan_pair, job) for job in frontier]
+            self._settle(file_checks)
+            for child, item_left, item_right in indexed:
+                self.content_index.add(child.path, item_left, item_right, child.status == "same")
+            for entry in tracked:
+                self._track(*entry)
+
+            for job, scan in zip(frontier, frontier_scans):
+                job[0].unexplored = True
+                job[0].hint = self._directory_hint(self._result(scan)[1])
+
+            yield from level
+            # Only now, so that a collapsed directory's children are not attached again
+            for state in states:
+                state.settled = True
+                if not state.pending:
+                    self._finish(state, open_dirs)
+            pending = next_pending
+
+    def _track(self, state: DirState, child: FileNode, infos, check, at_limit: bool):
+        """Adds one settled child to its directory's state."""
+        if child.status != "same":
+            state.same = False
+        digests = self._result(check)
+        if not isinstance(digests, tuple):
+            digests = (None, None)
+        for side, info in enumerate(infos):
+            entries = state.entries[side]
+            if info is None or entries is None:
+                continue
+            if info.is_dir:
+                # Filled in when the subdirectory's subtree is settled
+                entries[child.name] = (KIND_DIR, None)
+            elif info.link_target is not None:
+                entries[child.name] = (KIND_LINK, link_digest(info.link_target))
+            else:
+                entries[child.name] = (KIND_FILE, digests[side] or state.known(side, child.name))
+        if child.type == "directory":
+            if at_limit:
+                state.same = False
+            else:
+                state.pending += 1
+
+    def _finish(self, state: DirState, open_dirs: Dict[str, DirState]):
+        """Records a settled subtree and hands its digests up to the parent, finishing it too if it was the last one pending."""
+        while state is not None:
+            del open_dirs[state.node.path]
+            digests = (state.digest(0), state.digest(1))
+            if self.digest_store is not None:
+                state.save(self.digest_store, digests)
+            parent = state.parent
+            node = state.node
+            if self.collapse_same and state.same and parent is not None and state.entries[0]:
+                count = len(state.entries[0])
+                node.children = None
+                node.unexplored = True
+                node.hint = DirectoryHint(left_entries=count, right_entries=count, size_mismatch=False)
+            if parent is None:
+                return
+            for side, digest in enumerate(digests):
+                if parent.entries[side] is not None and state.sides[side] is not None:
+                    parent.entries[side][node.name] = (KIND_DIR, digest)
+            parent.same = parent.same and state.same
+            parent.pending -= 1
+            if parent.pending or not parent.settled:
+                return
+            state = parent
+
+    def _directory_hint(self, entries) -> DirectoryHint:
+        left_entries = right_entries = 0
+        size_mismatch = False
+        for item, item_left, item_right in entries:
+            left_entries += item_left is not None
+            right_entries += item_right is not None
+            if item_left is None or item_right is None or item_left[0] != item_right[0]:
+                size_mismatch = True
+            elif not item_left[0] and item_left[1] != item_right[1]:
+                size_mismatch = True
+        return DirectoryHint(left_entries=left_entries, right_entries=right_entries, size_mismatch=size_mismatch)
+
+    def _settle(self, file_checks):
+        for node, result in file_checks:
+            value = self._result(result)
+            if isinstance(value, tuple):
+                # Content digests (digest_store)
+                value = bool(value[0]) and value[0] == value[1]
+            if not value:
+                node.status = "modified"
+
+    def _make_node(self, name: str, rel_path: str, left_info, right_info, left_name: str = None, right_name: str = None) -> FileNode:
+        if left_info is None and right_info is None:
+            # Should not happen if driven by parent listing
+            return FileNode(name=name, path=rel_path, type="file", status="removed")  # Fallback
+
+        is_dir = (left_info or right_info)[0]
+        node = FileNode(
+            name=name,
+            left_name=left_name,
+            right_name=right_name,
+            path=rel_path,
+            type="directory" if is_dir else "file",
+            status="same"
+        )
+
+        if left_info is None:
+            node.status = "added"
+        elif right_info is None:
+            node.status = "removed"
+        elif left_info[0] != right_info[0]:
+            # Type mismatch (Dir vs File)
+            node.status = "modified"
+        elif not is_dir and left_info[1] != right_info[1]:
+            node.status = "modified"
+        return node
+
+    def _scan_pair(self, job, tracking: bool = False) -> Tuple[IgnoreMatcher, List[tuple], Optional[tuple]]:
+        """_list_pair() for a walk job, and with `tracking` the sides for its DirState."""
+        node, left_abs, right_abs, left_info, right_info, matcher = job
+        matcher, entries = self._list_pair(node.path, left_abs, right_abs, left_info, right_info, matcher)
+        return matcher, entries, self._dir_sides(left_abs, right_abs, left_info, right_info, entries) if tracking else None
+
+    def _list_pair(self, rel_dir: str, left_abs: str, right_abs: str, left_info, right_info, matcher: IgnoreMatcher) -> Tuple[IgnoreMatcher, List[tuple]]:
+        """
+        Lists one directory pair with one scandir per side and leaves out
+        excluded entries before anything is stat'ed; only the remaining files
+        are. Returns the rules in effect below this directory (including its
+        own ignore files) with the (name, left info, right info) entries.
+        """
+        left_items = self._list_side(0, left_abs, left_info)
+        right_items = self._list_side(1, right_abs, right_info)
+        matcher = self._directory_rules(rel_dir, left_abs, right_abs, left_items, right_items, matcher)
+
+        entries = []
+        for item in sorted(left_items.keys() | right_items.keys()):
+            left_entry = left_items.get(item)
+            right_entry = right_items.get(item)
+            if matcher and matcher.is_excluded(os.path.join(rel_dir, item), (left_entry or right_entry)[0]):
+                continue
+            item_left = self._side_info(0, *left_entry) if left_entry else None
+            item_right = self._side_info(1, *right_entry) if right_entry else None
+            if item_left is None and item_right is None:
+                continue
+            entries.append((item, item_left, item_right))
+        return matcher, entries
+
+    def _stat(self, side: int, path: str) -> Optional[EntryInfo]:
+        manifest = self.manifests[side]
+        if manifest is not None:
+            return manifest.stat(path)
+        fs = self.filesystems[side]
+        return fs.stat(path) if fs is not None else _stat_entry(path)
+
+    def _list_side(self, side: int, path: str, info: Optional[EntryInfo]) -> Dict[str, tuple]:
+        """name -> (is_dir, DirEntry), or (is_dir, EntryInfo) on a manifest or remote side."""
+        manifest = self.manifests[side]
+        fs = self.filesystems[side]
+        if manifest is None and fs is None:
+            return _scan_dir(path, info, self.symlinks)
+        if info is None or not info.is_dir:
+            return {}
+        if manifest is not None:
+            return {name: (entry.is_dir, entry) for name, (entry, _) in manifest.listing(path).items()}
+        try:
+            return {name: (entry.is_dir, entry) for name, entry in fs.listdir(path, self.symlinks).items()}
+        except OSError as e:
+            # Unreadable like a local directory, unless the server went away
+            if connection_lost(e):
+                raise
+            return {}
+
+    def _side_info(self, side: int, is_dir: bool, entry) -> Optional[EntryInfo]:
+        if self.manifests[side] is not None or self.filesystems[side] is not None:
+            return entry
+        return _entry_info(is_dir, entry, self.symlinks)
+
+    def _dir_sides(self, left_abs: str, right_abs: str, left_info, right_info, entries):
+        """
+        Per side that is a directory: (path, listing signature, stored record if
+        it still matches), with the recorded digests on a manifest side; None otherwise.
+        """
+        sides = []
+        for side, (dir_abs, info) in enumerate(((left_abs, left_info), (right_abs, right_info))):
+            if info is None or not info.is_dir:
+                sides.append(None)
+                continue
+            manifest = self.manifests[side]
+            if manifest is not None:
+                files = {name: digest for name, (entry, digest) in manifest.listing(dir_abs).items() if not entry.is_dir and entry.link_target is None}
+                sides.append((None, None, (None, files)))
+                continue
+            if self.filesystems != (None, None):
+                # File digests may be in a server's algorithm here (see _pair_algo); records hold DIGEST_ALGO only
+                sides.append((None, None, None))
+                continue
+            signature = record = None
+            if self.digest_store is not None:
+                signature = listing_signature((e[0], e[1 + side]) for e in entries if e[1 + side] is not None)
+                record = self.digest_store.load(dir_abs, signature)
+            sides.append((dir_abs, signature, record))
+        return tuple(sides)
+
+    def _directory_rules(self, rel_dir: str, left_abs: str, right_abs: str, left_items, right_items, matcher: IgnoreMatcher) -> IgnoreMatcher:
+        """matcher extended with the ignore files present in this directory, left side first."""
+        for name in self.ignore_file_names:
+            for side, (base, items) in enumerate(((left_abs, left_items), (right_abs, right_items))):
+                if name in items and self.manifests[side] is None:
+                    matcher = matcher.extend(self._ignore_patterns(side, os.path.join(base, name)), rel_dir)
+        return matcher
+
+    def _ignore_patterns(self, side: int, path: str) -> List[str]:
+        fs = self.filesystems[side]
+        if fs is None:
+            return load_ignore_file(path)
+        try:
+            return parse_ignore_text(fs.read_bytes(path).decode("utf-8", "replace"))
+        except OSError:
+            return []
+
+    def _is_file(self, side: int, path: str) -> bool:
+        if self.manifests[side] is not None:
+            return False
+        fs = self.filesystems[side]
+        return fs.isfile(path) if fs is not None else os.path.isfile(path)
+
+    def _ancestor_rules(self, left_root: str, right_root: str, rel_path: str, matcher: IgnoreMatcher) -> IgnoreMatcher:
+        """Ignore files of the directories above rel_path, for walks that start below the root."""
+        if not self.ignore_file_names:
+            return matcher
+        parts = rel_path.split(os.sep)
+        for depth in range(len(parts)):
+            rel_dir = os.path.join(*parts[:depth]) if depth else ""
+            left_dir = os.path.join(left_root, rel_dir)
+            right_dir = os.path.join(right_root, rel_dir)
+            present = set(self.ignore_file_names)
+            matcher = self._directory_rules(
+                rel_dir, left_dir, right_dir,
+                {n for n in present if self._is_file(0, os.path.join(left_dir, n))},
+                {n for n in present if self._is_file(1, os.path.join(right_dir, n))},
+                matcher
+            )
+        return matcher
+
+    def _check_files(self, pool, left_abs: str, right_abs: str, left_info: EntryInfo, right_info: EntryInfo, known=(None, None)):
+        """
+        A bool, a (left, right) digest pair (digest_store, or a content check
+        against a manifest or a remote side), or a Future of either.
+        """
+        if left_info.link_target is not None or right_info.link_target is not None:
+            return left_info.link_target == right_info.link_target
+        if self.digest_store is not None or (self.policy.needs_io and (self.manifests != (None, None) or self.filesystems != (None, None))):
+            if known[0] is not None and known[1] is not None:
+                return known
+            return self._submit(pool, self._hash_pair, left_abs, right_abs, *known)
+        if not self.policy.needs_io:
+            return self.policy.files_equal(left_abs, right_abs, left_info, right_info)
+        return self._submit(pool, self.policy.files_equal, left_abs, right_abs, left_info, right_info)
+
+    def _hash_pair(self, left_abs: str, right_abs: str, left_digest: Optional[str], right_digest: Optional[str]) -> Tuple[str, str]:
+        """Content digests of a file pair; digests already known (recorded, or from a manifest) are not computed again."""
+        algo = self._pair_algo(left_abs, right_abs)
+        return (
+            self._digest(0, left_abs, algo) if left_digest is None else left_digest,
+            self._digest(1, right_abs, algo) if right_digest is None else right_digest
+        )
+
+    def _pair_algo(self, left_abs: str, right_abs: str) -> str:
+        """
+        DIGEST_ALGO, unless a remote side's server computes an algorithm the
+        other side can produce too; then the first such one.
+        """
+        if self.filesystems == (None, None) or self.manifests != (None, None):
+            return DIGEST_ALGO
+        # Per side, the algorithms on offer; None for a local side, which can hash with any
+        offers = [fs.remote_algos(path) if fs is not None else None for fs, path in zip(self.filesystems, (left_abs, right_abs))]
+        for algo in (offers[0] if offers[0] is not None else offers[1]):
+            if all(offer is None or algo in offer for offer in offers):
+                return algo
+        return DIGEST_ALGO
+
+    def _digest(self, side: int, path: str, algo: str) -> str:
+        fs = self.filesystems[side]
+        return fs.digest(path, algo) if fs is not None else self.hash_file(path, algo)
+
+    @staticmethod
+    def _submit(pool, fn, *args):
+        if pool is None:
+            return fn(*args)
+        return pool.submit(fn, *args)
+
+    @staticmethod
+    def _result(value):
+        return value.result() if isinstance(value, Future) else value
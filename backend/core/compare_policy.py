@@ -0,0 +1,100 @@
+import hashlib
+from typing import Callable, NamedTuple, Optional
+from .file_equality import files_equal
+
+
+class EntryInfo(NamedTuple):
+    """Entry info as produced by the compare engine. Directories below the roots carry size and mtime 0."""
+    is_dir: bool
+    size: int
+    mtime_ns: int
+    # Set for symlinks when they are compared as links (symlinks="link")
+    link_target: Optional[str] = None
+
+
+SAMPLE_BLOCK_SIZE = 65536
+# Coarsest common timestamp resolution (FAT); copies onto such volumes round mtimes
+QUICK_MTIME_TOLERANCE_NS = 2_000_000_000
+
+
+class ComparePolicy:
+    """
+    Decides whether two same-size regular files are equal.
+
+    `needs_io` tells the engine whether files_equal() touches file content;
+    policies that don't are evaluated inline instead of on the worker pool.
+    """
+    name = ""
+    needs_io = True
+
+    def files_equal(self, left_abs: str, right_abs: str, left_info: EntryInfo, right_info: EntryInfo) -> bool:
+        raise NotImplementedError
+
+
+class QuickPolicy(ComparePolicy):
+    """Size + mtime only. Never opens a file."""
+    name = "quick"
+    needs_io = False
+
+    def __init__(self, mtime_tolerance_ns: int = QUICK_MTIME_TOLERANCE_NS):
+        self.mtime_tolerance_ns = mtime_tolerance_ns
+
+    def files_equal(self, left_abs, right_abs, left_info, right_info) -> bool:
+        return abs(left_info[2] - right_info[2]) <= self.mtime_tolerance_ns
+
+
+class SampledPolicy(ComparePolicy):
+    """Size + digests of the head, middle and tail blocks. Small files are compared whole."""
+    name = "sampled"
+
+    def __init__(self, block_size: int = SAMPLE_BLOCK_SIZE):
+        self.block_size = block_size
+
+    def sample_digest(self, path: str, size: int) -> str:
+        hasher = hashlib.md5()
+        try:
+            with open(path, 'rb') as f:
+                if size <= self.block_size * 3:
+                    hasher.update(f.read())
+                else:
+                    for offset in (0, (size - self.block_size) // 2, size - self.block_size):
+                        f.seek(offset)
+                        hasher.update(f.read(self.block_size))
+            return hasher.hexdigest()
+        except OSError:
+            return ""
+
+    def files_equal(self, left_abs, right_abs, left_info, right_info) -> bool:
+        left_digest = self.sample_digest(left_abs, left_info[1])
+        return bool(left_digest) and left_digest == self.sample_digest(right_abs, right_info[1])
+
+
+class FullPolicy(ComparePolicy):
+    """
+    Whole-content check. With a hash_file (i.e. a hash cache is configured) both
+    sides are compared by digest, so unchanged files are never read again;
+    otherwise both files are streamed side by side until the first difference.
+    """
+    name = "full"
+
+    def __init__(self, hash_file: Optional[Callable[[str], str]] = None):
+        self.hash_file = hash_file
+
+    def files_equal(self, left_abs, right_abs, left_info, right_info) -> bool:
+        if self.hash_file is None:
+            return files_equal(left_abs, right_abs)
+        left_digest = self.hash_file(left_abs)
+        return bool(left_digest) and left_digest == self.hash_file(right_abs)
+
+
+COMPARE_MODES = ("quick", "sampled", "full")
+
+
+def make_policy(mode: str, hash_file: Optional[Callable[[str], str]] = None) -> ComparePolicy:
+    if mode == "quick":
+        return QuickPolicy()
+    if mode == "sampled":
+        return SampledPolicy()
+    if mode == "full":
+        return FullPolicy(hash_file)
+    raise ValueError(f"Unknown compare mode: {mode}")
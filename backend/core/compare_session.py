@@ -0,0 +1,64 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from ..models import FileNode
+
+DEFAULT_MAX_SESSIONS = 16
+
+
+class CompareSession:
+    """Parameters of one compare plus the subtrees already computed for it, keyed by relative path."""
+
+    def __init__(self, left_root: str, right_root: str, exclude_files: List[str], exclude_folders: List[str], compare_mode: str,
+                 ignore_file_names: List[str] = (), symlinks: str = "follow"):
+        self.id = uuid.uuid4().hex
+        self.left_root = left_root
+        self.right_root = right_root
+        self.exclude_files = list(exclude_files)
+        self.exclude_folders = list(exclude_folders)
+        self.compare_mode = compare_mode
+        self.ignore_file_names = list(ignore_file_names)
+        self.symlinks = symlinks
+        # Files of the initial compare when it was run with build_index (see content_index)
+        self.content_index = None
+        self.subtrees: Dict[str, FileNode] = {}
+        self.created = time.time()
+        self.lock = threading.Lock()
+
+    def close(self):
+        """Releases background resources; called when the session is dropped from the store."""
+        pass
+
+
+class CompareSessionStore:
+    """Keeps the most recently used sessions; the oldest is dropped beyond max_sessions."""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, CompareSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session: CompareSession) -> CompareSession:
+        with self._lock:
+            self._sessions[session.id] = session
+            evicted = []
+            while len(self._sessions) > self.max_sessions:
+                evicted.append(self._sessions.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return session
+
+    def get(self, session_id: str) -> Optional[CompareSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id: str):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
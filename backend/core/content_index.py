@@ -0,0 +1,171 @@
+"""
+Content index of a compare: every file of both sides with its size, filled
+in by the compare walk, for duplicate reports without a second scan.
+
+Digests are computed on demand and only where sizes collide. A file pair at
+the same path that the compare found equal counts as one candidate and only
+its left file is hashed, so sizes held by a single unchanged pair are never
+hashed at all.
+"""
+import os
+import threading
+from array import array
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from .compare_policy import EntryInfo
+from .file_equality import DIGEST_ALGO, file_digest
+
+DEFAULT_REPORT_GROUPS = 100
+SIDES = ("left", "right")
+
+
+class ContentIndex:
+    """
+    Parallel arrays, one slot per file:
+      dir    index into dirs (interned parent paths)
+      name   index into names (interned entry names)
+      side   0 = left, 1 = right
+      size   file size
+      twin   for the right file of an equal same-path pair, the slot of its left file; else -1
+    """
+    __slots__ = ("dirs", "names", "_dir_index", "_name_index", "dir", "name", "side", "size", "twin", "_digests", "_lock")
+
+    def __init__(self):
+        self.dirs: List[str] = []
+        self.names: List[str] = []
+        self._dir_index: Dict[str, int] = {}
+        self._name_index: Dict[str, int] = {}
+        self.dir = array("I")
+        self.name = array("I")
+        self.side = array("B")
+        self.size = array("Q")
+        self.twin = array("i")
+        self._digests: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.size)
+
+    def add(self, rel_path: str, left_info: Optional[EntryInfo], right_info: Optional[EntryInfo], same: bool):
+        """Records the regular files of one compared entry; same means the compare found both sides equal."""
+        left_slot = -1
+        if _is_file(left_info):
+            left_slot = self._append(rel_path, 0, left_info.size, -1)
+        if _is_file(right_info):
+            self._append(rel_path, 1, right_info.size, left_slot if same and left_slot >= 0 else -1)
+
+    def _append(self, rel_path: str, side: int, size: int, twin: int) -> int:
+        parent, name = os.path.split(rel_path)
+        self.dir.append(_intern(self.dirs, self._dir_index, parent))
+        self.name.append(_intern(self.names, self._name_index, name))
+        self.side.append(side)
+        self.size.append(size)
+        self.twin.append(twin)
+        return len(self.size) - 1
+
+    def path(self, slot: int) -> str:
+        return os.path.join(self.dirs[self.dir[slot]], self.names[self.name[slot]])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.dir, self.name, self.side, self.size, self.twin))
+
+    def duplicate_report(self, left_root: str, right_root: str, hash_file: Optional[Callable[[str], str]] = None,
+                         min_size: int = 1, limit: int = DEFAULT_REPORT_GROUPS, workers: int = 1) -> dict:
+        """
+        Groups identical files and sums up:
+          groups        contents with more than one copy on a side, most wasted bytes first
+          wasted_bytes  per side, the bytes of every copy beyond the first
+          overlap       contents present on both sides, and their bytes
+        Files smaller than min_size are left out.
+        """
+        hash_file = hash_file or (lambda path: file_digest(path, DIGEST_ALGO))
+        by_size: Dict[int, List[int]] = defaultdict(list)
+        for slot in range(len(self.size)):
+            if self.size[slot] >= min_size and self.twin[slot] < 0:
+                by_size[self.size[slot]].append(slot)
+
+        # Slots whose size is shared by another candidate need a digest
+        to_hash = [slot for slots in by_size.values() if len(slots) > 1 for slot in slots]
+        self._hash(to_hash, left_root, right_root, hash_file, workers)
+
+        members: Dict[int, List[int]] = defaultdict(list)
+        for slot in range(len(self.size)):
+            if self.twin[slot] >= 0 and self.size[slot] >= min_size:
+                members[self.twin[slot]].append(slot)
+
+        contents: Dict[tuple, List[int]] = defaultdict(list)
+        for size, slots in by_size.items():
+            for slot in slots:
+                digest = self._digests.get(slot) if len(slots) > 1 else None
+                # Only candidate of its size (or unreadable): a content of its own
+                key = (size, digest) if digest else (size, f"#{slot}")
+                contents[key].append(slot)
+                contents[key].extend(members.get(slot, ()))
+
+        wasted = [0, 0]
+        overlap_contents = overlap_bytes = 0
+        groups = []
+        for (size, digest), slots in contents.items():
+            per_side = ([], [])
+            for slot in slots:
+                per_side[self.side[slot]].append(self.path(slot))
+            group_wasted = sum(size * (len(paths) - 1) for paths in per_side if paths)
+            for side, paths in enumerate(per_side):
+                if paths:
+                    wasted[side] += size * (len(paths) - 1)
+            if per_side[0] and per_side[1]:
+                overlap_contents += 1
+                overlap_bytes += size
+            if group_wasted:
+                groups.append({
+                    "size": size,
+                    "digest": digest,
+                    "left": sorted(per_side[0]),
+                    "right": sorted(per_side[1]),
+                    "wasted_bytes": group_wasted,
+                })
+
+        groups.sort(key=lambda g: (-g["wasted_bytes"], g["left"][:1] or g["right"][:1]))
+        return {
+            "algo": DIGEST_ALGO,
+            "files": len(self.size),
+            "hashed": len(to_hash),
+            "group_count": len(groups),
+            "groups": groups[:max(0, limit)],
+            "wasted_bytes": {"left": wasted[0], "right": wasted[1], "total": wasted[0] + wasted[1]},
+            "overlap": {"contents": overlap_contents, "bytes": overlap_bytes},
+        }
+
+    def _hash(self, slots: List[int], left_root: str, right_root: str, hash_file, workers: int):
+        with self._lock:
+            missing = [slot for slot in slots if slot not in self._digests]
+        if not missing:
+            return
+        roots = (left_root, right_root)
+
+        def digest(slot: int) -> str:
+            try:
+                return hash_file(os.path.join(roots[self.side[slot]], self.path(slot)))
+            except OSError:
+                return ""
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="index") as pool:
+            results = list(pool.map(digest, missing))
+        with self._lock:
+            for slot, value in zip(missing, results):
+                if value:
+                    self._digests[slot] = value
+
+
+def _is_file(info: Optional[EntryInfo]) -> bool:
+    return info is not None and not info.is_dir and info.link_target is None
+
+
+def _intern(values: List[str], index: Dict[str, int], value: str) -> int:
+    idx = index.get(value)
+    if idx is None:
+        idx = index[value] = len(values)
+        values.append(value)
+    return idx
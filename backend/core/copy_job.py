@@ -0,0 +1,290 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_COPY_WORKERS = 4
+# Files at least this big are copied in the kernel (copy_file_range / sendfile) when available
+KERNEL_COPY_MIN_BYTES = 1024 * 1024
+COPY_CHUNK_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_FINISHED_JOBS = 20
+
+JOB_STATES = ("pending", "running", "done", "failed", "cancelled")
+
+
+class CopyCancelled(Exception):
+    pass
+
+
+def copy_file_data(src: str, dst: str, on_progress=None, cancelled: Optional[threading.Event] = None,
+                   on_open: Optional[Callable[[], None]] = None) -> int:
+    """
+    Copies src's bytes to dst in chunks, in the kernel where possible, then its
+    metadata like shutil.copy2. on_progress(n) is called after every chunk;
+    a set cancelled event stops the copy with CopyCancelled. on_open() is
+    called once dst has been opened (created or truncated).
+    """
+    copied = 0
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        if on_open is not None:
+            on_open()
+        size = os.fstat(fsrc.fileno()).st_size
+        kernel = size >= KERNEL_COPY_MIN_BYTES
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                raise CopyCancelled()
+            n = 0
+            if kernel:
+                try:
+                    n = _kernel_copy(fsrc.fileno(), fdst.fileno(), copied)
+                except OSError:
+                    # Cross-device, unsupported filesystem, ...: plain reads from here on
+                    kernel = False
+                    fsrc.seek(copied)
+                    fdst.seek(copied)
+                    continue
+            else:
+                chunk = fsrc.read(COPY_CHUNK_BYTES)
+                if chunk:
+                    fdst.write(chunk)
+                n = len(chunk)
+            if not n:
+                break
+            copied += n
+            if on_progress is not None:
+                on_progress(n)
+    shutil.copystat(src, dst)
+    return copied
+
+
+def _kernel_copy(src_fd: int, dst_fd: int, offset: int) -> int:
+    if hasattr(os, "copy_file_range"):
+        return os.copy_file_range(src_fd, dst_fd, COPY_CHUNK_BYTES, offset, offset)
+    if hasattr(os, "sendfile"):
+        return os.sendfile(dst_fd, src_fd, offset, COPY_CHUNK_BYTES)
+    raise OSError("no kernel copy available")
+
+
+class BatchCopyJob:
+    """
+    Copies a list of items (files or folders) on a background thread with a
+    bounded worker pool, keeping /batch-copy's all-or-nothing semantics: if
+    any item fails, or the job is cancelled, every destination it created or
+    replaced is removed again.
+
+    Folder items replace an existing destination folder, as before. Nothing
+    is removed or recorded for rollback before the item it belongs to is
+    being copied, so a failure never removes destinations the job did not touch.
+    """
+
+    def __init__(self, items: List[Tuple[str, str, bool]], workers: int = DEFAULT_COPY_WORKERS):
+        self.id = uuid.uuid4().hex
+        self.items = list(items)  # (source_path, dest_path, is_dir)
+        self.workers = max(1, workers)
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.total_files = 0
+        self.total_bytes = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self._created_paths: List[str] = []
+        self._item_locks: Dict[int, threading.Lock] = {}
+        self._item_dirs: Dict[int, List[str]] = {}
+        self._prepared = set()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BatchCopyJob":
+        self._thread = threading.Thread(target=self._run, name=f"BatchCopy-{self.id[:8]}", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.finished is not None
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("done", "failed", "cancelled")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "id": self.id,
+                "state": self.state,
+                "error": self.error,
+                "items": len(self.items),
+                "total_files": self.total_files,
+                "total_bytes": self.total_bytes,
+                "files_done": self.files_done,
+                "bytes_done": self.bytes_done,
+                "created": self.created,
+                "finished": self.finished,
+            }
+
+    def _run(self):
+        with self._lock:
+            self.state = "running"
+        try:
+            tasks, dirs = self._plan()
+            self._copy(tasks)
+            # Directory times last, deepest first, since creating files inside touches them
+            for src_dir, dst_dir in reversed(dirs):
+                shutil.copystat(src_dir, dst_dir)
+            state, error = "done", None
+        except CopyCancelled:
+            state, error = "cancelled", None
+        except Exception as e:
+            state, error = "failed", str(e)
+
+        if state != "done":
+            self._rollback()
+        with self._lock:
+            self.state = state
+            self.error = error
+            self.finished = time.time()
+
+    def _plan(self):
+        """
+        Checks every source and lists the files to copy with their sizes, as
+        (item index, source, destination, size); a folder item without files
+        gets one (index, None, None, 0) task so that it is still created.
+        Destinations are left alone until their item is copied.
+        """
+        for src, _, _ in self.items:
+            if not os.path.exists(src):
+                raise Exception(f"Source not found: {src}")
+
+        tasks: List[Tuple[int, Optional[str], Optional[str], int]] = []
+        dirs: List[Tuple[str, str]] = []
+        for index, (src, dst, is_dir) in enumerate(self.items):
+            if self._cancel.is_set():
+                raise CopyCancelled()
+            self._item_locks[index] = threading.Lock()
+            if not is_dir:
+                tasks.append((index, src, dst, os.path.getsize(src)))
+                continue
+            count = len(tasks)
+            # Like copytree(symlinks=False): links are followed and their targets copied
+            for root, dirnames, filenames in os.walk(src, followlinks=True):
+                rel = os.path.relpath(root, src)
+                target = dst if rel == "." else os.path.join(dst, rel)
+                dirs.append((root, target))
+                self._item_dirs.setdefault(index, []).append(target)
+                for name in filenames:
+                    path = os.path.join(root, name)
+                    tasks.append((index, path, os.path.join(target, name), os.path.getsize(path)))
+            if len(tasks) == count:
+                tasks.append((index, None, None, 0))
+
+        with self._lock:
+            self.total_files = sum(1 for _, src, _, _ in tasks if src is not None)
+            self.total_bytes = sum(size for _, _, _, size in tasks)
+        return tasks, dirs
+
+    def _prepare(self, index: int):
+        """
+        Readies item `index`'s destination the first time one of its files is
+        copied: its parent, and for folders the replaced (removed) destination
+        and its directory tree, which is recorded for rollback from then on.
+        """
+        with self._item_locks[index]:
+            if index in self._prepared:
+                return
+            src, dst, is_dir = self.items[index]
+            dest_parent = os.path.dirname(dst)
+            if dest_parent and not os.path.exists(dest_parent):
+                os.makedirs(dest_parent, exist_ok=True)
+            if is_dir:
+                with self._lock:
+                    self._created_paths.append(dst)
+                if os.path.exists(dst):
+                    shutil.rmtree(dst)
+                for target in self._item_dirs[index]:
+                    os.makedirs(target, exist_ok=True)
+            self._prepared.add(index)
+
+    def _copy(self, tasks: List[Tuple[int, Optional[str], Optional[str], int]]):
+        def progress(n: int):
+            with self._lock:
+                self.bytes_done += n
+
+        def opened(dst: str):
+            with self._lock:
+                self._created_paths.append(dst)
+
+        def copy_one(index: int, src: Optional[str], dst: Optional[str]):
+            if self._cancel.is_set():
+                raise CopyCancelled()
+            self._prepare(index)
+            if src is None:
+                return
+            # A file item's destination is only recorded once it is actually opened for writing
+            on_open = (lambda: opened(dst)) if not self.items[index][2] else None
+            copy_file_data(src, dst, progress, self._cancel, on_open)
+            with self._lock:
+                self.files_done += 1
+
+        if self.workers == 1:
+            for index, src, dst, _ in tasks:
+                copy_one(index, src, dst)
+            return
+
+        # Big files first so one large straggler doesn't run alone at the end
+        tasks = sorted(tasks, key=lambda t: -t[3])
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="copy") as pool:
+            futures = [pool.submit(copy_one, index, src, dst) for index, src, dst, _ in tasks]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = next((f for f in done if f.exception() is not None), None)
+            if failed is not None:
+                # Stop the other workers at their next chunk, then report the first error
+                self._cancel.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise failed.exception()
+
+    def _rollback(self):
+        print(f"Batch Copy Failed. Rolling back {len(self._created_paths)} items.")
+        for path in reversed(self._created_paths):
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                elif os.path.lexists(path):
+                    os.remove(path)
+            except Exception as rollback_error:
+                print(f"Rollback failed for {path}: {rollback_error}")
+
+
+class CopyJobStore:
+    """Running jobs plus the most recent finished ones, so their final progress can still be read."""
+
+    def __init__(self, max_finished: int = DEFAULT_MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, BatchCopyJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job: BatchCopyJob) -> BatchCopyJob:
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [job_id for job_id, j in self._jobs.items() if j.done]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchCopyJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[BatchCopyJob]:
+        with self._lock:
+            return list(self._jobs.values())
@@ -0,0 +1,141 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Rough per-object overhead of dicts / lists in a diff result, on top of their contents
+_CONTAINER_OVERHEAD = 64
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(size, mtime_ns) identifying the file's current content, or None if it can't be stat'ed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def diff_key(kind: str, left_path: str, right_path: str, *options: Hashable) -> tuple:
+    """Cache key for a diff of two files: both paths with their current signature plus the diff options."""
+    left_path = os.path.abspath(left_path)
+    right_path = os.path.abspath(right_path)
+    return (kind, left_path, file_signature(left_path), right_path, file_signature(right_path)) + options
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory held by a diff result (dicts, lists, strings) or an object with an nbytes attribute."""
+    total = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            total += sys.getsizeof(item)
+        elif isinstance(item, dict):
+            total += _CONTAINER_OVERHEAD + 8 * len(item)
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            total += _CONTAINER_OVERHEAD + 8 * len(item)
+            stack.extend(item)
+        else:
+            nbytes = getattr(item, "nbytes", None)
+            total += nbytes if isinstance(nbytes, int) else sys.getsizeof(item)
+    return total
+
+
+class _Pending:
+    """A computation in progress that other requests for the same key wait on."""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class DiffCache:
+    """
+    In-process LRU of computed diffs, bounded by an estimated memory budget.
+
+    Keys come from diff_key(), so an edited file simply stops matching its old
+    entries, which then age out. Concurrent requests for a key that is being
+    computed wait for that computation instead of starting their own.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[Any, int]]" = OrderedDict()
+        self._pending = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0  # requests that waited for another request's computation
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], Any], sizeof: Callable[[Any], int] = estimate_size):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = _Pending()
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = compute()
+            # Measured before taking the lock: walking a large result would hold up every other lookup
+            size = sizeof(pending.value)
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+                if pending.error is None:
+                    self._store(key, pending.value, size)
+            pending.done.set()
+        return pending.value
+
+    def _store(self, key: tuple, value: Any, size: int):
+        if size > self.max_bytes:
+            return  # Would evict everything else and still not fit
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.shared = 0
@@ -0,0 +1,246 @@
+"""
+Line diff engines producing SequenceMatcher-style opcodes.
+
+  myers     Myers O(ND) diff with the linear-space middle-snake bisection.
+  patience  Anchors on lines that are unique in both inputs, Myers between anchors.
+
+Both work on interned line ids and drop lines that occur on one side only
+before searching, so heavily rewritten files reduce to the lines they still share.
+"""
+import bisect
+from typing import Dict, List, Sequence, Tuple
+
+Opcode = Tuple[str, int, int, int, int]
+
+# Values accepted by DiffRequest.algorithm ("ndiff" is handled by difflib in differ.py)
+DIFF_ALGORITHMS = ("myers", "patience", "ndiff")
+
+# Bisection rounds before a segment is given up on and reported as one replace block
+DEFAULT_MAX_COST = 1024
+
+
+def get_opcodes(a: Sequence[str], b: Sequence[str], algorithm: str = "myers", max_cost: int = DEFAULT_MAX_COST) -> List[Opcode]:
+    """Opcodes ('equal' | 'replace' | 'delete' | 'insert', i1, i2, j1, j2) turning a into b."""
+    a_ids, b_ids = _intern(a, b)
+    if algorithm == "myers":
+        pairs = _myers_pairs(a_ids, b_ids, max_cost)
+    elif algorithm == "patience":
+        pairs = _patience_pairs(a_ids, b_ids, max_cost)
+    else:
+        raise ValueError(f"Unknown diff algorithm: {algorithm}")
+    return _pairs_to_opcodes(pairs, len(a), len(b))
+
+
+def _intern(a: Sequence[str], b: Sequence[str]) -> Tuple[List[int], List[int]]:
+    ids: Dict[str, int] = {}
+    a_ids = [ids.setdefault(line, len(ids)) for line in a]
+    b_ids = [ids.setdefault(line, len(ids)) for line in b]
+    return a_ids, b_ids
+
+
+def _myers_pairs(a: List[int], b: List[int], max_cost: int, a_off: int = 0, b_off: int = 0) -> List[Tuple[int, int]]:
+    """Matched (i, j) line pairs of a longest common subsequence, offset into the caller's coordinates."""
+    # Lines present on one side only can never match; search only the shared ones
+    b_set = set(b)
+    a_set = set(a)
+    a_idx = [i for i, x in enumerate(a) if x in b_set]
+    b_idx = [j for j, x in enumerate(b) if x in a_set]
+    fa = [a[i] for i in a_idx]
+    fb = [b[j] for j in b_idx]
+
+    pairs = []
+    stack = [(0, len(fa), 0, len(fb))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+
+        while alo < ahi and blo < bhi and fa[alo] == fb[blo]:
+            pairs.append((a_idx[alo] + a_off, b_idx[blo] + b_off))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and fa[ahi - 1] == fb[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            pairs.append((a_idx[ahi] + a_off, b_idx[bhi] + b_off))
+        if alo == ahi or blo == bhi:
+            continue
+
+        split = _bisect(fa, alo, ahi, fb, blo, bhi, max_cost)
+        if split is None:
+            continue  # Too expensive or nothing shared: leave the segment unmatched
+        x, y = split
+        if (x, y) == (alo, blo) or (x, y) == (ahi, bhi):
+            continue  # No progress possible; should not happen after prefix/suffix stripping
+        stack.append((x, ahi, y, bhi))
+        stack.append((alo, x, blo, y))
+
+    pairs.sort()
+    return pairs
+
+
+def _bisect(a: List[int], alo: int, ahi: int, b: List[int], blo: int, bhi: int, max_cost: int):
+    """
+    Finds the middle snake of a[alo:ahi] vs b[blo:bhi] by running the forward
+    and reverse Myers searches towards each other. Returns an absolute split
+    point (x, y) on an optimal path, or None if the edit distance exceeds
+    2 * max_cost or the segments share nothing.
+    """
+    if set(a[alo:ahi]).isdisjoint(b[blo:bhi]):
+        return None
+
+    n = ahi - alo
+    m = bhi - blo
+    max_d = min((n + m + 1) // 2, max_cost)
+    v_offset = max_d + 1
+    v_length = 2 * v_offset + 1
+    v1 = [-1] * v_length
+    v2 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2[v_offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    k1start = k1end = k2start = k2end = 0
+
+    for d in range(max_d):
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[alo + x1] == b[blo + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1end += 2
+            elif y1 > m:
+                k1start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                    if x1 >= n - v2[k2_offset]:
+                        return alo + x1, blo + y1
+
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[ahi - x2 - 1] == b[bhi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = v_offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return alo + x1, blo + y1
+    return None
+
+
+def _patience_pairs(a: List[int], b: List[int], max_cost: int) -> List[Tuple[int, int]]:
+    pairs = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            pairs.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            pairs.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchors = _unique_anchors(a, alo, ahi, b, blo, bhi)
+        if not anchors:
+            pairs.extend(_myers_pairs(a[alo:ahi], b[blo:bhi], max_cost, alo, blo))
+            continue
+
+        # Recurse into the gaps between consecutive anchors (and before the first / after the last)
+        prev_i, prev_j = alo, blo
+        for i, j in anchors:
+            pairs.append((i, j))
+            stack.append((prev_i, i, prev_j, j))
+            prev_i, prev_j = i + 1, j + 1
+        stack.append((prev_i, ahi, prev_j, bhi))
+
+    pairs.sort()
+    return pairs
+
+
+def _unique_anchors(a: List[int], alo: int, ahi: int, b: List[int], blo: int, bhi: int) -> List[Tuple[int, int]]:
+    """Longest increasing run (by b position) of lines that occur exactly once on each side."""
+    counts: Dict[int, List[int]] = {}
+    for i in range(alo, ahi):
+        entry = counts.setdefault(a[i], [0, 0, i, 0])
+        entry[0] += 1
+    for j in range(blo, bhi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[1] += 1
+            entry[3] = j
+    unique = sorted((e[2], e[3]) for e in counts.values() if e[0] == 1 and e[1] == 1)
+    if not unique:
+        return []
+
+    # Patience sorting: piles keyed by b index, back-pointers rebuild the LIS
+    tops: List[int] = []       # b index on top of each pile
+    top_items: List[int] = []  # index into `unique` on top of each pile
+    back = [-1] * len(unique)
+    for n, (_, j) in enumerate(unique):
+        pile = bisect.bisect_left(tops, j)
+        if pile > 0:
+            back[n] = top_items[pile - 1]
+        if pile == len(tops):
+            tops.append(j)
+            top_items.append(n)
+        else:
+            tops[pile] = j
+            top_items[pile] = n
+
+    result = []
+    n = top_items[-1]
+    while n != -1:
+        result.append(unique[n])
+        n = back[n]
+    result.reverse()
+    return result
+
+
+def _pairs_to_opcodes(pairs: List[Tuple[int, int]], len_a: int, len_b: int) -> List[Opcode]:
+    opcodes: List[Opcode] = []
+    i = j = 0
+    k = 0
+    total = len(pairs)
+    while k <= total:
+        ni, nj = pairs[k] if k < total else (len_a, len_b)
+        if i < ni and j < nj:
+            opcodes.append(("replace", i, ni, j, nj))
+        elif i < ni:
+            opcodes.append(("delete", i, ni, j, j))
+        elif j < nj:
+            opcodes.append(("insert", i, i, j, nj))
+        if k == total:
+            break
+
+        # Extend over consecutive matches
+        run = 1
+        while k + run < total and pairs[k + run] == (ni + run, nj + run):
+            run += 1
+        opcodes.append(("equal", ni, ni + run, nj, nj + run))
+        i, j = ni + run, nj + run
+        k += run
+    return opcodes
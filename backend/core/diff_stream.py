@@ -0,0 +1,202 @@
+"""
+Line diff for text files too large to split in memory.
+
+Both files are read line by line. Identical stretches are skipped in lockstep;
+where they diverge, up to STREAM_WINDOW_LINES lines of each side are diffed
+with Myers and the result is committed up to the last run of equal lines, so
+memory stays bounded by the window. Changes that need more lookahead than
+the window to resynchronize are reported as one larger replace block.
+"""
+from collections import deque
+from itertools import islice
+from typing import Iterator, List, Tuple
+from .diff_engine import get_opcodes
+from .differ import render_row_pair, format_unified_range, INTRALINE_MAX_LENGTH, INTRALINE_MAX_COST
+
+STREAM_WINDOW_LINES = 4096
+# Rows (side-by-side) and lines (unified) returned before the output is cut off
+DEFAULT_MAX_STREAM_ROWS = 100_000
+
+# (tag, i1, i2, j1, j2, left_lines, right_lines) with absolute 0-based line positions
+StreamOp = Tuple[str, int, int, int, int, List[str], List[str]]
+
+
+def iter_text_lines(path: str, encoding: str = "utf-8") -> Iterator[str]:
+    """Lines of path without their terminators (\\n, \\r\\n or \\r); nothing if it can't be read."""
+    try:
+        f = open(path, 'r', encoding=encoding, errors='replace', newline='')
+    except OSError:
+        return
+    with f:
+        for line in f:
+            if line.endswith('\r\n'):
+                yield line[:-2]
+            elif line.endswith(('\n', '\r')):
+                yield line[:-1]
+            else:
+                yield line
+
+
+def iter_segments(left: Iterator[str], right: Iterator[str], window: int = STREAM_WINDOW_LINES):
+    """Yields (tag, left_lines, right_lines) covering both inputs in order."""
+    a: List[str] = []
+    b: List[str] = []
+    a_done = b_done = False
+    while True:
+        if not a_done and len(a) < window:
+            need = window - len(a)
+            a.extend(islice(left, need))
+            a_done = len(a) < window
+        if not b_done and len(b) < window:
+            need = window - len(b)
+            b.extend(islice(right, need))
+            b_done = len(b) < window
+        if not a and not b:
+            return
+
+        # Identical stretches never reach the diff engine
+        k = 0
+        n = min(len(a), len(b))
+        while k < n and a[k] == b[k]:
+            k += 1
+        if k:
+            yield "equal", a[:k], b[:k]
+            a, b = a[k:], b[k:]
+            continue
+
+        ops = get_opcodes(a, b, "myers")
+        if a_done and b_done:
+            for tag, i1, i2, j1, j2 in ops:
+                yield tag, a[i1:i2], b[j1:j2]
+            return
+
+        # The tail after the last equal run may still resynchronize with lines not read yet
+        last_equal = max((n for n, op in enumerate(ops) if op[0] == "equal"), default=None)
+        if last_equal is None:
+            yield _change_tag(a, b), a, b
+            a, b = [], []
+            continue
+        for tag, i1, i2, j1, j2 in ops[:last_equal + 1]:
+            yield tag, a[i1:i2], b[j1:j2]
+        _, _, i2, _, j2 = ops[last_equal]
+        a, b = a[i2:], b[j2:]
+
+
+def _change_tag(a: List[str], b: List[str]) -> str:
+    if a and b:
+        return "replace"
+    return "delete" if a else "insert"
+
+
+def iter_stream_hunks(left: Iterator[str], right: Iterator[str], context: int = 3,
+                      window: int = STREAM_WINDOW_LINES) -> Iterator[List[StreamOp]]:
+    """
+    Groups the segments into hunks with up to context lines of surrounding
+    equal lines, like SequenceMatcher.get_grouped_opcodes. Only the first and
+    last context lines of an equal run are kept, however long it is.
+    """
+    i = j = 0
+    hunk: List[StreamOp] = []
+    eq_count = 0
+    eq_head: List[str] = []
+    eq_tail: deque = deque(maxlen=context)
+
+    def close_equal_run(at_end: bool):
+        nonlocal hunk
+        start_i, start_j = i - eq_count, j - eq_count
+        if hunk:
+            if at_end or eq_count > 2 * context:
+                lead = eq_head[:min(context, eq_count)]
+                hunk.append(("equal", start_i, start_i + len(lead), start_j, start_j + len(lead), lead, lead))
+                finished, hunk = hunk, []
+                if not at_end:
+                    trail = list(eq_tail)[-min(context, eq_count):] if context else []
+                    hunk = [("equal", i - len(trail), i, j - len(trail), j, trail, trail)] if trail else []
+                return finished
+            # Short run between two changes: all of it belongs to the hunk
+            lines = eq_head + list(eq_tail)[len(eq_tail) - (eq_count - len(eq_head)):] if eq_count > len(eq_head) else eq_head[:eq_count]
+            hunk.append(("equal", start_i, i, start_j, j, lines, lines))
+        elif eq_count and context and not at_end:
+            trail = list(eq_tail)[-min(context, eq_count):]
+            hunk = [("equal", i - len(trail), i, j - len(trail), j, trail, trail)]
+        return None
+
+    for tag, a_lines, b_lines in iter_segments(left, right, window):
+        if tag == "equal":
+            if len(eq_head) < context:
+                eq_head.extend(a_lines[:context - len(eq_head)])
+            eq_tail.extend(a_lines[-context:] if context else ())
+            eq_count += len(a_lines)
+            i += len(a_lines)
+            j += len(b_lines)
+            continue
+
+        if eq_count or not hunk:
+            finished = close_equal_run(at_end=False)
+            if finished:
+                yield finished
+        eq_count = 0
+        eq_head = []
+        eq_tail.clear()
+        hunk.append((tag, i, i + len(a_lines), j, j + len(b_lines), a_lines, b_lines))
+        i += len(a_lines)
+        j += len(b_lines)
+
+    if hunk:
+        finished = close_equal_run(at_end=True)
+        if finished:
+            yield finished
+
+
+def stream_diff_result(left_path: str, right_path: str, left_encoding: str = "utf-8", right_encoding: str = "utf-8",
+                       unified: bool = True, side_by_side: bool = True, context: int = 3,
+                       max_rows: int = DEFAULT_MAX_STREAM_ROWS,
+                       intraline_max_length: int = INTRALINE_MAX_LENGTH, intraline_max_cost: int = INTRALINE_MAX_COST) -> dict:
+    """
+    One streaming pass rendering the requested views, in the /diff result
+    format. Side-by-side rows cover only the hunks (changes plus context).
+    truncated is set when max_rows was reached.
+    """
+    diff: List[str] = []
+    left_rows: List[dict] = []
+    right_rows: List[dict] = []
+    truncated = False
+
+    hunks = iter_stream_hunks(iter_text_lines(left_path, left_encoding), iter_text_lines(right_path, right_encoding), context)
+    for hunk in hunks:
+        if len(diff) >= max_rows or len(left_rows) >= max_rows:
+            truncated = True
+            break
+        if unified:
+            if not diff:
+                diff.extend(('--- Left', '+++ Right'))
+            diff.append(f'@@ -{format_unified_range(hunk[0][1], hunk[-1][2])} +{format_unified_range(hunk[0][3], hunk[-1][4])} @@')
+            for tag, _, _, _, _, a_lines, b_lines in hunk:
+                if tag == 'equal':
+                    diff.extend(' ' + line for line in a_lines)
+                    continue
+                diff.extend('-' + line for line in a_lines)
+                diff.extend('+' + line for line in b_lines)
+        if side_by_side:
+            for l_row, r_row in _hunk_rows(hunk, intraline_max_length, intraline_max_cost):
+                left_rows.append(l_row)
+                right_rows.append(r_row)
+
+    return {"diff": diff, "left_rows": left_rows, "right_rows": right_rows, "streamed": True, "truncated": truncated}
+
+
+def _hunk_rows(hunk: List[StreamOp], intraline_max_length: int, intraline_max_cost: int):
+    for tag, i1, _, j1, _, a_lines, b_lines in hunk:
+        if tag == 'equal':
+            for k, text in enumerate(a_lines):
+                yield render_row_pair("same", i1 + k + 1, j1 + k + 1, text, text)
+            continue
+        common_len = min(len(a_lines), len(b_lines))
+        for k in range(common_len):
+            yield render_row_pair("modified", i1 + k + 1, j1 + k + 1, a_lines[k], b_lines[k],
+                                  intraline_max_length, intraline_max_cost)
+        for k in range(common_len, len(a_lines)):
+            yield render_row_pair("removed", i1 + k + 1, 0, a_lines[k], None)
+        for k in range(common_len, len(b_lines)):
+            yield render_row_pair("added", 0, j1 + k + 1, None, b_lines[k])
+
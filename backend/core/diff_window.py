@@ -0,0 +1,68 @@
+import sys
+from array import array
+from typing import List, Tuple
+from .differ import DiffDocument, iter_row_pairs, render_row_pair, INTRALINE_MAX_LENGTH, INTRALINE_MAX_COST
+
+ROW_TYPES = ("same", "modified", "removed", "added")
+_ROW_TYPE_INDEX = {t: i for i, t in enumerate(ROW_TYPES)}
+
+
+class DiffSkeleton:
+    """
+    Side-by-side diff of two files without the rendered rows, built from a DiffDocument.
+
+    Rows are kept as parallel arrays (type index, left line, right line; 0 for a
+    spacer) next to the split lines of both files. Row dicts, including the
+    intra-line highlighting of modified rows, are built only for the window a
+    client asks for. hunks holds [start, end) row ranges of consecutive changes.
+    """
+    __slots__ = ("left_lines", "right_lines", "kind", "left_no", "right_no", "hunks")
+
+    def __init__(self, doc: DiffDocument):
+        self.left_lines = doc.left_lines
+        self.right_lines = doc.right_lines
+        self.kind = array("B")
+        self.left_no = array("I")
+        self.right_no = array("I")
+        self.hunks: List[Tuple[int, int]] = []
+
+        hunk_start = -1
+        for row, (row_type, left_line, right_line) in enumerate(iter_row_pairs(doc)):
+            self.kind.append(_ROW_TYPE_INDEX[row_type])
+            self.left_no.append(left_line)
+            self.right_no.append(right_line)
+            if row_type == "same":
+                if hunk_start >= 0:
+                    self.hunks.append((hunk_start, row))
+                    hunk_start = -1
+            elif hunk_start < 0:
+                hunk_start = row
+        if hunk_start >= 0:
+            self.hunks.append((hunk_start, len(self.kind)))
+
+    def __len__(self):
+        return len(self.kind)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held, for the diff cache's budget."""
+        lines = sum(sys.getsizeof(line) for line in self.left_lines) + sum(sys.getsizeof(line) for line in self.right_lines)
+        rows = sum(a.itemsize * len(a) for a in (self.kind, self.left_no, self.right_no))
+        return lines + rows + 8 * (len(self.left_lines) + len(self.right_lines) + len(self.hunks))
+
+    def rows(self, offset: int, limit: int,
+             intraline_max_length: int = INTRALINE_MAX_LENGTH, intraline_max_cost: int = INTRALINE_MAX_COST):
+        """(left_rows, right_rows) for rows [offset, offset + limit), in the /diff side-by-side row format."""
+        left_rows = []
+        right_rows = []
+        for row in range(max(0, offset), min(len(self.kind), offset + limit)):
+            left_line, right_line = self.left_no[row], self.right_no[row]
+            l_row, r_row = render_row_pair(
+                ROW_TYPES[self.kind[row]], left_line, right_line,
+                self.left_lines[left_line - 1] if left_line else None,
+                self.right_lines[right_line - 1] if right_line else None,
+                intraline_max_length, intraline_max_cost
+            )
+            left_rows.append(l_row)
+            right_rows.append(r_row)
+        return left_rows, right_rows
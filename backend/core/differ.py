@@ -1,123 +1,258 @@
 
+import re
+import sys
 import difflib
 import os
-# Removed invalid import
+from difflib import SequenceMatcher
+from .diff_engine import get_opcodes
+from .file_type import sniff_file
+from .filesystem import is_remote, local_copy
 
-def get_file_content(path: str) -> str:
-    """Reads file content with error handling."""
+def get_file_content(path: str, encoding: str = None) -> str:
+    """Reads file content with error handling. The encoding is sniffed from a BOM unless given."""
+    if is_remote(path):
+        # Remote files (sftp:// or webdav:// URLs) are read from a local copy
+        try:
+            with local_copy(path) as local:
+                return get_file_content(local, encoding)
+        except (ValueError, OSError):
+            return ""
     if os.path.exists(path) and os.path.isfile(path):
-        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        with open(path, 'r', encoding=encoding or sniff_file(path).encoding, errors='replace') as f:
             return f.read()
     return ""
 
-def compute_line_diff(a, b):
-    """Returns (left_segments, right_segments) for word-level highlighting"""
-    from difflib import SequenceMatcher
-    sm = SequenceMatcher(None, a, b)
+# Intra-line highlighting limits: longer lines, or token pairs whose matching would
+# cost more than this (len(tokens_a) * len(tokens_b)), are highlighted as a whole line.
+INTRALINE_MAX_LENGTH = 4000
+INTRALINE_MAX_COST = 250_000
+
+_TOKEN_RE = re.compile(r"\w+|\s+|[^\w\s]")
+
+def compute_line_diff(a, b, max_length: int = INTRALINE_MAX_LENGTH, max_cost: int = INTRALINE_MAX_COST):
+    """
+    Returns (left_segments, right_segments, skipped) for word-level highlighting.
+    Lines are split into word / whitespace / punctuation tokens before matching.
+    skipped is True when the caps were hit and each side is one whole-line segment.
+    """
+    if len(a) > max_length or len(b) > max_length:
+        return [{"text": a, "type": "removed"}], [{"text": b, "type": "added"}], True
+
+    a_tokens = _TOKEN_RE.findall(a)
+    b_tokens = _TOKEN_RE.findall(b)
+    if len(a_tokens) * len(b_tokens) > max_cost:
+        return [{"text": a, "type": "removed"}], [{"text": b, "type": "added"}], True
+
+    sm = SequenceMatcher(None, a_tokens, b_tokens, autojunk=False)
     left_segs = []
     right_segs = []
     
     for tag, i1, i2, j1, j2 in sm.get_opcodes():
         if tag == 'equal':
-            seg_text = a[i1:i2]
+            seg_text = "".join(a_tokens[i1:i2])
             left_segs.append({"text": seg_text, "type": "same"})
             right_segs.append({"text": seg_text, "type": "same"})
         elif tag == 'replace':
-            left_segs.append({"text": a[i1:i2], "type": "removed"})
-            right_segs.append({"text": b[j1:j2], "type": "added"})
+            left_segs.append({"text": "".join(a_tokens[i1:i2]), "type": "removed"})
+            right_segs.append({"text": "".join(b_tokens[j1:j2]), "type": "added"})
         elif tag == 'delete':
-            left_segs.append({"text": a[i1:i2], "type": "removed"})
+            left_segs.append({"text": "".join(a_tokens[i1:i2]), "type": "removed"})
         elif tag == 'insert':
-            right_segs.append({"text": b[j1:j2], "type": "added"})
+            right_segs.append({"text": "".join(b_tokens[j1:j2]), "type": "added"})
             
-    return left_segs, right_segs
+    return left_segs, right_segs, False
 
-def generate_side_by_side_diff(left_path: str, right_path: str):
-    left_content = get_file_content(left_path)
-    right_content = get_file_content(right_path)
-    
-    left_lines = left_content.splitlines()
-    right_lines = right_content.splitlines()
-    
-    diff_gen = difflib.ndiff(left_lines, right_lines)
-    
-    left_rows = []
-    right_rows = []
-    
-    removes_buffer = []
-    adds_buffer = []
-    
-    def flush_buffers():
-        nonlocal removes_buffer, adds_buffer
-        common_len = min(len(removes_buffer), len(adds_buffer))
-        
+def compute_opcodes(left_lines, right_lines, algorithm: str = "myers"):
+    """
+    Line opcodes ('equal' | 'replace' | 'delete' | 'insert', i1, i2, j1, j2).
+    For "ndiff" they are rebuilt from difflib.ndiff's output, each run of changes
+    between two context lines becoming one opcode.
+    """
+    if algorithm != "ndiff":
+        return get_opcodes(left_lines, right_lines, algorithm)
+
+    opcodes = []
+    i = j = 0
+    change_i, change_j = 0, 0
+
+    def close_change():
+        if i > change_i and j > change_j:
+            opcodes.append(("replace", change_i, i, change_j, j))
+        elif i > change_i:
+            opcodes.append(("delete", change_i, i, change_j, j))
+        elif j > change_j:
+            opcodes.append(("insert", change_i, i, change_j, j))
+
+    for line in difflib.ndiff(left_lines, right_lines):
+        code = line[:2]
+        if code == "  ":
+            close_change()
+            if opcodes and opcodes[-1][0] == "equal":
+                _, ei1, _, ej1, _ = opcodes.pop()
+                opcodes.append(("equal", ei1, i + 1, ej1, j + 1))
+            else:
+                opcodes.append(("equal", i, i + 1, j, j + 1))
+            i += 1
+            j += 1
+            change_i, change_j = i, j
+        elif code == "- ":
+            i += 1
+        elif code == "+ ":
+            j += 1
+    close_change()
+    return opcodes
+
+class DiffDocument:
+    """
+    Both files read once plus one opcode list between their lines: the shared
+    input of every renderer (side-by-side rows, unified hunks, raw lines).
+    """
+    __slots__ = ("left_lines", "right_lines", "algorithm", "opcodes")
+
+    def __init__(self, left_lines, right_lines, algorithm: str = "myers"):
+        self.left_lines = left_lines
+        self.right_lines = right_lines
+        self.algorithm = algorithm
+        self.opcodes = compute_opcodes(left_lines, right_lines, algorithm)
+
+    @classmethod
+    def from_files(cls, left_path: str, right_path: str, algorithm: str = "myers") -> "DiffDocument":
+        return cls(get_file_content(left_path).splitlines(), get_file_content(right_path).splitlines(), algorithm)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held, for the diff cache's budget."""
+        lines = sum(sys.getsizeof(line) for line in self.left_lines) + sum(sys.getsizeof(line) for line in self.right_lines)
+        return lines + 8 * (len(self.left_lines) + len(self.right_lines)) + 100 * len(self.opcodes)
+
+def iter_raw_lines(doc: DiffDocument):
+    """Yields every line prefixed ndiff-style: "  " context, "- " removed, "+ " added."""
+    for tag, i1, i2, j1, j2 in doc.opcodes:
+        if tag == 'equal':
+            for text in doc.left_lines[i1:i2]:
+                yield "  " + text
+            continue
+        for text in doc.left_lines[i1:i2]:
+            yield "- " + text
+        for text in doc.right_lines[j1:j2]:
+            yield "+ " + text
+
+def iter_row_pairs(doc: DiffDocument):
+    """
+    Yields the side-by-side row skeleton as (type, left_line, right_line), with
+    1-based line numbers and 0 for a spacer. type is "same", "modified" (a removed
+    line paired with an added one), "removed" or "added".
+    """
+    for tag, i1, i2, j1, j2 in doc.opcodes:
+        if tag == 'equal':
+            for k in range(i2 - i1):
+                yield "same", i1 + k + 1, j1 + k + 1
+            continue
+        common_len = min(i2 - i1, j2 - j1)
         # 1. Aligned "Modified" lines
-        for i in range(common_len):
-            l_obj = removes_buffer[i]
-            r_obj = adds_buffer[i]
-            
-            l_text = l_obj["text"]
-            r_text = r_obj["text"]
-            
-            # Compute sub-diff
-            l_segs, r_segs = compute_line_diff(l_text, r_text)
-            
-            left_rows.append({"text": l_segs, "type": "modified", "line": l_obj["line"]})
-            right_rows.append({"text": r_segs, "type": "modified", "line": r_obj["line"]})
-            
+        for k in range(common_len):
+            yield "modified", i1 + k + 1, j1 + k + 1
         # 2. Remaining Removes (if any) -> Left only
-        for i in range(common_len, len(removes_buffer)):
-            l_obj = removes_buffer[i]
-            left_rows.append({"text": l_obj["text"], "type": "removed", "line": l_obj["line"]})
-            right_rows.append({"text": "", "type": "empty"}) # Spacer
-            
+        for i in range(i1 + common_len, i2):
+            yield "removed", i + 1, 0
         # 3. Remaining Adds (if any) -> Right only
-        for i in range(common_len, len(adds_buffer)):
-            left_rows.append({"text": "", "type": "empty"}) # Spacer
-            r_obj = adds_buffer[i]
-            right_rows.append({"text": r_obj["text"], "type": "added", "line": r_obj["line"]})
-            
-        removes_buffer = []
-        adds_buffer = []
+        for j in range(j1 + common_len, j2):
+            yield "added", 0, j + 1
 
-    # Line Counters (1-based)
-    left_n = 1
-    right_n = 1
+def render_row_pair(row_type, left_line, right_line, left_text, right_text,
+                    intraline_max_length: int = INTRALINE_MAX_LENGTH, intraline_max_cost: int = INTRALINE_MAX_COST):
+    """Builds the (left_row, right_row) dicts sent to the client for one skeleton row (texts are None for a spacer)."""
+    if row_type == "same":
+        return {"text": left_text, "type": "same", "line": left_line}, {"text": left_text, "type": "same", "line": right_line}
+    if row_type == "removed":
+        return {"text": left_text, "type": "removed", "line": left_line}, {"text": "", "type": "empty"} # Spacer
+    if row_type == "added":
+        return {"text": "", "type": "empty"}, {"text": right_text, "type": "added", "line": right_line}
 
-    for line in diff_gen:
-        code = line[:2]
-        text = line[2:]
-        
-        if code == "- ":
-            removes_buffer.append({"text": text, "line": left_n})
-            left_n += 1
-        
-        elif code == "+ ":
-            adds_buffer.append({"text": text, "line": right_n})
-            right_n += 1
-            
-        elif code == "  ":
-            # Context line, flush any pending changes
-            flush_buffers()
-            left_rows.append({"text": text, "type": "same", "line": left_n})
-            right_rows.append({"text": text, "type": "same", "line": right_n})
-            left_n += 1
-            right_n += 1
-    
-    # Final flush
-    flush_buffers()
-            
+    # Compute sub-diff
+    l_segs, r_segs, skipped = compute_line_diff(left_text, right_text, intraline_max_length, intraline_max_cost)
+    l_row = {"text": l_segs, "type": "modified", "line": left_line}
+    r_row = {"text": r_segs, "type": "modified", "line": right_line}
+    if skipped:
+        # Lets the UI show a "highlighting skipped" hint
+        l_row["highlight_skipped"] = True
+        r_row["highlight_skipped"] = True
+    return l_row, r_row
+
+def iter_side_by_side_rows(doc: DiffDocument, intraline_max_length: int = INTRALINE_MAX_LENGTH, intraline_max_cost: int = INTRALINE_MAX_COST):
+    """Yields (left_row, right_row) for every row of the side-by-side view."""
+    for row_type, left_line, right_line in iter_row_pairs(doc):
+        yield render_row_pair(row_type, left_line, right_line,
+                              doc.left_lines[left_line - 1] if left_line else None,
+                              doc.right_lines[right_line - 1] if right_line else None,
+                              intraline_max_length, intraline_max_cost)
+
+def iter_unified_lines(doc: DiffDocument, context: int = 3, fromfile: str = 'Left', tofile: str = 'Right'):
+    """Yields the lines of a unified diff (as difflib.unified_diff with lineterm='') built from doc's opcodes."""
+    first = True
+    for group in _group_opcodes(doc.opcodes, context):
+        if first:
+            first = False
+            yield f'--- {fromfile}'
+            yield f'+++ {tofile}'
+        i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
+        yield f'@@ -{format_unified_range(i1, i2)} +{format_unified_range(j1, j2)} @@'
+        for tag, a1, a2, b1, b2 in group:
+            if tag == 'equal':
+                for line in doc.left_lines[a1:a2]:
+                    yield ' ' + line
+                continue
+            for line in doc.left_lines[a1:a2]:
+                yield '-' + line
+            for line in doc.right_lines[b1:b2]:
+                yield '+' + line
+
+def _group_opcodes(opcodes, n: int = 3):
+    """Hunks of opcodes with up to n lines of context, as SequenceMatcher.get_grouped_opcodes."""
+    codes = list(opcodes)
+    if not codes:
+        return
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    nn = n + n
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        # End the current group and start a new one whenever there is a large range with no changes
+        if tag == 'equal' and i2 - i1 > nn:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+def format_unified_range(start: int, stop: int) -> str:
+    """Hunk header range as difflib.unified_diff writes it (0-based [start, stop) in)."""
+    beginning = start + 1  # lines start numbering with one
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1  # empty ranges begin at line just before the range
+    return f'{beginning},{length}'
+
+def side_by_side_result(doc: DiffDocument, intraline_max_length: int = INTRALINE_MAX_LENGTH, intraline_max_cost: int = INTRALINE_MAX_COST):
+    left_rows = []
+    right_rows = []
+    for l_row, r_row in iter_side_by_side_rows(doc, intraline_max_length, intraline_max_cost):
+        left_rows.append(l_row)
+        right_rows.append(r_row)
     return {"diff": [], "left_rows": left_rows, "right_rows": right_rows}
 
-def generate_unified_diff(left_path: str, right_path: str):
-    left_content = get_file_content(left_path)
-    right_content = get_file_content(right_path)
-    
-    diff = list(difflib.unified_diff(
-        left_content.splitlines(), 
-        right_content.splitlines(),
-        fromfile='Left',
-        tofile='Right',
-        lineterm=''
-    ))
-    return {"diff": diff}
+def generate_side_by_side_diff(left_path: str, right_path: str, algorithm: str = "myers",
+                               intraline_max_length: int = INTRALINE_MAX_LENGTH, intraline_max_cost: int = INTRALINE_MAX_COST):
+    return side_by_side_result(DiffDocument.from_files(left_path, right_path, algorithm), intraline_max_length, intraline_max_cost)
+
+def generate_unified_diff(left_path: str, right_path: str, algorithm: str = "myers"):
+    return {"diff": list(iter_unified_lines(DiffDocument.from_files(left_path, right_path, algorithm)))}
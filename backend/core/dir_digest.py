@@ -0,0 +1,116 @@
+"""
+Merkle digests of directories, persisted in the hash cache.
+
+A directory's digest covers the sorted names, types and content digests of
+its entries, a subdirectory's content digest being its own directory digest,
+so two subtrees with the same digest hold the same content. The compare walk
+computes them bottom-up and records, per directory, the digest together with
+the digests of its files.
+
+A record is trusted only while the directory's listing signature still
+matches: the names, types, sizes and mtimes of its entries, which the walk
+reads anyway. The directory's own mtime is not enough on its own: it does not
+change when a file in it is rewritten in place. While a record matches, its
+file digests settle the directory's file pairs with no per-file cache lookup
+or read.
+"""
+import hashlib
+import os
+from typing import Dict, Iterable, Optional, Tuple
+from .compare_policy import EntryInfo
+from .file_equality import DIGEST_ALGO
+from .hash_cache import HashCache
+
+# Records hold file digests, so they are keyed by the file digest algorithm
+DIR_DIGEST_ALGO = f"tree-{DIGEST_ALGO}"
+
+# Entry kinds in a directory digest
+KIND_FILE = "f"
+KIND_DIR = "d"
+KIND_LINK = "l"
+
+
+def listing_signature(entries: Iterable[Tuple[str, EntryInfo]]) -> str:
+    """Digest of one side's (name, info) listing; entries must come in name order."""
+    hasher = _new_hasher()
+    for name, info in entries:
+        hasher.update(f"{name}\0{int(info.is_dir)}\0{info.size}\0{info.mtime_ns}\0{info.link_target or ''}\n".encode("utf-8", "surrogateescape"))
+    return hasher.hexdigest()
+
+
+def directory_digest(entries: Dict[str, Tuple[str, str]]) -> str:
+    """Merkle digest over name -> (kind, content digest)."""
+    hasher = _new_hasher()
+    for name in sorted(entries):
+        kind, digest = entries[name]
+        hasher.update(f"{name}\0{kind}\0{digest}\n".encode("utf-8", "surrogateescape"))
+    return hasher.hexdigest()
+
+
+def link_digest(target: str) -> str:
+    hasher = _new_hasher()
+    hasher.update(f"link\0{target}".encode("utf-8", "surrogateescape"))
+    return hasher.hexdigest()
+
+
+def _new_hasher():
+    return hashlib.blake2b(digest_size=16)
+
+
+class DirDigestStore:
+    """The compare engine's view of the directory records in a HashCache."""
+
+    def __init__(self, cache: HashCache):
+        self.cache = cache
+
+    def load(self, dir_abs: str, signature: str) -> Optional[Tuple[Optional[str], Dict[str, str]]]:
+        return self.cache.get_dir(os.path.abspath(dir_abs), signature, DIR_DIGEST_ALGO)
+
+    def save(self, dir_abs: str, signature: str, digest: Optional[str], files: Dict[str, str]):
+        self.cache.put_dir(os.path.abspath(dir_abs), signature, digest, files, DIR_DIGEST_ALGO)
+
+
+class DirState:
+    """
+    Bookkeeping of one directory pair in the walk, until its whole subtree is settled:
+      sides      per side (left, right): (absolute path, listing signature, loaded record) or None;
+                 (None, None, recorded digests) on a manifest side
+      entries    per side: name -> (kind, content digest or None if unknown)
+      pending    subdirectories not settled yet
+      same       every entry below is the same on both sides (so far)
+    """
+    __slots__ = ("node", "parent", "sides", "entries", "pending", "same", "settled")
+
+    def __init__(self, node, parent: Optional["DirState"], sides):
+        self.node = node
+        self.parent = parent
+        self.sides = sides
+        self.entries = tuple({} if side is not None else None for side in sides)
+        self.pending = 0
+        self.same = node.status == "same" and all(side is not None for side in sides)
+        self.settled = False
+
+    def known(self, side: int, name: str) -> Optional[str]:
+        """File digest from the side's stored record, if it still matches the listing."""
+        info = self.sides[side]
+        if info is None or info[2] is None:
+            return None
+        return info[2][1].get(name)
+
+    def digest(self, side: int) -> Optional[str]:
+        """Directory digest of one side; None if any entry's digest is unknown."""
+        entries = self.entries[side]
+        if entries is None or not all(digest for _, digest in entries.values()):
+            return None
+        return directory_digest(entries)
+
+    def save(self, store: DirDigestStore, digests):
+        """Writes the records that changed: directory digest and the digests of the files."""
+        for side, info in enumerate(self.sides):
+            if info is None or info[0] is None:
+                continue
+            dir_abs, signature, loaded = info
+            # Unreadable files ("") are hashed again next time
+            files = {name: digest for name, (kind, digest) in self.entries[side].items() if kind == KIND_FILE and digest}
+            if loaded is None or loaded != (digests[side], files):
+                store.save(dir_abs, signature, digests[side], files)
@@ -0,0 +1,181 @@
+"""
+Sync-style folder merge: compares source and destination with the compare
+engine and copies only what differs, instead of replacing the whole folder.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from ..models import FileNode
+from .copy_job import copy_file_data, DEFAULT_COPY_WORKERS
+
+
+class SyncPlan:
+    """
+    What a sync from source to dest will do, as paths relative to both roots:
+      delete  destination entries to remove first (extraneous ones when
+              delete_extraneous is set, and entries whose type differs)
+      mkdir   directories to create, parents first
+      copy    (path, size) of files to (over)write
+    """
+
+    def __init__(self, source: str, dest: str):
+        self.source = source
+        self.dest = dest
+        self.delete: List[str] = []
+        self.mkdir: List[str] = []
+        self.copy: List[Tuple[str, int]] = []
+        self.unchanged_files = 0
+        self.extraneous_kept = 0
+
+    def summary(self) -> dict:
+        return {
+            "copy_files": len(self.copy),
+            "copy_bytes": sum(size for _, size in self.copy),
+            "mkdir": len(self.mkdir),
+            "delete": len(self.delete),
+            "unchanged_files": self.unchanged_files,
+            "extraneous_kept": self.extraneous_kept,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "dest": self.dest,
+            "summary": self.summary(),
+            "delete": self.delete,
+            "mkdir": self.mkdir,
+            "copy": [{"path": path, "size": size} for path, size in self.copy],
+        }
+
+
+def plan_sync(source: str, dest: str, tree: Optional[FileNode], delete_extraneous: bool = False) -> SyncPlan:
+    """
+    Builds the plan from a compare tree of source (left) against dest (right),
+    e.g. from compare_folders(source, dest); tree may be None when dest does
+    not exist yet. Subtrees that exist only in the source are listed from disk.
+    """
+    plan = SyncPlan(source, dest)
+    if not os.path.isdir(dest):
+        plan.mkdir.append("")
+        _plan_new_dir(plan, "")
+        return plan
+
+    stack = list(reversed(tree.children or []))
+    while stack:
+        node = stack.pop()
+        rel = node.path
+        src_abs = os.path.join(source, rel)
+        dst_abs = os.path.join(dest, rel)
+
+        if node.status == "added":
+            # Only in the destination
+            if delete_extraneous:
+                plan.delete.append(rel)
+            else:
+                plan.extraneous_kept += 1
+            continue
+
+        src_is_dir = os.path.isdir(src_abs)
+        if node.status == "removed":
+            # Only in the source
+            if src_is_dir:
+                plan.mkdir.append(rel)
+                _plan_new_dir(plan, rel)
+            else:
+                plan.copy.append((rel, _size(src_abs)))
+            continue
+
+        dst_is_dir = os.path.isdir(dst_abs)
+        if src_is_dir != dst_is_dir:
+            # Type changed: the destination entry goes, the source one is copied fresh
+            plan.delete.append(rel)
+            if src_is_dir:
+                plan.mkdir.append(rel)
+                _plan_new_dir(plan, rel)
+            else:
+                plan.copy.append((rel, _size(src_abs)))
+            continue
+
+        if src_is_dir:
+            stack.extend(reversed(node.children or []))
+        elif node.status == "modified":
+            plan.copy.append((rel, _size(src_abs)))
+        else:
+            plan.unchanged_files += 1
+    return plan
+
+
+def _plan_new_dir(plan: SyncPlan, rel_dir: str):
+    """Everything below a source directory that doesn't exist in the destination yet."""
+    top = os.path.join(plan.source, rel_dir) if rel_dir else plan.source
+    for root, dirnames, filenames in os.walk(top, followlinks=True):
+        rel_root = os.path.relpath(root, plan.source)
+        rel_root = "" if rel_root == "." else rel_root
+        dirnames.sort()
+        for name in dirnames:
+            plan.mkdir.append(os.path.join(rel_root, name))
+        for name in sorted(filenames):
+            plan.copy.append((os.path.join(rel_root, name), _size(os.path.join(root, name))))
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def apply_sync(plan: SyncPlan, workers: int = DEFAULT_COPY_WORKERS, cancelled: Optional[threading.Event] = None) -> dict:
+    """
+    Executes the plan: deletions, then directories, then file copies on a
+    bounded pool. Each file is written to a temporary name and renamed into
+    place, so an interrupted sync never leaves a half-written file behind.
+    """
+    for rel in plan.delete:
+        path = os.path.join(plan.dest, rel)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        elif os.path.lexists(path):
+            os.remove(path)
+
+    for rel in plan.mkdir:
+        os.makedirs(os.path.join(plan.dest, rel) if rel else plan.dest, exist_ok=True)
+
+    def copy_one(rel: str):
+        src = os.path.join(plan.source, rel)
+        dst = os.path.join(plan.dest, rel)
+        # A fresh name beside dst, never a file the user already has; copy_file_data copies the mode over mkstemp's 0600
+        fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(dst) + ".", suffix=".sync-tmp", dir=os.path.dirname(dst))
+        os.close(fd)
+        try:
+            copy_file_data(src, tmp, cancelled=cancelled)
+            os.replace(tmp, dst)
+        except BaseException:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+            raise
+
+    if workers <= 1:
+        for rel, _ in plan.copy:
+            copy_one(rel)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync") as pool:
+            futures = [pool.submit(copy_one, rel) for rel, _ in sorted(plan.copy, key=lambda c: -c[1])]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                if cancelled is not None:
+                    cancelled.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+    # Directory times last, deepest first, since creating files inside touches them
+    for rel in reversed(plan.mkdir):
+        src_dir = os.path.join(plan.source, rel) if rel else plan.source
+        shutil.copystat(src_dir, os.path.join(plan.dest, rel) if rel else plan.dest)
+    return plan.summary()
+
@@ -0,0 +1,129 @@
+import os
+import hashlib
+import threading
+
+try:
+    import xxhash
+except ImportError:  # optional, BLAKE2b is used otherwise
+    xxhash = None
+
+DEFAULT_BUFFER_SIZE = 512 * 1024
+
+# Algorithm used for digests that get persisted (hash cache, indexes); part of every cache key
+DIGEST_ALGO = "xxh3-128" if xxhash is not None else "blake2b-128"
+
+# Reusable read buffers, one pair per thread (the compare engine hashes from a pool)
+_buffers = threading.local()
+
+
+def _get_buffers(size: int):
+    by_size = getattr(_buffers, "by_size", None)
+    if by_size is None:
+        by_size = _buffers.by_size = {}
+    bufs = by_size.get(size)
+    if bufs is None:
+        bufs = by_size[size] = (bytearray(size), bytearray(size))
+    return bufs
+
+
+def _new_hasher(algo: str):
+    if algo == "xxh3-128":
+        return xxhash.xxh3_128()
+    if algo == "blake2b-128":
+        return hashlib.blake2b(digest_size=16)
+    return hashlib.new(algo)
+
+
+def file_digest(path: str, algo: str = DIGEST_ALGO, buffer_size: int = DEFAULT_BUFFER_SIZE) -> str:
+    """Hex digest of the whole file, read into a reused buffer. Returns "" if the file can't be read."""
+    hasher = _new_hasher(algo)
+    buf = _get_buffers(buffer_size)[0]
+    view = memoryview(buf)
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                hasher.update(view[:n])
+        return hasher.hexdigest()
+    except OSError:
+        return ""
+    finally:
+        view.release()
+
+
+def files_equal(left_path: str, right_path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> bool:
+    """
+    Byte-for-byte comparison that reads both files in lockstep and stops at
+    the first differing block. Unreadable files never compare equal.
+    """
+    left_buf, right_buf = _get_buffers(buffer_size)
+    left_view, right_view = memoryview(left_buf), memoryview(right_buf)
+    try:
+        with open(left_path, 'rb', buffering=0) as lf, open(right_path, 'rb', buffering=0) as rf:
+            if os.fstat(lf.fileno()).st_size != os.fstat(rf.fileno()).st_size:
+                return False
+            while True:
+                n = _read_full(lf, left_view)
+                m = _read_full(rf, right_view)
+                if n != m:
+                    return False
+                if n < buffer_size:
+                    # Tail block; bytearray comparison is a memcmp (memoryview's is element-wise)
+                    return left_buf[:n] == right_buf[:n]
+                if left_buf != right_buf:
+                    return False
+    except OSError:
+        return False
+    finally:
+        left_view.release()
+        right_view.release()
+
+
+def first_difference(left_path: str, right_path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """
+    Offset of the first byte where the files differ, reading both in lockstep.
+    A file that is a prefix of the other differs at its length. Returns -1 for identical files.
+    """
+    left_buf, right_buf = _get_buffers(buffer_size)
+    left_view, right_view = memoryview(left_buf), memoryview(right_buf)
+    offset = 0
+    try:
+        with open(left_path, 'rb', buffering=0) as lf, open(right_path, 'rb', buffering=0) as rf:
+            while True:
+                n = _read_full(lf, left_view)
+                m = _read_full(rf, right_view)
+                common = min(n, m)
+                if left_buf[:common] != right_buf[:common]:
+                    # Narrow down inside the block
+                    lo, hi = 0, common
+                    while hi - lo > 64:
+                        mid = (lo + hi) // 2
+                        if left_buf[lo:mid] == right_buf[lo:mid]:
+                            lo = mid
+                        else:
+                            hi = mid
+                    for i in range(lo, hi):
+                        if left_buf[i] != right_buf[i]:
+                            return offset + i
+                if n != m:
+                    return offset + common
+                if n < buffer_size:
+                    return -1
+                offset += n
+    finally:
+        left_view.release()
+        right_view.release()
+
+
+def _read_full(f, view: memoryview) -> int:
+    """readinto until the buffer is full or EOF, so both sides stay block-aligned."""
+    total = 0
+    size = len(view)
+    while total < size:
+        n = f.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
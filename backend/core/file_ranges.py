@@ -0,0 +1,152 @@
+"""
+Partial reads of text files for the content range endpoint: byte ranges and
+line ranges through mmap, so only the touched pages are read.
+"""
+import os
+import mmap
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import islice
+from typing import Optional, Tuple
+from .file_type import sniff_file
+
+# Upper bound for one range response
+MAX_RANGE_BYTES = 8 * 1024 * 1024
+# Every LINE_INDEX_STRIDE-th line start is remembered per file
+LINE_INDEX_STRIDE = 1024
+MAX_LINE_INDEXES = 32
+
+
+def file_etag(st: os.stat_result) -> str:
+    """Weak validator from size and mtime, quoted for the ETag header."""
+    return size_mtime_etag(st.st_size, st.st_mtime_ns)
+
+
+def size_mtime_etag(size: int, mtime_ns: int) -> str:
+    """file_etag() of a file known by size and mtime only (e.g. from a remote listing)."""
+    return f'"{size:x}-{mtime_ns:x}"'
+
+
+def read_byte_range(path: str, start: int, length: int) -> dict:
+    """
+    Decodes bytes [start, start + length) of a UTF-8 text file (UTF-16 is not
+    supported). The range is widened to whole characters so multi-byte
+    sequences are never cut; the returned start/end are the byte offsets
+    actually covered.
+    """
+    length = min(length, MAX_RANGE_BYTES)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        start = max(0, min(start, size))
+        end = min(size, start + length)
+        if end <= start:
+            return {"content": "", "start": start, "end": start, "size": size, "eof": start >= size}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Back up to the first byte of the character containing start / end
+            while start > 0 and mm[start] & 0xC0 == 0x80:
+                start -= 1
+            while end < size and mm[end] & 0xC0 == 0x80:
+                end += 1
+            # utf-8-sig drops a BOM at the start of the file
+            content = mm[start:end].decode('utf-8-sig' if start == 0 else 'utf-8', errors='replace')
+    return {"content": content, "start": start, "end": end, "size": size, "eof": end >= size}
+
+
+class LineIndex:
+    """Byte offsets of every LINE_INDEX_STRIDE-th line start of one file version, extended on demand."""
+    __slots__ = ("offsets", "complete", "total_lines", "lock")
+
+    def __init__(self):
+        self.offsets = array("Q", [0])
+        self.complete = False
+        self.total_lines: Optional[int] = None
+        self.lock = threading.Lock()
+
+    def seek_line(self, mm: mmap.mmap, line: int) -> int:
+        """Byte offset where 0-based line starts (the file size if it is past the end)."""
+        slot = line // LINE_INDEX_STRIDE
+        if slot >= len(self.offsets) and not self.complete:
+            self._extend(mm, slot)
+        slot = min(slot, len(self.offsets) - 1)
+        pos = self.offsets[slot]
+        for _ in range(line - slot * LINE_INDEX_STRIDE):
+            nl = mm.find(b"\n", pos)
+            if nl < 0:
+                return len(mm)
+            pos = nl + 1
+        return pos
+
+    def _extend(self, mm: mmap.mmap, slot: int):
+        pos = self.offsets[-1]
+        size = len(mm)
+        while len(self.offsets) <= slot:
+            lines = 0
+            while lines < LINE_INDEX_STRIDE:
+                nl = mm.find(b"\n", pos)
+                if nl < 0:
+                    break
+                pos = nl + 1
+                lines += 1
+            if lines < LINE_INDEX_STRIDE:
+                self.complete = True
+                self.total_lines = (len(self.offsets) - 1) * LINE_INDEX_STRIDE + lines + (1 if pos < size else 0)
+                return
+            self.offsets.append(pos)
+
+
+_line_indexes: "OrderedDict[Tuple[str, int, int], LineIndex]" = OrderedDict()
+_line_indexes_lock = threading.Lock()
+
+
+def _line_index(path: str, st: os.stat_result) -> LineIndex:
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _line_indexes_lock:
+        index = _line_indexes.get(key)
+        if index is None:
+            index = _line_indexes[key] = LineIndex()
+            while len(_line_indexes) > MAX_LINE_INDEXES:
+                _line_indexes.popitem(last=False)
+        else:
+            _line_indexes.move_to_end(key)
+        return index
+
+
+def read_line_range(path: str, line: int, count: int) -> dict:
+    """
+    Lines [line, line + count) (0-based) without their terminators, capped at
+    MAX_RANGE_BYTES. total_lines is known once the file has been indexed to its end.
+    """
+    encoding = sniff_file(path).encoding
+    if encoding == "utf-16":
+        # Newlines are two bytes wide here; fall back to decoding from the start
+        with open(path, 'r', encoding=encoding, errors='replace') as f:
+            lines = [l.rstrip('\r\n') for l in islice(f, line, line + count)]
+        return {"lines": lines, "line": line, "total_lines": None, "eof": len(lines) < count}
+
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            return {"lines": [], "line": line, "total_lines": 0, "eof": True}
+        index = _line_index(path, st)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with index.lock:
+                start = index.seek_line(mm, line)
+            end = start
+            taken = 0
+            while taken < count and end < st.st_size and end - start < MAX_RANGE_BYTES:
+                nl = mm.find(b"\n", end)
+                end = st.st_size if nl < 0 else nl + 1
+                taken += 1
+            data = mm[start:end]
+
+    text = data.decode(encoding if line == 0 else "utf-8", errors='replace')
+    lines = text.split("\n") if text else []
+    if text.endswith("\n"):
+        lines.pop()
+    lines = [l[:-1] if l.endswith("\r") else l for l in lines]
+    eof = end >= st.st_size
+    total_lines = index.total_lines
+    if total_lines is None and eof and start < st.st_size:
+        total_lines = line + len(lines)
+    return {"lines": lines, "line": line, "total_lines": total_lines, "eof": eof}
@@ -0,0 +1,184 @@
+"""
+Pre-diff classification: decides from a small prefix and the sizes whether a
+pair of files is line-diffed in memory, streamed, or only summarized as binary.
+Remote files (sftp:// or webdav:// URLs) are classified and summarized from a
+stat and ranged reads, so they are only downloaded for a text diff.
+"""
+import os
+import codecs
+from typing import BinaryIO, Callable, NamedTuple, Optional, Tuple
+from .file_equality import DEFAULT_BUFFER_SIZE, DIGEST_ALGO, file_digest, first_difference
+from .filesystem import is_remote, resolve
+
+SNIFF_SIZE = 8192
+# Text files above this (either side) go through the streaming diff instead of being split in memory
+DEFAULT_MAX_TEXT_BYTES = 64 * 1024 * 1024
+# Bytes shown around the first difference of binary files, in rows of HEX_ROW_SIZE
+DEFAULT_HEX_WINDOW = 256
+HEX_ROW_SIZE = 16
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+class FileInfo(NamedTuple):
+    exists: bool
+    size: int
+    binary: bool
+    # Codec used to read the file as text; "utf-8" (with replacement) when nothing better is known
+    encoding: str
+
+
+def sniff_file(path: str) -> FileInfo:
+    """Classifies path from its first SNIFF_SIZE bytes: a BOM picks the codec, a NUL byte means binary."""
+    try:
+        if is_remote(path):
+            fs, inner = resolve(path)
+            info = fs.stat(inner)
+            if info is None or info.is_dir:
+                raise FileNotFoundError(path)
+            size, head = info.size, fs.read_bytes(inner, 0, SNIFF_SIZE)
+        else:
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                head = f.read(SNIFF_SIZE)
+    except OSError:
+        return FileInfo(False, 0, False, "utf-8")
+
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return FileInfo(True, size, False, encoding)
+    return FileInfo(True, size, b"\0" in head, "utf-8")
+
+
+def classify_pair(left_path: str, right_path: str, max_text_bytes: int = DEFAULT_MAX_TEXT_BYTES) -> Tuple[str, FileInfo, FileInfo]:
+    """
+    Returns (kind, left_info, right_info), kind being "binary" if either side is
+    binary, "large" if either side exceeds max_text_bytes, otherwise "text".
+    A missing side counts as an empty text file.
+    """
+    left = sniff_file(left_path)
+    right = sniff_file(right_path)
+    if left.binary or right.binary:
+        return "binary", left, right
+    if max(left.size, right.size) > max_text_bytes:
+        return "large", left, right
+    return "text", left, right
+
+
+def binary_summary(left_path: str, right_path: str, hex_window: int = DEFAULT_HEX_WINDOW,
+                   hash_file: Optional[Callable[[str], str]] = None) -> dict:
+    """
+    Sizes and digests of both sides, the offset of the first differing byte
+    (None if identical or a side is missing) and a hex dump of both sides
+    around it. A remote side's digest is the server's, or "" if it computes
+    none; its bytes are compared as a stream rather than downloaded.
+    """
+    hash_file = hash_file or (lambda path: file_digest(path, DIGEST_ALGO))
+    sides = {}
+    for side, path in (("left", left_path), ("right", right_path)):
+        if is_remote(path):
+            sides[side] = _remote_side(path)
+            continue
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            sides[side] = None
+            continue
+        sides[side] = {"size": size, "digest": hash_file(path)}
+
+    offset = None
+    if sides["left"] is not None and sides["right"] is not None:
+        try:
+            if not is_remote(left_path) and not is_remote(right_path):
+                offset = first_difference(left_path, right_path)
+            elif sides["left"]["size"] == sides["right"]["size"] and sides["left"]["digest"] and sides["left"]["digest"] == sides["right"]["digest"]:
+                offset = -1
+            else:
+                with _open(left_path) as lf, _open(right_path) as rf:
+                    offset = _first_stream_difference(lf, rf)
+        except (ValueError, OSError):
+            pass
+    identical = offset == -1
+    if identical:
+        offset = None
+
+    summary = {"algo": DIGEST_ALGO, **sides, "identical": identical, "first_difference": offset, "hex": []}
+    if offset is not None and hex_window > 0:
+        start = max(0, offset - hex_window // 2)
+        start -= start % HEX_ROW_SIZE
+        summary["hex"] = _hex_rows(left_path, right_path, start, hex_window)
+    return summary
+
+
+def _remote_side(path: str) -> Optional[dict]:
+    try:
+        fs, inner = resolve(path)
+        info = fs.stat(inner)
+        if info is None or info.is_dir:
+            return None
+        digest = fs.remote_digest(inner, DIGEST_ALGO) if DIGEST_ALGO in fs.remote_algos(inner) else ""
+    except (ValueError, OSError):
+        return None
+    return {"size": info.size, "digest": digest}
+
+
+def _open(path: str) -> BinaryIO:
+    fs, inner = resolve(path)
+    return fs.open_read(inner)
+
+
+def _read_block(f: BinaryIO, size: int) -> bytes:
+    """read until size bytes or EOF, so both sides stay block-aligned."""
+    parts = []
+    while size > 0:
+        part = f.read(size)
+        if not part:
+            break
+        parts.append(part)
+        size -= len(part)
+    return b"".join(parts)
+
+
+def _first_stream_difference(lf: BinaryIO, rf: BinaryIO, buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """first_difference over two open streams; stops reading at the first differing block."""
+    offset = 0
+    while True:
+        left, right = _read_block(lf, buffer_size), _read_block(rf, buffer_size)
+        if left != right:
+            common = min(len(left), len(right))
+            if left[:common] == right[:common]:
+                # One side ended inside this block
+                return offset + common
+            lo, hi = 0, common
+            while hi - lo > 64:
+                mid = (lo + hi) // 2
+                if left[lo:mid] == right[lo:mid]:
+                    lo = mid
+                else:
+                    hi = mid
+            for i in range(lo, hi):
+                if left[i] != right[i]:
+                    return offset + i
+        if len(left) < buffer_size:
+            return -1
+        offset += len(left)
+
+
+def _hex_rows(left_path: str, right_path: str, start: int, length: int):
+    chunks = []
+    for path in (left_path, right_path):
+        fs, inner = resolve(path)
+        chunks.append(fs.read_bytes(inner, start, length))
+    left, right = chunks
+    rows = []
+    for pos in range(0, max(len(left), len(right)), HEX_ROW_SIZE):
+        rows.append({
+            "offset": start + pos,
+            "left": left[pos:pos + HEX_ROW_SIZE].hex(" "),
+            "right": right[pos:pos + HEX_ROW_SIZE].hex(" "),
+        })
+    return rows
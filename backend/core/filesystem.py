@@ -0,0 +1,813 @@
+"""
+Filesystem adapters: the compare engine, the diff views and the file routes
+reach files through a FileSystem, so either side of a compare can be on a
+server instead of a local disk.
+
+Paths name their adapter:
+  /a/b, C:\\a                      local disk (LocalFileSystem, plain os calls)
+  sftp://user@host:port/a/b        SFTP (sftp_fs; needs paramiko)
+  webdav://user@host:port/a/b      WebDAV over HTTP (webdav_fs)
+  webdavs://user@host:port/a/b     WebDAV over HTTPS
+The adapter of a user@host:port is opened on first use and shared by every
+later URL naming it with the same password or none, so a password in the URL
+is only needed once (SFTP also tries the SSH agent and default keys). Paths inside an adapter are
+"/"-separated and never carry credentials.
+
+Remote adapters hold a ConnectionPool: each request borrows a connection, so
+the compare engine's worker threads keep that many listings, stats and
+reads in flight at once. A listing returns every entry's type, size and
+mtime in one round trip. Where the server can compute digests itself
+(remote_algos), content compares ask for those instead of downloading files.
+CachedFileSystem keeps one compare session's stat results, listings and
+digests, so expanding a lazy compare does not ask the server again.
+"""
+import atexit
+import errno
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+from .compare_policy import EntryInfo
+from .file_equality import DEFAULT_BUFFER_SIZE, _new_hasher, file_digest
+
+REMOTE_SCHEMES = ("sftp", "webdav", "webdavs")
+DEFAULT_CONNECTIONS = 8
+# Idle pooled connections older than this are closed rather than reused
+DEFAULT_IDLE_SECONDS = 60
+DEFAULT_METADATA_TTL = 300
+DEFAULT_METADATA_ENTRIES = 200_000
+# Local copies of remote files kept for the diff views (see local_copy)
+MAX_LOCAL_COPIES = 64
+
+_DIR_INFO = EntryInfo(True, 0, 0)
+_REMOTE_RE = re.compile(r"^(sftp|webdavs?)://", re.IGNORECASE)
+# The password part of a remote URL's user info, anywhere in a string
+_PASSWORD_RE = re.compile(r"\b((?:sftp|webdavs?)://[^/?#@:\s]*):[^/?#@\s]*@", re.IGNORECASE)
+# Read once: os.umask can only be read by setting it
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def is_remote(path: str) -> bool:
+    return bool(path) and _REMOTE_RE.match(path) is not None
+
+
+def redact_url(text: str) -> str:
+    """text with the passwords of the remote URLs in it removed (user@host stays), for logs and messages."""
+    return _PASSWORD_RE.sub(r"\1@", text)
+
+
+def connection_lost(error: BaseException) -> bool:
+    """
+    True if a request failed because of its connection rather than the path:
+    a reset, timeout or EOF, a protocol error (anything that is not an
+    OSError), or an OSError without an errno the server could have sent.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, EOFError)) or not isinstance(error, OSError):
+        return True
+    return error.errno is None
+
+
+def not_found(path: str) -> FileNotFoundError:
+    return FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+
+
+class ConnectionPool:
+    """
+    Up to max_size connections made by connect(), lent out one per request.
+    Idle connections are reused newest first; one that failed with a lost
+    connection (see connection_lost) is closed instead of being returned,
+    so the next request opens a fresh one.
+    """
+
+    def __init__(self, connect: Callable[[], object], close: Callable[[object], None], max_size: int = DEFAULT_CONNECTIONS,
+                 idle_seconds: float = DEFAULT_IDLE_SECONDS, alive: Optional[Callable[[object], bool]] = None):
+        self._connect = connect
+        self._close = close
+        self._alive = alive
+        self.max_size = max(1, max_size)
+        self.idle_seconds = idle_seconds
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._idle = []  # (connection, last used)
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            conn = self._take()
+            try:
+                yield conn
+            except BaseException as e:
+                if connection_lost(e):
+                    self._discard(conn)
+                else:
+                    self._give_back(conn)
+                raise
+            self._give_back(conn)
+        finally:
+            self._slots.release()
+
+    def _take(self):
+        stale = []
+        conn = None
+        with self._lock:
+            now = time.monotonic()
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if now - last_used > self.idle_seconds or (self._alive is not None and not self._alive(candidate)):
+                    stale.append(candidate)
+                else:
+                    conn = candidate
+                    self.reused += 1
+                    break
+        for old in stale:
+            self._discard(old)
+        if conn is None:
+            conn = self._connect()
+            with self._lock:
+                self.opened += 1
+        return conn
+
+    def _give_back(self, conn):
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    def _discard(self, conn):
+        try:
+            self._close(conn)
+        except Exception:
+            pass
+
+    def call(self, fn: Callable, *args):
+        """fn(connection, *args), tried once more on a fresh connection if the first one was lost."""
+        try:
+            with self.connection() as conn:
+                return fn(conn, *args)
+        except Exception as e:
+            if not connection_lost(e):
+                raise
+        with self.connection() as conn:
+            return fn(conn, *args)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"max_size": self.max_size, "idle": len(self._idle), "opened": self.opened, "reused": self.reused}
+
+
+class PooledReader:
+    """
+    A read stream that holds one pooled connection until it is closed. The
+    connection goes back to the pool only if `reusable(stream)` says the
+    stream was consumed cleanly.
+    """
+
+    def __init__(self, pool: ConnectionPool, open_stream: Callable[[object], BinaryIO],
+                 reusable: Optional[Callable[[BinaryIO], bool]] = None):
+        self._lease = None
+        lease = pool.connection()
+        conn = lease.__enter__()
+        try:
+            self._stream = open_stream(conn)
+        except BaseException as e:
+            lease.__exit__(type(e), e, e.__traceback__)
+            raise
+        self._lease = lease
+        self._reusable = reusable
+        self._error: Optional[BaseException] = None
+
+    def read(self, size: int = -1) -> bytes:
+        try:
+            # HTTP responses read to EOF only without a size
+            return self._stream.read() if size is None or size < 0 else self._stream.read(size)
+        except BaseException as e:
+            self._error = e
+            raise
+
+    def close(self):
+        lease, self._lease = self._lease, None
+        if lease is None:
+            return
+        error = self._error
+        if error is None and self._reusable is not None and not self._reusable(self._stream):
+            error = ConnectionAbortedError("Stream closed before its end")
+        try:
+            self._stream.close()
+        except Exception as e:
+            error = error or e
+        if error is None:
+            lease.__exit__(None, None, None)
+        else:
+            lease.__exit__(type(error), error, error.__traceback__)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        # A reader dropped without close() must not keep its pool slot
+        if getattr(self, "_lease", None) is not None:
+            self.close()
+
+
+class FileSystem:
+    """
+    The file operations the app needs. Missing paths raise FileNotFoundError
+    and failed requests other OSErrors, on every adapter. Subclasses implement
+    stat, listdir, open_read, write_chunks, makedirs, remove and rmdir; the
+    rest has generic versions built on those.
+    """
+    scheme = "file"
+
+    def url(self, path: str) -> str:
+        """The path as the app shows it (and accepts it back), without credentials."""
+        return path
+
+    def join(self, base: str, *names: str) -> str:
+        return posixpath.join(base, *names)
+
+    def dirname(self, path: str) -> str:
+        return posixpath.dirname(path.rstrip("/")) or "/"
+
+    def basename(self, path: str) -> str:
+        return posixpath.basename(path.rstrip("/"))
+
+    def stat(self, path: str) -> Optional[EntryInfo]:
+        """Entry info of path (following links); None if it does not exist."""
+        raise NotImplementedError
+
+    def listdir(self, path: str, symlinks: str = "follow") -> Dict[str, EntryInfo]:
+        """name -> info of one directory, under the compare engine's symlink policy."""
+        raise NotImplementedError
+
+    def open_read(self, path: str, offset: int = 0) -> BinaryIO:
+        raise NotImplementedError
+
+    def write_chunks(self, path: str, chunks: Iterable[bytes]):
+        """Creates or replaces a file with the given content."""
+        raise NotImplementedError
+
+    def makedirs(self, path: str):
+        """Creates path and its missing parents; an existing directory is fine."""
+        raise NotImplementedError
+
+    def remove(self, path: str):
+        raise NotImplementedError
+
+    def rmdir(self, path: str):
+        raise NotImplementedError
+
+    def exists(self, path: str) -> bool:
+        return self.stat(path) is not None
+
+    def isdir(self, path: str) -> bool:
+        info = self.stat(path)
+        return info is not None and info.is_dir
+
+    def isfile(self, path: str) -> bool:
+        info = self.stat(path)
+        return info is not None and not info.is_dir
+
+    def iter_read(self, path: str, offset: int = 0, block_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[bytes]:
+        with self.open_read(path, offset) as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    return
+                yield block
+
+    def read_bytes(self, path: str, offset: int = 0, length: int = -1) -> bytes:
+        with self.open_read(path, offset) as f:
+            return f.read(length) if length >= 0 else f.read()
+
+    def write_bytes(self, path: str, data: bytes):
+        self.write_chunks(path, [data])
+
+    def write_text(self, path: str, text: str):
+        self.write_chunks(path, [text.encode("utf-8")])
+
+    def rmtree(self, path: str):
+        for name, info in self.listdir(path, symlinks="link").items():
+            child = self.join(path, name)
+            if info.is_dir:
+                self.rmtree(child)
+            else:
+                self.remove(child)
+        self.rmdir(path)
+
+    def copy_file(self, src: str, dst: str):
+        """Copies a file within this filesystem; remote adapters copy on the server where they can."""
+        self.write_chunks(dst, self.iter_read(src))
+
+    def copy_tree(self, src: str, dst: str):
+        _stream_copy(self, src, self, dst, is_dir=True)
+
+    def remote_algos(self, path: str) -> Tuple[str, ...]:
+        """Digest algorithms the server computes for this file without sending it, most preferred first."""
+        return ()
+
+    def remote_digest(self, path: str, algo: str) -> str:
+        raise NotImplementedError
+
+    def digest(self, path: str, algo: str) -> str:
+        """Hex digest of the file, computed on the server if it can; "" if the file can't be read."""
+        try:
+            if algo in self.remote_algos(path):
+                value = self.remote_digest(path, algo)
+                if value:
+                    return value
+            hasher = _new_hasher(algo)
+            for block in self.iter_read(path):
+                hasher.update(block)
+            return hasher.hexdigest()
+        except OSError:
+            return ""
+
+    def refresh(self, path: Optional[str] = None):
+        """Forgets cached metadata (of path and below, or all); a no-op without a cache."""
+
+    def close(self):
+        pass
+
+
+def _temp_beside(path: str) -> Tuple[int, str]:
+    """A fresh temp file next to path, so os.replace onto path stays on one device.
+    mkstemp makes it 0600; it gets the mode a plain open() would have given."""
+    fd, temp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp",
+                                     dir=os.path.dirname(path) or ".")
+    try:
+        os.chmod(temp_path, 0o666 & ~_UMASK)
+    except OSError:
+        pass
+    return fd, temp_path
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class LocalFileSystem(FileSystem):
+    """The local disk, through os and shutil; paths are native."""
+    scheme = "file"
+
+    def join(self, base: str, *names: str) -> str:
+        return os.path.join(base, *names)
+
+    def dirname(self, path: str) -> str:
+        return os.path.dirname(path)
+
+    def basename(self, path: str) -> str:
+        return os.path.basename(path)
+
+    def stat(self, path: str) -> Optional[EntryInfo]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return EntryInfo(stat.S_ISDIR(st.st_mode), st.st_size, st.st_mtime_ns)
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def isdir(self, path: str) -> bool:
+        return os.path.isdir(path)
+
+    def isfile(self, path: str) -> bool:
+        return os.path.isfile(path)
+
+    def listdir(self, path: str, symlinks: str = "follow") -> Dict[str, EntryInfo]:
+        found = {}
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_symlink() and symlinks != "follow":
+                        if symlinks == "link":
+                            st = entry.stat(follow_symlinks=False)
+                            found[entry.name] = EntryInfo(False, st.st_size, st.st_mtime_ns, os.readlink(entry.path))
+                        continue
+                    if entry.is_dir():
+                        found[entry.name] = _DIR_INFO
+                    else:
+                        st = entry.stat()
+                        found[entry.name] = EntryInfo(False, st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue
+        return found
+
+    def open_read(self, path: str, offset: int = 0) -> BinaryIO:
+        f = open(path, "rb")
+        if offset:
+            f.seek(offset)
+        return f
+
+    def write_chunks(self, path: str, chunks: Iterable[bytes]):
+        fd, temp_path = _temp_beside(path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            _remove_quietly(temp_path)
+            raise
+
+    def write_text(self, path: str, text: str):
+        # Text mode, so line endings follow the platform like every other save
+        fd, temp_path = _temp_beside(path)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp_path, path)
+        except BaseException:
+            _remove_quietly(temp_path)
+            raise
+
+    def makedirs(self, path: str):
+        os.makedirs(path, exist_ok=True)
+
+    def remove(self, path: str):
+        os.remove(path)
+
+    def rmdir(self, path: str):
+        os.rmdir(path)
+
+    def rmtree(self, path: str):
+        shutil.rmtree(path)
+
+    def copy_file(self, src: str, dst: str):
+        shutil.copy2(src, dst)
+
+    def copy_tree(self, src: str, dst: str):
+        shutil.copytree(src, dst)
+
+    def digest(self, path: str, algo: str) -> str:
+        return file_digest(path, algo)
+
+
+LOCAL = LocalFileSystem()
+
+
+class CachedFileSystem(FileSystem):
+    """
+    One session's view of an adapter. Stat results, listings (which also
+    answer stats of their entries) and digests are kept for `ttl` seconds,
+    at most max_entries of them; digests are keyed by the file's size and
+    mtime as well. Writes through this view drop what they touch; refresh()
+    drops a subtree or everything. Reads of file content are not cached.
+    """
+
+    def __init__(self, fs: FileSystem, ttl: float = DEFAULT_METADATA_TTL, max_entries: int = DEFAULT_METADATA_ENTRIES):
+        self.fs = fs
+        self.scheme = fs.scheme
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (value, expires)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return item
+            self.misses += 1
+            return None
+
+    def _put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stat(self, path: str) -> Optional[EntryInfo]:
+        item = self._get(("stat", path))
+        if item is not None:
+            return item[0]
+        info = self.fs.stat(path)
+        self._put(("stat", path), info)
+        return info
+
+    def listdir(self, path: str, symlinks: str = "follow") -> Dict[str, EntryInfo]:
+        item = self._get(("list", path, symlinks))
+        if item is not None:
+            return item[0]
+        entries = self.fs.listdir(path, symlinks)
+        self._put(("list", path, symlinks), entries)
+        if symlinks == "follow":
+            for name, info in entries.items():
+                self._put(("stat", self.join(path, name)), info)
+        return entries
+
+    def remote_algos(self, path: str) -> Tuple[str, ...]:
+        return self.fs.remote_algos(path)
+
+    def digest(self, path: str, algo: str) -> str:
+        info = self.stat(path)
+        if info is None:
+            return ""
+        key = ("digest", path, algo, info.size, info.mtime_ns)
+        item = self._get(key)
+        if item is not None:
+            return item[0]
+        value = self.fs.digest(path, algo)
+        if value:
+            self._put(key, value)
+        return value
+
+    def refresh(self, path: Optional[str] = None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            prefix = path.rstrip("/") + "/"
+            parent = self.dirname(path)
+            for key in [k for k in self._entries if k[1] == path or k[1].startswith(prefix) or k[1] == parent]:
+                del self._entries[key]
+
+    def url(self, path: str) -> str:
+        return self.fs.url(path)
+
+    def join(self, base: str, *names: str) -> str:
+        return self.fs.join(base, *names)
+
+    def dirname(self, path: str) -> str:
+        return self.fs.dirname(path)
+
+    def basename(self, path: str) -> str:
+        return self.fs.basename(path)
+
+    def open_read(self, path: str, offset: int = 0) -> BinaryIO:
+        return self.fs.open_read(path, offset)
+
+    def iter_read(self, path: str, offset: int = 0, block_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[bytes]:
+        return self.fs.iter_read(path, offset, block_size)
+
+    def read_bytes(self, path: str, offset: int = 0, length: int = -1) -> bytes:
+        return self.fs.read_bytes(path, offset, length)
+
+    def write_chunks(self, path: str, chunks: Iterable[bytes]):
+        try:
+            self.fs.write_chunks(path, chunks)
+        finally:
+            self.refresh(path)
+
+    def makedirs(self, path: str):
+        try:
+            self.fs.makedirs(path)
+        finally:
+            self.refresh(path)
+
+    def remove(self, path: str):
+        try:
+            self.fs.remove(path)
+        finally:
+            self.refresh(path)
+
+    def rmdir(self, path: str):
+        try:
+            self.fs.rmdir(path)
+        finally:
+            self.refresh(path)
+
+    def rmtree(self, path: str):
+        try:
+            self.fs.rmtree(path)
+        finally:
+            self.refresh(path)
+
+    def copy_file(self, src: str, dst: str):
+        try:
+            self.fs.copy_file(src, dst)
+        finally:
+            self.refresh(dst)
+
+    def copy_tree(self, src: str, dst: str):
+        try:
+            self.fs.copy_tree(src, dst)
+        finally:
+            self.refresh(dst)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class FsPath(NamedTuple):
+    """A path on a remote adapter, standing in for a compare root (like a Manifest does)."""
+    fs: FileSystem
+    path: str
+
+    @property
+    def name(self) -> str:
+        return self.fs.basename(self.path) or self.fs.url(self.path)
+
+    def __str__(self) -> str:
+        return self.fs.url(self.path)
+
+
+# Open remote adapters: (scheme, user, host, port, password digest) -> FileSystem.
+# The password is part of the key, so a URL with a wrong one never reaches an
+# adapter opened with the right one; URLs without a password use the adapter
+# last opened for their user@host:port.
+_filesystems: Dict[tuple, FileSystem] = {}
+_latest_filesystems: Dict[tuple, FileSystem] = {}
+_filesystems_lock = threading.Lock()
+
+
+def _open_remote(scheme: str, host: str, port: Optional[int], user: Optional[str], password: Optional[str], options: Dict[str, str]) -> FileSystem:
+    if scheme == "sftp":
+        from .sftp_fs import SftpFileSystem
+        return SftpFileSystem(host, port, user, password, **options)
+    from .webdav_fs import WebDavFileSystem
+    return WebDavFileSystem(host, port, user, password, secure=scheme == "webdavs", **options)
+
+
+def _password_digest(password: Optional[str]) -> Optional[bytes]:
+    if password is None:
+        return None
+    return hashlib.blake2b(password.encode("utf-8", "surrogateescape"), digest_size=16).digest()
+
+
+def resolve(path: str) -> Tuple[FileSystem, str]:
+    """
+    The adapter of a path and the path inside it. Raises ValueError for a
+    malformed or unsupported remote URL; connecting may raise OSError.
+    """
+    if not is_remote(path):
+        return LOCAL, path
+    parts = urlsplit(path)
+    scheme = parts.scheme.lower()
+    if scheme not in REMOTE_SCHEMES or not parts.hostname:
+        raise ValueError(f"Not a supported remote path: {redact_url(path)}")
+    try:
+        port = parts.port
+    except ValueError:
+        raise ValueError(f"Invalid port in {redact_url(path)}")
+    user = unquote(parts.username) if parts.username else None
+    password = unquote(parts.password) if parts.password else None
+    # Query options (e.g. ?connections=4) apply when the adapter is opened
+    options = {}
+    for pair in filter(None, parts.query.split("&")):
+        key, _, value = pair.partition("=")
+        options[unquote(key)] = unquote(value)
+    target = (scheme, user, parts.hostname.lower(), port)
+    key = target + (_password_digest(password),)
+    with _filesystems_lock:
+        fs = _filesystems.get(key) if password is not None else _latest_filesystems.get(target)
+        if fs is None:
+            try:
+                fs = _open_remote(scheme, parts.hostname, port, user, password, options)
+            except TypeError as e:
+                raise ValueError(f"Invalid option in {redact_url(path)}: {e}")
+            _filesystems[key] = fs
+            _latest_filesystems[target] = fs
+    return fs, unquote(parts.path) or "/"
+
+
+def open_root(path: str, cached: bool = False):
+    """A compare root: local paths unchanged, remote URLs as an FsPath (with a CachedFileSystem view if `cached`)."""
+    fs, inner = resolve(path)
+    if fs is LOCAL:
+        return path
+    return FsPath(CachedFileSystem(fs) if cached else fs, inner)
+
+
+def remote_url(scheme: str, host: str, port: Optional[int], user: Optional[str], path: str) -> str:
+    netloc = f"{quote(user, safe='')}@{host}" if user else host
+    if port:
+        netloc += f":{port}"
+    return f"{scheme}://{netloc}{quote(path)}"
+
+
+def close_filesystems():
+    with _filesystems_lock:
+        opened = list(_filesystems.values())
+        _filesystems.clear()
+        _latest_filesystems.clear()
+    for fs in opened:
+        fs.close()
+
+
+def copy_between(src_fs: FileSystem, src: str, dst_fs: FileSystem, dst: str, is_dir: bool):
+    """
+    Copies a file or tree, from one adapter to another if need be. Within one
+    adapter its own copy is used (shutil locally, server-side copies remotely);
+    across adapters content is streamed, one file at a time.
+    """
+    if src_fs is dst_fs:
+        return src_fs.copy_tree(src, dst) if is_dir else src_fs.copy_file(src, dst)
+    _stream_copy(src_fs, src, dst_fs, dst, is_dir)
+
+
+def _stream_copy(src_fs: FileSystem, src: str, dst_fs: FileSystem, dst: str, is_dir: bool):
+    if not is_dir:
+        dst_fs.write_chunks(dst, src_fs.iter_read(src))
+        return
+    dst_fs.makedirs(dst)
+    for name, info in src_fs.listdir(src).items():
+        _stream_copy(src_fs, src_fs.join(src, name), dst_fs, dst_fs.join(dst, name), info.is_dir)
+
+
+# Local copies of remote files: path -> [holders], least recently used first.
+# Copies live in a directory private to this process (mkdtemp, mode 0700).
+_copies: "OrderedDict[str, list]" = OrderedDict()
+_copies_dir: Optional[str] = None
+_copies_lock = threading.Lock()
+
+
+def _copies_folder() -> str:
+    global _copies_dir
+    if _copies_dir is None:
+        _copies_dir = tempfile.mkdtemp(prefix="jfm-remote-")
+        atexit.register(shutil.rmtree, _copies_dir, True)
+    return _copies_dir
+
+
+def _evict_copies():
+    """Drops the least recently used copies beyond MAX_LOCAL_COPIES; held ones stay. Call under _copies_lock."""
+    for path, holders in list(_copies.items()):
+        if len(_copies) <= MAX_LOCAL_COPIES:
+            break
+        if not holders[0]:
+            del _copies[path]
+            _remove_quietly(path)
+
+
+@contextmanager
+def local_copy(path: str) -> Iterator[str]:
+    """
+    A local file with the content of path, for as long as the with block
+    runs: path itself unless it is remote. Remote files are downloaded once
+    per size and mtime and kept for the last MAX_LOCAL_COPIES of them, so the
+    diff views (which re-read files and key their cache on the local path)
+    work on them unchanged. A copy is not evicted while a block holds it.
+    Missing remote files come back as a path that does not exist.
+    """
+    if not is_remote(path):
+        yield path
+        return
+    fs, inner = resolve(path)
+    info = fs.stat(inner)
+    key = hashlib.blake2b(f"{fs.url(inner)}\0{info}".encode("utf-8", "surrogateescape"), digest_size=12).hexdigest()
+    with _copies_lock:
+        folder = _copies_folder()
+        target = os.path.join(folder, key + os.path.splitext(fs.basename(inner))[1])
+        if info is None or info.is_dir:
+            holders = None
+        else:
+            holders = _copies.setdefault(target, [0])
+            holders[0] += 1
+            _copies.move_to_end(target)
+    if holders is None:
+        yield target + ".missing"
+        return
+    try:
+        try:
+            st = os.stat(target)
+            complete = (st.st_size, st.st_mtime_ns) == (info.size, info.mtime_ns)
+        except OSError:
+            complete = False
+        if not complete:
+            # A temporary name of its own, as the same file may be downloaded by two requests at once
+            fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=folder)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in fs.iter_read(inner):
+                        f.write(chunk)
+                # Stamped with the remote mtime, so a later request can tell a complete copy
+                os.utime(temp_path, ns=(info.mtime_ns, info.mtime_ns))
+                os.replace(temp_path, target)
+            except BaseException:
+                _remove_quietly(temp_path)
+                raise
+        yield target
+    finally:
+        with _copies_lock:
+            holders[0] -= 1
+            _evict_copies()
@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+HASH_CACHE_FILE = "settings/hash_cache.db"
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+
+class HashCache:
+    """
+    Persistent content-hash cache backed by SQLite.
+
+    Entries are keyed by absolute path and hash algorithm, and are only trusted
+    while the file's (size, mtime_ns, inode) still match what was recorded.
+    Lookups are served from the database; new digests and LRU touches are
+    buffered in memory and written in one transaction by flush(), which also
+    evicts the least recently used rows beyond max_entries.
+    A second table holds per-directory records (see dir_digest), keyed by
+    absolute path and trusted only while the directory's listing signature
+    still matches.
+    Safe to share between threads.
+    """
+
+    def __init__(self, db_path: str = HASH_CACHE_FILE, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], Tuple[int, int, int, str]] = {}
+        self._touched = set()
+        self._pending_dirs: Dict[Tuple[str, str], Tuple[str, Optional[str], str]] = {}
+        self._touched_dirs = set()
+
+        parent = os.path.dirname(db_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS hashes (
+                path TEXT NOT NULL,
+                algo TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (path, algo)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_hashes_last_used ON hashes(last_used)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT NOT NULL,
+                algo TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                digest TEXT,
+                entries TEXT NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (path, algo)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_dirs_last_used ON dirs(last_used)")
+        self._conn.commit()
+        row = self._conn.execute(
+            "SELECT MAX(COALESCE((SELECT MAX(last_used) FROM hashes), 0), COALESCE((SELECT MAX(last_used) FROM dirs), 0))"
+        ).fetchone()
+        self._clock = row[0]
+
+    def get(self, path: str, st: os.stat_result, algo: str = "md5") -> Optional[str]:
+        key = (path, algo)
+        identity = (st.st_size, st.st_mtime_ns, st.st_ino)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                if pending[:3] == identity:
+                    self.hits += 1
+                    return pending[3]
+                row = None
+            else:
+                row = self._conn.execute(
+                    "SELECT size, mtime_ns, inode, digest FROM hashes WHERE path = ? AND algo = ?", key
+                ).fetchone()
+            if row is not None and tuple(row[:3]) == identity:
+                self.hits += 1
+                self._touched.add(key)
+                return row[3]
+            self.misses += 1
+            return None
+
+    def put(self, path: str, st: os.stat_result, digest: str, algo: str = "md5"):
+        with self._lock:
+            self._pending[(path, algo)] = (st.st_size, st.st_mtime_ns, st.st_ino, digest)
+
+    def hash_file(self, filepath: str, hash_func: Callable[[str], str], algo: str = "md5") -> str:
+        """Returns the cached digest for filepath, computing and recording it with hash_func on a miss."""
+        path = os.path.abspath(filepath)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return hash_func(filepath)
+
+        digest = self.get(path, st, algo)
+        if digest is not None:
+            return digest
+
+        digest = hash_func(filepath)
+        if digest:
+            self.put(path, st, digest, algo)
+        return digest
+
+    def get_dir(self, path: str, signature: str, algo: str) -> Optional[Tuple[Optional[str], Dict[str, str]]]:
+        """(digest, entry digests) recorded for directory path, or None unless it was recorded with this listing signature."""
+        key = (path, algo)
+        with self._lock:
+            pending = self._pending_dirs.get(key)
+            if pending is not None:
+                row = pending
+            else:
+                row = self._conn.execute(
+                    "SELECT signature, digest, entries FROM dirs WHERE path = ? AND algo = ?", key
+                ).fetchone()
+            if row is None or row[0] != signature:
+                return None
+            if pending is None:
+                self._touched_dirs.add(key)
+        return row[1], json.loads(row[2])
+
+    def put_dir(self, path: str, signature: str, digest: Optional[str], entries: Dict[str, str], algo: str):
+        with self._lock:
+            self._pending_dirs[(path, algo)] = (signature, digest, json.dumps(entries, separators=(",", ":")))
+
+    def flush(self):
+        """Writes buffered digests, directory records and LRU touches, then trims each table to max_entries."""
+        with self._lock:
+            if not self._pending and not self._touched and not self._pending_dirs and not self._touched_dirs:
+                return
+            self._clock += 1
+            now = self._clock
+            with self._conn:
+                if self._pending:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO hashes (path, algo, size, mtime_ns, inode, digest, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(p, a, *v, now) for (p, a), v in self._pending.items()]
+                    )
+                if self._touched:
+                    self._conn.executemany(
+                        "UPDATE hashes SET last_used = ? WHERE path = ? AND algo = ?",
+                        [(now, p, a) for p, a in self._touched]
+                    )
+                if self._pending_dirs:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO dirs (path, algo, signature, digest, entries, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(p, a, *v, now) for (p, a), v in self._pending_dirs.items()]
+                    )
+                if self._touched_dirs:
+                    self._conn.executemany(
+                        "UPDATE dirs SET last_used = ? WHERE path = ? AND algo = ?",
+                        [(now, p, a) for p, a in self._touched_dirs]
+                    )
+                self._evict("hashes")
+                self._evict("dirs")
+            self._pending.clear()
+            self._touched.clear()
+            self._pending_dirs.clear()
+            self._touched_dirs.clear()
+
+    def _evict(self, table: str):
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+            directories = self._conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+            return {
+                "entries": entries,
+                "directories": directories,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._touched.clear()
+            self._pending_dirs.clear()
+            self._touched_dirs.clear()
+            with self._conn:
+                self._conn.execute("DELETE FROM hashes")
+                self._conn.execute("DELETE FROM dirs")
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
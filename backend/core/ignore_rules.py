@@ -0,0 +1,158 @@
+"""
+Exclude patterns with .gitignore semantics, compiled once per rule set.
+
+Rules are matched against "/"-separated paths relative to the compare root:
+  name        matches an entry with that name at any depth
+  a/b, /a     contain a slash: anchored to the directory the rule comes from
+  dir/        trailing slash: directories only
+  !rule       re-includes what an earlier rule excluded (the last match wins)
+  **          "**/x", "x/**" and "a/**/b" span any number of directories
+*, ? and [...] never match a slash. All rules of a matcher are merged into
+one regex per entry type, so checking an entry is a single match call
+however many patterns there are.
+"""
+import os
+import re
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Same case rule as fnmatch: case-insensitive where the OS normalizes case
+_FLAGS = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+
+
+def load_ignore_file(filepath: str) -> List[str]:
+    """Pattern lines of an ignore file, without blank lines and comments; [] if it can't be read."""
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+            return [line.rstrip('\r\n') for line in f if line.strip() and not line.startswith('#')]
+    except OSError:
+        return []
+
+
+def parse_ignore_text(text: str) -> List[str]:
+    """Pattern lines of ignore file content that was read elsewhere (e.g. from a remote filesystem)."""
+    return [line.rstrip('\r') for line in text.split('\n') if line.strip() and not line.startswith('#')]
+
+
+class IgnoreRule(NamedTuple):
+    regex: str
+    negated: bool
+    dir_only: bool
+    file_only: bool
+
+
+def parse_rule(pattern: str, base: str = "", dir_only: bool = False, file_only: bool = False) -> Optional[IgnoreRule]:
+    """Compiles one pattern line to a rule relative to base (a directory path, "" for the root); None for blank/comment lines."""
+    while pattern.endswith(" ") and not pattern.endswith("\\ "):
+        pattern = pattern[:-1]
+    if not pattern or pattern.startswith("#"):
+        return None
+    negated = pattern.startswith("!")
+    if negated or pattern.startswith(("\\!", "\\#")):
+        pattern = pattern[1:]
+    if pattern.endswith("/"):
+        dir_only = True
+        pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+
+    anchored = "/" in pattern
+    body = _translate(pattern.lstrip("/"))
+    if not anchored:
+        body = "(?:.*/)?" + body
+    prefix = re.escape(base.replace(os.sep, "/")) + "/" if base else ""
+    return IgnoreRule(prefix + body, negated, dir_only, file_only)
+
+
+def _translate(pattern: str) -> str:
+    parts = pattern.split("/")
+    out = []
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == "**":
+            # Trailing: everything inside; elsewhere: zero or more directories
+            out.append(".+" if last else "(?:[^/]*/)*")
+        else:
+            out.append(_translate_segment(part) + ("" if last else "/"))
+    return "".join(out)
+
+
+def _translate_segment(seg: str) -> str:
+    out = []
+    i, n = 0, len(seg)
+    while i < n:
+        c = seg[i]
+        i += 1
+        if c == "*":
+            while i < n and seg[i] == "*":
+                i += 1
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "\\" and i < n:
+            out.append(re.escape(seg[i]))
+            i += 1
+        elif c == "[":
+            j = i
+            if j < n and seg[j] in "!^":
+                j += 1
+            if j < n and seg[j] == "]":
+                j += 1
+            while j < n and seg[j] != "]":
+                j += 1
+            if j >= n:
+                out.append("\\[")
+                continue
+            chars = seg[i:j].replace("\\", "\\\\")
+            i = j + 1
+            if chars[:1] in ("!", "^"):
+                chars = "^" + chars[1:]
+            out.append(f"[{chars}]")
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+def _compile(rules: List[IgnoreRule]) -> Tuple[Optional["re.Pattern"], Tuple[bool, ...]]:
+    if not rules:
+        return None, ()
+    # Alternatives are tried in order, so putting the latest rule first makes the last match win
+    ordered = rules[::-1]
+    regex = re.compile("|".join(f"({rule.regex})" for rule in ordered), _FLAGS)
+    return regex, tuple(rule.negated for rule in ordered)
+
+
+class IgnoreMatcher:
+    """An immutable, compiled rule set. extend() returns a new matcher for a subdirectory's own ignore file."""
+
+    def __init__(self, rules: Sequence[IgnoreRule] = ()):
+        self.rules = tuple(rules)
+        self._dir_re, self._dir_negated = _compile([r for r in self.rules if not r.file_only])
+        self._file_re, self._file_negated = _compile([r for r in self.rules if not r.dir_only])
+
+    @classmethod
+    def from_excludes(cls, exclude_files: Iterable[str] = (), exclude_folders: Iterable[str] = ()) -> "IgnoreMatcher":
+        """The compare request's lists: exclude_files patterns apply to files only, exclude_folders to directories only."""
+        rules = [parse_rule(p, file_only=True) for p in exclude_files]
+        rules += [parse_rule(p, dir_only=True) for p in exclude_folders]
+        return cls([r for r in rules if r is not None])
+
+    def extend(self, patterns: Iterable[str], base: str) -> "IgnoreMatcher":
+        """Adds the lines of an ignore file found in directory base; they take precedence over the existing rules."""
+        rules = [r for r in (parse_rule(p, base) for p in patterns) if r is not None]
+        return IgnoreMatcher(self.rules + tuple(rules)) if rules else self
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def is_excluded(self, rel_path: str, is_dir: bool) -> bool:
+        """rel_path is relative to the compare root; os.sep is accepted as separator."""
+        if is_dir:
+            regex, negated = self._dir_re, self._dir_negated
+        else:
+            regex, negated = self._file_re, self._file_negated
+        if regex is None:
+            return False
+        if os.sep != "/":
+            rel_path = rel_path.replace(os.sep, "/")
+        match = regex.fullmatch(rel_path)
+        return match is not None and not negated[match.lastindex - 1]
@@ -0,0 +1,204 @@
+"""
+Background jobs for long-running operations (compare, diff, batch copy and
+delete), so requests don't hold a server thread while they run.
+
+Each job type has its own concurrency limit; pending jobs start in priority
+order (lower first) as slots free up. Submitting a request identical to one
+still pending or running returns that job instead of starting another.
+Finished jobs, with their results, are kept for a TTL.
+"""
+import time
+import uuid
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_RESULT_TTL_SECONDS = 600
+# Concurrent jobs per type; types not listed get DEFAULT_TYPE_LIMIT
+DEFAULT_TYPE_LIMITS = {"diff": 4, "compare": 2, "batch-copy": 1, "batch-delete": 1, "manifest": 1}
+DEFAULT_TYPE_LIMIT = 1
+# Lower runs first: interactive diffs ahead of file operations ahead of folder compares
+DEFAULT_PRIORITIES = {"diff": 0, "batch-copy": 5, "batch-delete": 5, "compare": 10, "manifest": 10}
+DEFAULT_PRIORITY = 5
+
+JOB_STATES = ("pending", "running", "done", "failed", "cancelled")
+
+
+def parse_job_limits(spec: str) -> Dict[str, int]:
+    """Parses "compare=2,diff=4" into {"compare": 2, "diff": 4}."""
+    limits = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, sep, value = part.partition("=")
+        if not sep or not value.strip().isdigit():
+            raise ValueError(f"Invalid job limit: {part!r} (expected type=count)")
+        limits[name.strip()] = int(value)
+    return limits
+
+
+class Job:
+    """
+    One submitted operation. The function receives the job: it can report
+    progress through job.progress and should stop early once job.cancelled
+    is set; a job whose cancellation was requested ends as "cancelled" and
+    its result is discarded.
+    """
+
+    def __init__(self, job_type: str, fn: Callable[["Job"], Any], key: Optional[str], priority: int, seq: int):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.fn = fn
+        self.key = key
+        self.priority = priority
+        self.seq = seq
+        self.state = "pending"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.progress: Dict[str, Any] = {}
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancelled = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("done", "failed", "cancelled")
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "state": self.state,
+            "priority": self.priority,
+            "error": self.error,
+            "progress": dict(self.progress),
+            "cancel_requested": self.cancelled.is_set(),
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobScheduler:
+    def __init__(self, limits: Optional[Dict[str, int]] = None, priorities: Optional[Dict[str, int]] = None,
+                 result_ttl: float = DEFAULT_RESULT_TTL_SECONDS):
+        self.limits = {**DEFAULT_TYPE_LIMITS, **(limits or {})}
+        self.priorities = {**DEFAULT_PRIORITIES, **(priorities or {})}
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._pending: List[Job] = []
+        self._running: Dict[str, int] = {}
+        self._inflight: Dict[str, Job] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def submit(self, job_type: str, fn: Callable[[Job], Any], key: Optional[str] = None,
+               priority: Optional[int] = None) -> Tuple[Job, bool]:
+        """
+        Queues fn(job) and returns (job, deduplicated). With a key, a pending or
+        running job with the same key is returned instead (deduplicated=True);
+        a pending one is moved up if the new request has a higher priority.
+        """
+        if priority is None:
+            priority = self.priorities.get(job_type, DEFAULT_PRIORITY)
+        with self._lock:
+            self._expire()
+            if key is not None:
+                existing = self._inflight.get(key)
+                if existing is not None:
+                    if existing.state == "pending":
+                        existing.priority = min(existing.priority, priority)
+                    return existing, True
+            self._seq += 1
+            job = Job(job_type, fn, key, priority, self._seq)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            if key is not None:
+                self._inflight[key] = job
+            to_start = self._dispatch()
+        self._start(to_start)
+        return job, False
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            self._expire()
+            return sorted(self._jobs.values(), key=lambda j: j.seq)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """A pending job is cancelled at once; a running one is asked to stop."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return job
+            job.cancelled.set()
+            # A cancelled job no longer answers identical new requests
+            self._forget_key(job)
+            if job.state == "pending":
+                self._pending.remove(job)
+                job.state = "cancelled"
+                job.finished = time.time()
+            return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limits": dict(self.limits),
+                "running": {t: n for t, n in self._running.items() if n},
+                "pending": len(self._pending),
+                "retained": len(self._jobs),
+                "result_ttl": self.result_ttl,
+            }
+
+    def _dispatch(self) -> List[Job]:
+        """Moves the highest-priority pending jobs whose type has a free slot to running. Caller holds the lock."""
+        to_start = []
+        for job in sorted(self._pending, key=lambda j: (j.priority, j.seq)):
+            running = self._running.get(job.type, 0)
+            if running >= self.limits.get(job.type, DEFAULT_TYPE_LIMIT):
+                continue
+            self._running[job.type] = running + 1
+            self._pending.remove(job)
+            job.state = "running"
+            job.started = time.time()
+            to_start.append(job)
+        return to_start
+
+    def _start(self, jobs: List[Job]):
+        for job in jobs:
+            threading.Thread(target=self._run, args=(job,), name=f"Job-{job.type}-{job.id[:8]}", daemon=True).start()
+
+    def _run(self, job: Job):
+        result, error = None, None
+        try:
+            result = job.fn(job)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+
+        with self._lock:
+            if job.cancelled.is_set():
+                job.state = "cancelled"
+            elif error is not None:
+                job.state, job.error = "failed", error
+            else:
+                job.state, job.result = "done", result
+            job.finished = time.time()
+            job.fn = None
+            self._running[job.type] -= 1
+            self._forget_key(job)
+            to_start = self._dispatch()
+        self._start(to_start)
+
+    def _forget_key(self, job: Job):
+        if job.key is not None and self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+
+    def _expire(self):
+        """Drops finished jobs older than the TTL. Caller holds the lock."""
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, j in self._jobs.items() if j.finished is not None and j.finished < cutoff]:
+            del self._jobs[job_id]
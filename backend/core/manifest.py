@@ -0,0 +1,157 @@
+"""
+Snapshot manifests: a tree's entries with their sizes, mtimes and content
+digests, saved to a file that a compare can use in place of that tree.
+
+File format: gzip-compressed lines of UTF-8 JSON. The first line is the header:
+  {"format": "jfm-manifest", "version": 1, "root", "algo", "symlinks", "created", "entries"}
+and every further line is one entry, parents before children:
+  [path, is_dir, size, mtime_ns, digest, link_target]
+Paths are relative to the root with "/" separators. digest is "" for
+directories, links and files that could not be read.
+"""
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from .compare_policy import EntryInfo
+from .file_equality import DIGEST_ALGO, file_digest
+
+MANIFEST_FORMAT = "jfm-manifest"
+MANIFEST_VERSION = 1
+
+_ROOT_INFO = EntryInfo(True, 0, 0)
+
+
+class Manifest:
+    """
+    A loaded snapshot, indexed by directory: rel dir -> name -> (info, digest).
+    Read-only once built, so one instance can serve any number of compares.
+    """
+
+    def __init__(self, root: str, algo: str = DIGEST_ALGO, symlinks: str = "follow", created: Optional[float] = None):
+        self.root = root
+        self.algo = algo
+        self.symlinks = symlinks
+        self.created = time.time() if created is None else created
+        self.dirs: Dict[str, Dict[str, Tuple[EntryInfo, str]]] = {"": {}}
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.root.rstrip("/\\")) or self.root
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.dirs.values())
+
+    def add(self, rel_path: str, info: EntryInfo, digest: str = ""):
+        parent, name = os.path.split(rel_path)
+        self.dirs.setdefault(parent, {})[name] = (info, digest)
+        if info.is_dir:
+            self.dirs.setdefault(rel_path, {})
+
+    def stat(self, rel_path: str) -> Optional[EntryInfo]:
+        if not rel_path:
+            return _ROOT_INFO
+        parent, name = os.path.split(rel_path)
+        entry = self.dirs.get(parent, {}).get(name)
+        return entry[0] if entry else None
+
+    def listing(self, rel_dir: str) -> Dict[str, Tuple[EntryInfo, str]]:
+        """name -> (info, digest) of one directory; empty if it is not in the manifest."""
+        return self.dirs.get(rel_dir, {})
+
+    def iter_entries(self) -> Iterator[Tuple[str, EntryInfo, str]]:
+        """(rel path, info, digest) of every entry, parents before children."""
+        pending = [""]
+        while pending:
+            rel_dir = pending.pop()
+            for name, (info, digest) in sorted(self.dirs.get(rel_dir, {}).items()):
+                rel_path = os.path.join(rel_dir, name)
+                yield rel_path, info, digest
+                if info.is_dir:
+                    pending.append(rel_path)
+
+    def save(self, path: str) -> int:
+        """Writes the manifest file (atomically) and returns its size in bytes."""
+        header = {
+            "format": MANIFEST_FORMAT,
+            "version": MANIFEST_VERSION,
+            "root": self.root,
+            "algo": self.algo,
+            "symlinks": self.symlinks,
+            "created": self.created,
+            "entries": len(self),
+        }
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
+                f.write(json.dumps(header) + "\n")
+                for rel_path, info, digest in self.iter_entries():
+                    row = [rel_path.replace(os.sep, "/"), int(info.is_dir), info.size, info.mtime_ns, digest, info.link_target]
+                    f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return os.path.getsize(path)
+
+    @classmethod
+    def load(cls, path: str) -> "Manifest":
+        """Raises ValueError if path is not a manifest this server can compare against."""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8", errors="surrogateescape") as f:
+                header = _read_header(f.readline())
+                if header.get("algo") != DIGEST_ALGO:
+                    raise ValueError(f"Manifest digests use {header.get('algo')}; this server hashes with {DIGEST_ALGO}")
+                manifest = cls(header["root"], header["algo"], header.get("symlinks", "follow"), header.get("created"))
+                for line in f:
+                    rel_path, is_dir, size, mtime_ns, digest, link_target = json.loads(line)
+                    if os.sep != "/":
+                        rel_path = rel_path.replace("/", os.sep)
+                    manifest.add(rel_path, EntryInfo(bool(is_dir), size, mtime_ns, link_target), digest)
+        except (OSError, EOFError, json.JSONDecodeError, KeyError, TypeError) as e:
+            raise ValueError(f"Not a readable manifest file: {e}")
+        return manifest
+
+
+def _read_header(line: str) -> dict:
+    try:
+        header = json.loads(line)
+    except json.JSONDecodeError:
+        header = None
+    if not isinstance(header, dict) or header.get("format") != MANIFEST_FORMAT:
+        raise ValueError("Not a manifest file")
+    if header.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version: {header.get('version')}")
+    return header
+
+
+def build_manifest(root: str, scan: Iterator[Tuple[str, EntryInfo]], hash_file: Optional[Callable[[str], str]] = None,
+                   workers: int = 1, symlinks: str = "follow") -> Manifest:
+    """
+    Manifest of root from the (rel path, info) entries of a CompareEngine.scan(),
+    hashing every regular file on `workers` threads.
+    """
+    hash_file = hash_file or (lambda path: file_digest(path, DIGEST_ALGO))
+    manifest = Manifest(os.path.abspath(root), DIGEST_ALGO, symlinks)
+    files: List[Tuple[str, EntryInfo]] = []
+    for rel_path, info in scan:
+        if info.is_dir or info.link_target is not None:
+            manifest.add(rel_path, info)
+        else:
+            files.append((rel_path, info))
+
+    def digest(rel_path: str) -> str:
+        try:
+            return hash_file(os.path.join(root, rel_path))
+        except OSError:
+            return ""
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="manifest") as pool:
+        for (rel_path, info), value in zip(files, pool.map(digest, [rel for rel, _ in files])):
+            manifest.add(rel_path, info, value or "")
+    return manifest
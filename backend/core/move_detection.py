@@ -0,0 +1,123 @@
+"""
+Move/rename detection after the compare walk.
+
+Files that exist on one side only are paired up by content: they are
+bucketed by size, and only buckets with files on both sides are hashed, so
+the work grows with the number of unmatched files, not with the tree.
+A left-only file and a right-only file with the same digest become a pair:
+"renamed" if both are in the same directory, "moved" otherwise.
+"""
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from ..models import FileNode
+from .file_equality import DIGEST_ALGO, file_digest
+
+# Empty files all look alike; pairing them would be noise
+MIN_MOVE_SIZE = 1
+
+# (left path, right path, "moved" | "renamed")
+MovePair = Tuple[str, str, str]
+
+
+def find_moves(left_root: str, right_root: str, removed: List[str], added: List[str],
+               hash_file: Optional[Callable[[str], str]] = None, workers: int = 1) -> List[MovePair]:
+    """
+    Pairs left-only paths (removed) with right-only paths (added) of identical
+    content. Each file is in at most one pair; among equal candidates, the same
+    name is preferred, then the same directory, then path order.
+    """
+    if not removed or not added:
+        return []
+    hash_file = hash_file or (lambda path: file_digest(path, DIGEST_ALGO))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="moves") as pool:
+        left_sizes = _by_size(pool, left_root, removed)
+        right_sizes = _by_size(pool, right_root, added)
+        sizes = left_sizes.keys() & right_sizes.keys()
+        if not sizes:
+            return []
+
+        candidates = [(left_root, rel, "left") for size in sizes for rel in left_sizes[size]]
+        candidates += [(right_root, rel, "right") for size in sizes for rel in right_sizes[size]]
+        digests = pool.map(lambda c: hash_file(os.path.join(c[0], c[1])), candidates)
+        groups: Dict[str, Tuple[List[str], List[str]]] = defaultdict(lambda: ([], []))
+        for (_, rel, side), digest in zip(candidates, digests):
+            if digest:
+                groups[digest][0 if side == "left" else 1].append(rel)
+
+    pairs = []
+    for lefts, rights in groups.values():
+        if lefts and rights:
+            pairs.extend(_pair_up(sorted(lefts), sorted(rights)))
+    pairs.sort()
+    return pairs
+
+
+def _by_size(pool, root: str, paths: List[str]) -> Dict[int, List[str]]:
+    def size(rel):
+        try:
+            return os.path.getsize(os.path.join(root, rel))
+        except OSError:
+            return -1
+
+    buckets = defaultdict(list)
+    for rel, n in zip(paths, pool.map(size, paths)):
+        if n >= MIN_MOVE_SIZE:
+            buckets[n].append(rel)
+    return buckets
+
+
+def _pair_up(lefts: List[str], rights: List[str]) -> List[MovePair]:
+    pairs = []
+    for same in (
+        lambda l, r: os.path.basename(l) == os.path.basename(r),
+        lambda l, r: os.path.dirname(l) == os.path.dirname(r),
+        lambda l, r: True,
+    ):
+        for left in list(lefts):
+            right = next((r for r in rights if same(left, r)), None)
+            if right is not None:
+                lefts.remove(left)
+                rights.remove(right)
+                pairs.append((left, right, "renamed" if os.path.dirname(left) == os.path.dirname(right) else "moved"))
+    return pairs
+
+
+class MoveDetector:
+    """
+    Collects the one-sided files of a CompareEngine.walk() as it passes
+    through watch(), then pairs them with detect() and marks the nodes.
+    """
+
+    def __init__(self, left_root: str, right_root: str, hash_file: Optional[Callable[[str], str]] = None, workers: int = 1):
+        self.left_root = left_root
+        self.right_root = right_root
+        self.hash_file = hash_file
+        self.workers = workers
+        self.removed: Dict[str, FileNode] = {}
+        self.added: Dict[str, FileNode] = {}
+
+    def watch(self, walk: Iterator[Tuple[FileNode, Optional[List[FileNode]]]]):
+        for node, children in walk:
+            for child in children or []:
+                if child.type == "file":
+                    if child.status == "removed":
+                        self.removed[child.path] = child
+                    elif child.status == "added":
+                        self.added[child.path] = child
+            yield node, children
+
+    def detect(self) -> List[MovePair]:
+        """
+        Finds the pairs and updates their nodes: both get the pair's status,
+        the left-only one moved_to and the right-only one moved_from.
+        """
+        pairs = find_moves(self.left_root, self.right_root, list(self.removed), list(self.added), self.hash_file, self.workers)
+        for left, right, status in pairs:
+            source, target = self.removed[left], self.added[right]
+            source.status = target.status = status
+            source.moved_to = right
+            target.moved_from = left
+        return pairs
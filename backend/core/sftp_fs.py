@@ -0,0 +1,225 @@
+"""
+SFTP adapter (see filesystem), on paramiko.
+
+One SSH connection per adapter carries a pool of SFTP channels, so
+concurrent requests share the login but not a channel. Reads are
+prefetched (many read requests in flight at once) and writes pipelined.
+Digests are computed on the server with sha256sum / sha1sum / md5sum over
+an exec channel when the account may run them; that is probed once.
+
+URL options (query string): connections=N (pooled channels),
+host_keys=strict|accept-new (unknown host keys are rejected unless
+accept-new), hash=auto|off, timeout=seconds.
+"""
+import os
+import posixpath
+import shlex
+import stat
+import threading
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+from .compare_policy import EntryInfo
+from .filesystem import DEFAULT_CONNECTIONS, ConnectionPool, FileSystem, PooledReader, connection_lost, remote_url
+
+try:
+    import paramiko
+except ImportError:  # optional, only needed for sftp:// paths
+    paramiko = None
+
+DEFAULT_PORT = 22
+DEFAULT_TIMEOUT = 30
+
+# Digest commands probed on the server, most preferred first: algo -> command
+HASH_COMMANDS = (("sha256", "sha256sum"), ("sha1", "sha1sum"), ("md5", "md5sum"))
+
+_DIR_INFO = EntryInfo(True, 0, 0)
+
+
+class SftpFileSystem(FileSystem):
+    scheme = "sftp"
+
+    def __init__(self, host: str, port: Optional[int] = None, user: Optional[str] = None, password: Optional[str] = None,
+                 connections: int = DEFAULT_CONNECTIONS, host_keys: str = "strict", hash: str = "auto", timeout: float = DEFAULT_TIMEOUT):
+        if paramiko is None:
+            raise ValueError("sftp:// paths need paramiko (pip install paramiko)")
+        if host_keys not in ("strict", "accept-new"):
+            raise ValueError(f"Unknown host_keys option: {host_keys}")
+        self.host = host
+        self.port = port or DEFAULT_PORT
+        self.user = user
+        self._password = password
+        self.host_keys = host_keys
+        self.timeout = float(timeout)
+        self._hash = hash
+        self._algos: Optional[Tuple[str, ...]] = None
+        self._client = None
+        self._lock = threading.Lock()
+        self.pool = ConnectionPool(self._open_channel, lambda sftp: sftp.close(), int(connections),
+                                   alive=lambda sftp: not sftp.sock.closed)
+
+    def url(self, path: str) -> str:
+        return remote_url(self.scheme, self.host, self.port if self.port != DEFAULT_PORT else None, self.user, path)
+
+    def _transport(self):
+        """The SSH connection, opened (again) if it is not up."""
+        with self._lock:
+            transport = self._client.get_transport() if self._client is not None else None
+            if transport is None or not transport.is_active():
+                if self._client is not None:
+                    self._client.close()
+                client = paramiko.SSHClient()
+                client.load_system_host_keys()
+                if self.host_keys == "accept-new":
+                    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                try:
+                    client.connect(self.host, self.port, username=self.user, password=self._password, timeout=self.timeout,
+                                   banner_timeout=self.timeout, auth_timeout=self.timeout)
+                except paramiko.SSHException as e:
+                    raise ConnectionRefusedError(f"SFTP connection to {self.host} failed: {e}")
+                self._client = client
+                transport = client.get_transport()
+            return transport
+
+    def _open_channel(self):
+        return paramiko.SFTPClient.from_transport(self._transport())
+
+    def stat(self, path: str) -> Optional[EntryInfo]:
+        try:
+            attrs = self.pool.call(lambda sftp: sftp.stat(path))
+        except FileNotFoundError:
+            return None
+        return _info(attrs)
+
+    def listdir(self, path: str, symlinks: str = "follow") -> Dict[str, EntryInfo]:
+        return self.pool.call(self._listdir, path, symlinks)
+
+    def _listdir(self, sftp, path: str, symlinks: str) -> Dict[str, EntryInfo]:
+        found = {}
+        # One READDIR round trip per batch of entries, with their attributes
+        for attrs in sftp.listdir_attr(path):
+            name = attrs.filename
+            if not stat.S_ISLNK(attrs.st_mode or 0):
+                found[name] = _info(attrs)
+                continue
+            if symlinks == "skip":
+                continue
+            child = posixpath.join(path, name)
+            try:
+                if symlinks == "follow":
+                    found[name] = _info(sftp.stat(child))
+                    continue
+            except OSError as e:
+                if connection_lost(e):
+                    raise
+            # Compared as a link (dangling ones too when following)
+            try:
+                found[name] = EntryInfo(False, attrs.st_size or 0, (attrs.st_mtime or 0) * 1_000_000_000, sftp.readlink(child))
+            except OSError as e:
+                if connection_lost(e):
+                    raise
+        return found
+
+    def open_read(self, path: str, offset: int = 0) -> BinaryIO:
+        def open_stream(sftp):
+            f = sftp.open(path, "rb")
+            if offset:
+                f.seek(offset)
+            else:
+                f.prefetch()
+            return f
+        return PooledReader(self.pool, open_stream)
+
+    def write_chunks(self, path: str, chunks: Iterable[bytes]):
+        # A name no user file has, next to the target so the rename stays on one volume
+        temp_path = posixpath.join(posixpath.dirname(path), ".%s.%s.tmp" % (posixpath.basename(path), os.urandom(6).hex()))
+        with self.pool.connection() as sftp:
+            try:
+                with sftp.open(temp_path, "wb") as f:
+                    f.set_pipelined(True)
+                    for chunk in chunks:
+                        f.write(chunk)
+                try:
+                    sftp.posix_rename(temp_path, path)
+                except IOError as e:
+                    if connection_lost(e):
+                        raise
+                    # Servers without the posix-rename extension refuse to rename over a file
+                    sftp.remove(path)
+                    sftp.rename(temp_path, path)
+            except BaseException:
+                try:
+                    sftp.remove(temp_path)
+                except Exception:
+                    pass
+                raise
+
+    def makedirs(self, path: str):
+        def makedirs(sftp):
+            missing = []
+            current = path.rstrip("/") or "/"
+            while current != "/":
+                try:
+                    if stat.S_ISDIR(sftp.stat(current).st_mode):
+                        break
+                    raise NotADirectoryError(current)
+                except FileNotFoundError:
+                    missing.append(current)
+                    current = posixpath.dirname(current) or "/"
+            for directory in reversed(missing):
+                sftp.mkdir(directory)
+        self.pool.call(makedirs)
+
+    def remove(self, path: str):
+        self.pool.call(lambda sftp: sftp.remove(path))
+
+    def rmdir(self, path: str):
+        self.pool.call(lambda sftp: sftp.rmdir(path))
+
+    def remote_algos(self, path: str) -> Tuple[str, ...]:
+        if self._algos is None:
+            self._algos = self._probe_hash_commands() if self._hash == "auto" else ()
+        return self._algos
+
+    def _probe_hash_commands(self) -> Tuple[str, ...]:
+        found = []
+        for algo, command in HASH_COMMANDS:
+            try:
+                status, _ = self._exec(f"{command} /dev/null")
+            except Exception:
+                # Exec channels not allowed (e.g. an sftp-only account)
+                return ()
+            if status == 0:
+                found.append(algo)
+        return tuple(found)
+
+    def remote_digest(self, path: str, algo: str) -> str:
+        command = dict(HASH_COMMANDS)[algo]
+        status, output = self._exec(f"{command} -- {shlex.quote(path)}")
+        if status != 0 or not output:
+            return ""
+        # "<digest>  <name>", with a leading backslash when the name had to be escaped
+        return output.split(None, 1)[0].lstrip(b"\\").decode("ascii", "replace").lower()
+
+    def _exec(self, command: str) -> Tuple[int, bytes]:
+        channel = self._transport().open_session(timeout=self.timeout)
+        try:
+            channel.settimeout(self.timeout)
+            channel.exec_command(command)
+            with channel.makefile("rb") as stdout:
+                output = stdout.read()
+            return channel.recv_exit_status(), output
+        finally:
+            channel.close()
+
+    def close(self):
+        self.pool.close()
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+def _info(attrs) -> EntryInfo:
+    if stat.S_ISDIR(attrs.st_mode or 0):
+        return _DIR_INFO
+    # SFTP v3 carries whole seconds
+    return EntryInfo(False, attrs.st_size or 0, (attrs.st_mtime or 0) * 1_000_000_000)
@@ -0,0 +1,140 @@
+import os
+import threading
+from typing import Callable, List, Optional, Set
+from ..models import FileNode
+from ..comparator import compare_folders
+from .compare_session import CompareSession
+from .watcher import TreeWatcher, create_watcher
+
+
+class WatchSession(CompareSession):
+    """
+    A compare session that keeps its full result tree up to date.
+
+    Both roots are watched (inotify, or polling as a fallback). When entries of
+    a directory change, only that directory is compared again: its direct
+    children are re-listed and re-checked, and subdirectories that still exist
+    keep their previous subtrees (their own changes arrive as separate events).
+    Every refresh is published to the subscribers as an event dict:
+      {"kind": "update", "path": <dir>, "node": <new subtree>}
+      {"kind": "reset", "node": <whole tree>}  (after a watcher overflow)
+    """
+
+    def __init__(self, left_root: str, right_root: str, exclude_files: List[str], exclude_folders: List[str], compare_mode: str,
+                 workers: int = 1, hash_cache=None, polling: bool = False, ignore_file_names: List[str] = (), symlinks: str = "follow"):
+        super().__init__(left_root, right_root, exclude_files, exclude_folders, compare_mode, ignore_file_names, symlinks)
+        self.workers = workers
+        self.hash_cache = hash_cache
+        self.version = 0
+        self._subscribers: List[Callable[[dict], None]] = []
+        self._subscribers_lock = threading.Lock()
+
+        self.tree = self._compare()
+        self.tree.session_id = self.id
+        self.watcher: TreeWatcher = create_watcher([left_root, right_root], self._on_change, polling=polling)
+        self._watch_subtree(self.tree)
+        self.watcher.start()
+
+    def subscribe(self, callback: Callable[[dict], None]) -> Callable[[], None]:
+        """Registers callback for refresh events (called on the watcher thread). Returns an unsubscribe function."""
+        with self._subscribers_lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._subscribers_lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def close(self):
+        self.watcher.stop()
+
+    def _compare(self, rel_path: str = "", max_depth: Optional[int] = None) -> FileNode:
+        return compare_folders(
+            self.left_root, self.right_root, self.exclude_files, self.exclude_folders,
+            workers=self.workers, hash_cache=self.hash_cache, compare_mode=self.compare_mode,
+            rel_path=rel_path, max_depth=max_depth, ignore_file_names=self.ignore_file_names,
+            symlinks=self.symlinks
+        )
+
+    def _watch_subtree(self, node: FileNode):
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.type == "directory":
+                self.watcher.watch(current.path)
+                stack.extend(current.children or [])
+
+    def _on_change(self, rel_dirs: Optional[Set[str]]):
+        if rel_dirs is None:
+            with self.lock:
+                self.tree = self._compare()
+                self.tree.session_id = self.id
+                self.version += 1
+                self._watch_subtree(self.tree)
+                event = {"kind": "reset", "version": self.version, "node": self.tree.model_dump()}
+            self._publish(event)
+            return
+
+        # Parents first: a refresh keeps the subtrees below it, so changed
+        # subdirectories in the same batch are refreshed after it on their own
+        for rel_dir in sorted(rel_dirs, key=lambda d: (d.count(os.sep) if d else -1, d)):
+            with self.lock:
+                node = self._refresh_dir(rel_dir)
+                if node is None:
+                    continue
+                self.version += 1
+                event = {"kind": "update", "version": self.version, "path": node.path, "node": node.model_dump()}
+            self._publish(event)
+
+    def _refresh_dir(self, rel_dir: str) -> Optional[FileNode]:
+        # A directory gone from both sides is refreshed through its parent's listing
+        while rel_dir and not any(os.path.isdir(os.path.join(root, rel_dir)) for root in (self.left_root, self.right_root)):
+            rel_dir = os.path.dirname(rel_dir)
+
+        old, parent = self._find(rel_dir)
+        if old is None and rel_dir:
+            # Not in the tree (e.g. excluded or created and gone again); refresh the nearest known ancestor
+            return self._refresh_dir(os.path.dirname(rel_dir))
+
+        new = self._compare(rel_dir, max_depth=1)
+        old_children = {c.name: c for c in (old.children or [])} if old is not None else {}
+        for child in new.children or []:
+            if child.type != "directory":
+                continue
+            previous = old_children.get(child.name)
+            if previous is not None and previous.type == "directory" and previous.status == child.status and previous.children is not None:
+                child.children = previous.children
+            else:
+                child.children = self._compare(child.path).children
+            child.unexplored = None
+            child.hint = None
+
+        if parent is None:
+            new.session_id = self.id
+            self.tree = new
+        else:
+            parent.children = [new if c.name == new.name else c for c in parent.children]
+        self._watch_subtree(new)
+        return new
+
+    def _find(self, rel_dir: str):
+        """Returns (node, parent) for rel_dir, or (None, None) if it is not in the tree."""
+        node, parent = self.tree, None
+        if not rel_dir:
+            return node, parent
+        for part in rel_dir.split(os.sep):
+            match = next((c for c in (node.children or []) if c.name == part), None)
+            if match is None:
+                return None, None
+            node, parent = match, node
+        return node, parent
+
+    def _publish(self, event: dict):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Watch subscriber failed: {e}")
@@ -0,0 +1,236 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+# Called with the set of relative directory paths whose direct entries changed.
+# None means the watcher lost track (queue overflow) and everything must be rescanned.
+ChangeCallback = Callable[[Optional[Set[str]]], None]
+
+DEBOUNCE_SECONDS = 0.2
+# Upper bound on the coalescing delay while events keep arriving (e.g. a log being written)
+MAX_DEBOUNCE_SECONDS = 1.0
+POLL_INTERVAL_SECONDS = 2.0
+
+
+class TreeWatcher:
+    """
+    Watches a set of directories under one or more roots and reports which
+    relative directories changed. Events are coalesced until none arrived for
+    DEBOUNCE_SECONDS, but for at most MAX_DEBOUNCE_SECONDS, before the
+    callback runs on the watcher thread.
+    """
+
+    def __init__(self, roots: Iterable[str], on_change: ChangeCallback):
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.on_change = on_change
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, rel_dir: str):
+        """Start watching rel_dir under every root where it exists as a directory."""
+        raise NotImplementedError
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class InotifyWatcher(TreeWatcher):
+    """Linux inotify through libc; one watch per directory per root."""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = os.O_CLOEXEC
+
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+    # Events on the watched directory itself: the parent listing has to be refreshed
+    SELF_EVENTS = IN_DELETE_SELF | IN_MOVE_SELF
+
+    _EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, roots: Iterable[str], on_change: ChangeCallback):
+        super().__init__(roots, on_change)
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._wd_map: Dict[int, Tuple[str, str]] = {}  # watch descriptor -> (root, relative directory)
+        self._watched: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def watch(self, rel_dir: str):
+        for root in self.roots:
+            abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+            with self._lock:
+                if (root, rel_dir) in self._watched:
+                    continue
+                wd = self._libc.inotify_add_watch(self._fd, os.fsencode(abs_dir), self.WATCH_MASK)
+                if wd < 0:
+                    # Missing on this side, not a directory, or out of watches (fs.inotify.max_user_watches)
+                    continue
+                self._wd_map[wd] = (root, rel_dir)
+                self._watched.add((root, rel_dir))
+
+    def stop(self):
+        super().stop()
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        changed: Set[str] = set()
+        overflow = False
+        first = deadline = None
+
+        while not self._stop.is_set():
+            timeout_ms = 500 if deadline is None else max(0, int((deadline - time.monotonic()) * 1000))
+            if poller.poll(timeout_ms):
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except OSError as e:
+                    if e.errno == errno.EAGAIN:
+                        continue
+                    return
+                overflow |= self._parse(data, changed)
+                now = time.monotonic()
+                if first is None:
+                    first = now
+                deadline = min(now + DEBOUNCE_SECONDS, first + MAX_DEBOUNCE_SECONDS)
+
+            if deadline is not None and time.monotonic() >= deadline:
+                batch, changed = changed, set()
+                first = deadline = None
+                if overflow:
+                    overflow = False
+                    self.on_change(None)
+                elif batch:
+                    self.on_change(batch)
+
+    def _parse(self, data: bytes, changed: Set[str]) -> bool:
+        overflow = False
+        offset = 0
+        while offset + self._EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = self._EVENT_HEADER.unpack_from(data, offset)
+            offset += self._EVENT_HEADER.size + name_len
+
+            if mask & self.IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            with self._lock:
+                watched = self._wd_map.get(wd)
+                if watched is not None and mask & self.IN_IGNORED:
+                    # The kernel dropped the watch (directory deleted or unmounted)
+                    del self._wd_map[wd]
+                    self._watched.discard(watched)
+            if watched is None or mask & self.IN_IGNORED:
+                continue
+            rel_dir = watched[1]
+            if mask & self.SELF_EVENTS:
+                changed.add(os.path.dirname(rel_dir) if rel_dir else rel_dir)
+            else:
+                changed.add(rel_dir)
+        return overflow
+
+
+class PollingWatcher(TreeWatcher):
+    """Fallback for platforms without inotify: re-stats every watched directory each interval."""
+
+    def __init__(self, roots: Iterable[str], on_change: ChangeCallback, interval: float = POLL_INTERVAL_SECONDS):
+        super().__init__(roots, on_change)
+        self.interval = interval
+        self._snapshots: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def watch(self, rel_dir: str):
+        with self._lock:
+            if rel_dir not in self._snapshots:
+                self._snapshots[rel_dir] = self._snapshot(rel_dir)
+
+    def _snapshot(self, rel_dir: str) -> tuple:
+        sides = []
+        for root in self.roots:
+            entries = []
+            try:
+                with os.scandir(os.path.join(root, rel_dir) if rel_dir else root) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            # Subdirectories are polled on their own; their mtime would only add noise here
+                            entries.append((entry.name, True, 0, 0))
+                            continue
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((entry.name, False, st.st_size, st.st_mtime_ns))
+            except OSError:
+                entries = None
+            sides.append(frozenset(entries) if entries is not None else None)
+        return tuple(sides)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                watched = list(self._snapshots.items())
+            changed = set()
+            for rel_dir, previous in watched:
+                current = self._snapshot(rel_dir)
+                if current != previous:
+                    changed.add(rel_dir)
+                    with self._lock:
+                        self._snapshots[rel_dir] = current
+            # Directories that disappeared stop being polled; their parent reports the removal
+            with self._lock:
+                for rel_dir in changed:
+                    if all(side is None for side in self._snapshots.get(rel_dir, ())):
+                        self._snapshots.pop(rel_dir, None)
+            if changed:
+                self.on_change(changed)
+
+
+def _load_libc():
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def create_watcher(roots: Iterable[str], on_change: ChangeCallback, polling: bool = False) -> TreeWatcher:
+    """inotify on Linux, polling everywhere else (or when inotify can't be initialized)."""
+    roots = list(roots)
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots, on_change)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots, on_change)
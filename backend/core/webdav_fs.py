@@ -0,0 +1,306 @@
+"""
+WebDAV adapter (see filesystem), on http.client.
+
+Requests go over a pool of keep-alive connections. A directory is listed
+with one PROPFIND (Depth: 1) that returns every entry's type, size and
+mtime; reads are GETs with a Range header; copies within the server are
+COPY requests. Servers that publish content checksums (the oc:checksums
+property of ownCloud / Nextcloud, e.g. "SHA1:... MD5:...") report them in
+the same PROPFIND, so content compares use them instead of downloading;
+each file's checksums from its latest listing are remembered for that.
+
+URL options (query string): connections=N, timeout=seconds, verify=off
+(webdavs:// without certificate checks, for self-signed test servers).
+"""
+import base64
+import email.utils
+import errno
+import http.client
+import ssl
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+from .compare_policy import EntryInfo
+from .filesystem import DEFAULT_CONNECTIONS, ConnectionPool, FileSystem, PooledReader, not_found, remote_url
+
+DEFAULT_TIMEOUT = 30
+# Checksums remembered from listings (path -> (size, mtime_ns, {algo: digest}), empty if none published)
+MAX_KNOWN_CHECKSUMS = 100_000
+
+_DAV = "{DAV:}"
+_OC = "{http://owncloud.org/ns}"
+_PROPFIND_BODY = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<d:propfind xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns"><d:prop>'
+    b'<d:resourcetype/><d:getcontentlength/><d:getlastmodified/><oc:checksums/>'
+    b'</d:prop></d:propfind>'
+)
+# Checksum type names in oc:checksums -> digest algorithm
+_CHECKSUM_ALGOS = {"SHA256": "sha256", "SHA1": "sha1", "MD5": "md5"}
+_ALGO_ORDER = ("sha256", "sha1", "md5")
+
+_DIR_INFO = EntryInfo(True, 0, 0)
+
+
+class WebDavFileSystem(FileSystem):
+    def __init__(self, host: str, port: Optional[int] = None, user: Optional[str] = None, password: Optional[str] = None,
+                 secure: bool = False, connections: int = DEFAULT_CONNECTIONS, timeout: float = DEFAULT_TIMEOUT, verify: str = "on"):
+        self.scheme = "webdavs" if secure else "webdav"
+        self.host = host
+        self.port = port
+        self.user = user
+        self.secure = secure
+        self.timeout = float(timeout)
+        self._auth = None
+        if user is not None:
+            token = base64.b64encode(f"{user}:{password or ''}".encode("utf-8")).decode("ascii")
+            self._auth = f"Basic {token}"
+        self._context = None
+        if secure:
+            self._context = ssl.create_default_context()
+            if verify == "off":
+                self._context.check_hostname = False
+                self._context.verify_mode = ssl.CERT_NONE
+        self._checksums: "OrderedDict[str, tuple]" = OrderedDict()
+        self._checksums_lock = threading.Lock()
+        self.pool = ConnectionPool(self._connect, lambda conn: conn.close(), int(connections))
+
+    def url(self, path: str) -> str:
+        return remote_url(self.scheme, self.host, self.port, self.user, path)
+
+    def _connect(self):
+        if self.secure:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self._context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _headers(self, extra: Optional[dict] = None) -> dict:
+        headers = {"User-Agent": "JFolderMerge"}
+        if self._auth:
+            headers["Authorization"] = self._auth
+        if extra:
+            headers.update(extra)
+        return headers
+
+    def _request(self, method: str, path: str, headers: Optional[dict] = None, body=None, ok=(200, 201, 204, 207)) -> Tuple[int, bytes]:
+        """Status and body of one request, on a pooled connection; raises OSError for other statuses."""
+        def send(conn):
+            conn.request(method, quote(path), body=body, headers=self._headers(headers))
+            response = conn.getresponse()
+            # Read to the end so the connection can take the next request
+            return response.status, response.read()
+        status, data = self.pool.call(send)
+        if status not in ok:
+            raise _status_error(status, method, path)
+        return status, data
+
+    def _propfind(self, path: str, depth: str) -> List[Tuple[str, Optional[EntryInfo], Dict[str, str]]]:
+        status, data = self._request("PROPFIND", path, {"Depth": depth, "Content-Type": "application/xml; charset=utf-8"}, _PROPFIND_BODY,
+                                     ok=(207, 301, 302))
+        if status != 207:
+            # Collections asked for without their trailing slash may be redirected to it
+            if path.endswith("/"):
+                raise _status_error(status, "PROPFIND", path)
+            return self._propfind(path + "/", depth)
+        return _parse_multistatus(data)
+
+    def stat(self, path: str) -> Optional[EntryInfo]:
+        try:
+            responses = self._propfind(path, "0")
+        except FileNotFoundError:
+            return None
+        for _, info, checksums in responses:
+            if info is not None:
+                self._remember(path, info, checksums)
+                return info
+        return None
+
+    def listdir(self, path: str, symlinks: str = "follow") -> Dict[str, EntryInfo]:
+        base = path.rstrip("/")
+        found = {}
+        for href, info, checksums in self._propfind(base + "/", "1"):
+            href = href.rstrip("/")
+            if info is None or href == base or not href.startswith(base + "/"):
+                continue
+            name = href[len(base) + 1:]
+            if "/" in name:
+                continue
+            found[name] = info
+            self._remember(href, info, checksums)
+        return found
+
+    def open_read(self, path: str, offset: int = 0) -> BinaryIO:
+        def open_stream(conn):
+            headers = self._headers({"Range": f"bytes={offset}-"} if offset else None)
+            conn.request("GET", quote(path), headers=headers)
+            response = conn.getresponse()
+            if response.status == 416:
+                # Offset at or past the end: nothing left to read
+                response.read()
+                return _Empty()
+            if response.status not in (200, 206):
+                response.read()
+                raise _status_error(response.status, "GET", path)
+            if offset and response.status == 200:
+                # Range ignored by the server; skip to the offset
+                remaining = offset
+                while remaining:
+                    skipped = response.read(min(remaining, 1 << 20))
+                    if not skipped:
+                        break
+                    remaining -= len(skipped)
+            return response
+        return PooledReader(self.pool, open_stream, reusable=lambda response: response.isclosed())
+
+    def read_bytes(self, path: str, offset: int = 0, length: int = -1) -> bytes:
+        if length < 0:
+            return super().read_bytes(path, offset, length)
+        if length == 0:
+            return b""
+        status, data = self._request("GET", path, {"Range": f"bytes={offset}-{offset + length - 1}"}, ok=(200, 206, 416))
+        if status == 200:
+            data = data[offset:offset + length]
+        return data if status != 416 else b""
+
+    def write_chunks(self, path: str, chunks: Iterable[bytes]):
+        if isinstance(chunks, (list, tuple)):
+            body = b"".join(chunks)
+            self._request("PUT", path, {"Content-Type": "application/octet-stream"}, body)
+            return
+        # Streamed from another file; not retried, the source can't be read twice
+        with self.pool.connection() as conn:
+            conn.request("PUT", quote(path), body=iter(chunks), headers=self._headers({"Content-Type": "application/octet-stream"}),
+                         encode_chunked=True)
+            response = conn.getresponse()
+            response.read()
+        if response.status not in (200, 201, 204):
+            raise _status_error(response.status, "PUT", path)
+
+    def makedirs(self, path: str):
+        missing = []
+        current = path.rstrip("/")
+        while current:
+            info = self.stat(current)
+            if info is not None:
+                if not info.is_dir:
+                    raise NotADirectoryError(errno.ENOTDIR, "Not a directory", current)
+                break
+            missing.append(current)
+            current = current.rsplit("/", 1)[0]
+        for directory in reversed(missing):
+            # 405: created meanwhile
+            self._request("MKCOL", directory + "/", ok=(201, 405))
+
+    def remove(self, path: str):
+        self._request("DELETE", path)
+
+    def rmdir(self, path: str):
+        self._request("DELETE", path.rstrip("/") + "/")
+
+    def rmtree(self, path: str):
+        # DELETE on a collection removes its members too
+        self.rmdir(path)
+
+    def copy_file(self, src: str, dst: str):
+        self._copy(src, dst, "0")
+
+    def copy_tree(self, src: str, dst: str):
+        self._copy(src.rstrip("/") + "/", dst.rstrip("/") + "/", "infinity")
+
+    def _copy(self, src: str, dst: str, depth: str):
+        destination = remote_url("https" if self.secure else "http", self.host, self.port, None, dst)
+        self._request("COPY", src, {"Destination": destination, "Overwrite": "T", "Depth": depth})
+
+    def _remember(self, path: str, info: EntryInfo, checksums: Dict[str, str]):
+        # Files without checksums too, so that remote_algos() need not ask again
+        if info.is_dir:
+            return
+        with self._checksums_lock:
+            self._checksums[path] = (info.size, info.mtime_ns, checksums)
+            self._checksums.move_to_end(path)
+            while len(self._checksums) > MAX_KNOWN_CHECKSUMS:
+                self._checksums.popitem(last=False)
+
+    def _known_checksums(self, path: str) -> Dict[str, str]:
+        with self._checksums_lock:
+            known = self._checksums.get(path)
+        if known is None:
+            # Not seen in a listing: ask for this file alone
+            if self.stat(path) is None:
+                return {}
+            with self._checksums_lock:
+                known = self._checksums.get(path)
+        return known[2] if known else {}
+
+    def remote_algos(self, path: str) -> Tuple[str, ...]:
+        checksums = self._known_checksums(path)
+        return tuple(algo for algo in _ALGO_ORDER if algo in checksums)
+
+    def remote_digest(self, path: str, algo: str) -> str:
+        return self._known_checksums(path).get(algo, "")
+
+    def close(self):
+        self.pool.close()
+
+
+class _Empty:
+    def read(self, size: int = -1) -> bytes:
+        return b""
+
+    def isclosed(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+
+def _status_error(status: int, method: str, path: str) -> OSError:
+    if status == 404:
+        return not_found(path)
+    if status in (401, 403):
+        return PermissionError(errno.EACCES, f"{method} refused ({status})", path)
+    if status == 507:
+        return OSError(errno.ENOSPC, "Insufficient storage (507)", path)
+    return OSError(errno.EIO, f"{method} failed ({status})", path)
+
+
+def _parse_multistatus(data: bytes) -> List[Tuple[str, Optional[EntryInfo], Dict[str, str]]]:
+    """(unquoted href path, info or None if the properties were not returned, {algo: digest}) per response."""
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError as e:
+        raise OSError(errno.EIO, f"Invalid PROPFIND response: {e}")
+    results = []
+    for response in root.iter(f"{_DAV}response"):
+        href = response.findtext(f"{_DAV}href") or ""
+        path = unquote(urlsplit(href).path)
+        prop = None
+        for propstat in response.iter(f"{_DAV}propstat"):
+            if " 200 " in (propstat.findtext(f"{_DAV}status") or " 200 "):
+                prop = propstat.find(f"{_DAV}prop")
+                break
+        if prop is None:
+            results.append((path, None, {}))
+            continue
+        resourcetype = prop.find(f"{_DAV}resourcetype")
+        if resourcetype is not None and resourcetype.find(f"{_DAV}collection") is not None:
+            results.append((path, _DIR_INFO, {}))
+            continue
+        size = int(prop.findtext(f"{_DAV}getcontentlength") or 0)
+        mtime_ns = 0
+        modified = prop.findtext(f"{_DAV}getlastmodified")
+        if modified:
+            try:
+                mtime_ns = int(email.utils.parsedate_to_datetime(modified).timestamp()) * 1_000_000_000
+            except (TypeError, ValueError):
+                pass
+        checksums = {}
+        for checksum in prop.iter(f"{_OC}checksum"):
+            for item in (checksum.text or "").split():
+                kind, _, value = item.partition(":")
+                algo = _CHECKSUM_ALGOS.get(kind.upper())
+                if algo and value:
+                    checksums[algo] = value.lower()
+        results.append((path, EntryInfo(False, size, mtime_ns), checksums))
+    return results
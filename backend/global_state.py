@@ -1,2 +1,5 @@
 class GlobalState:
     args = None
+    hash_cache = None
+    diff_cache = None
+    job_scheduler = None
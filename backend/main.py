@@ -2,8 +2,16 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import argparse
+import logging
+from urllib.parse import parse_qsl, urlencode
 from .global_state import GlobalState
-from .routers import comparison, files, system
+from .core.compare_engine import default_compare_workers
+from .core.hash_cache import DEFAULT_MAX_ENTRIES
+from .core.diff_cache import DEFAULT_MAX_BYTES
+from .core.file_type import DEFAULT_MAX_TEXT_BYTES
+from .core.job_scheduler import DEFAULT_RESULT_TTL_SECONDS, parse_job_limits
+from .core.filesystem import redact_url
+from .routers import comparison, files, jobs, system
 
 # Parse arguments
 parser = argparse.ArgumentParser(description="Folder Comparison Tool")
@@ -11,6 +19,12 @@ parser.add_argument("--left", default=None, help="Left folder path")
 parser.add_argument("--right", default=None, help="Right folder path")
 parser.add_argument("--port", type=int, default=8000, help="Port to run on")
 parser.add_argument("--host", default="127.0.0.1", help="Host to bind to (default: localhost)")
+parser.add_argument("--compare-workers", type=int, default=default_compare_workers(), help="Threads used for listing, stat and hashing during folder compare (1 = serial)")
+parser.add_argument("--hash-cache-size", type=int, default=DEFAULT_MAX_ENTRIES, help="Max entries in the persistent content-hash cache (0 disables it)")
+parser.add_argument("--diff-cache-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="Memory budget in MB for computed diffs kept between requests (0 disables it)")
+parser.add_argument("--diff-max-text-mb", type=int, default=DEFAULT_MAX_TEXT_BYTES // (1024 * 1024), help="Text files larger than this (MB) are diffed by streaming instead of in memory")
+parser.add_argument("--job-limits", type=parse_job_limits, default=None, help="Concurrent background jobs per type, e.g. compare=2,diff=4")
+parser.add_argument("--job-result-ttl", type=int, default=DEFAULT_RESULT_TTL_SECONDS, help="Seconds finished background jobs and their results are kept")
 
 # Parse known args
 args, _ = parser.parse_known_args()
@@ -29,15 +43,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _redact_query(url: str) -> str:
+    """url with the passwords of remote paths in its query (e.g. ?path=sftp://user:pw@host/...) removed."""
+    base, sep, query = url.partition("?")
+    if not sep:
+        return redact_url(url)
+    return f"{redact_url(base)}?{urlencode([(k, redact_url(v)) for k, v in parse_qsl(query, keep_blank_values=True)])}"
+
+class _RedactAccessLog(logging.Filter):
+    # uvicorn's access log args: (client, method, path with query, http version, status)
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple) and len(record.args) == 5:
+            record.args = record.args[:2] + (_redact_query(str(record.args[2])),) + record.args[3:]
+        return True
+
+logging.getLogger("uvicorn.access").addFilter(_RedactAccessLog())
+
 @app.middleware("http")
 async def log_full_url(request: Request, call_next):
-    print(f"INFO:     Request URL: {request.url}")
+    print(f"INFO:     Request URL: {_redact_query(str(request.url))}")
     response = await call_next(request)
     return response
 
 # Include Routers
 app.include_router(comparison.router, prefix="/api")
 app.include_router(files.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
 app.include_router(system.router, prefix="/api")
 
 if __name__ == "__main__":
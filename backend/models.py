@@ -1,20 +1,65 @@
 from pydantic import BaseModel
 from typing import List, Optional, Literal
 
+class DirectoryHint(BaseModel):
+    # Cheap summary of a directory that was listed but not descended into
+    left_entries: int
+    right_entries: int
+    size_mismatch: bool  # True if an entry exists on one side only, or a file size differs
+
 class FileNode(BaseModel):
     name: str
     left_name: Optional[str] = None
     right_name: Optional[str] = None
     path: str
     type: Literal["file", "directory"]
-    status: Literal["same", "modified", "added", "removed"]
+    status: Literal["same", "modified", "added", "removed", "moved", "renamed"]
     children: Optional[List['FileNode']] = None
+    # Move detection: "moved"/"renamed" files point at their counterpart on the other side
+    moved_to: Optional[str] = None  # on the left-only file: its path on the right
+    moved_from: Optional[str] = None  # on the right-only file: its path on the left
+    # Lazy compare: directory not descended into; fetch it with /api/compare/subtree
+    unexplored: Optional[bool] = None
+    hint: Optional[DirectoryHint] = None
+    session_id: Optional[str] = None  # Set on the root of a lazy compare
 
 class CompareRequest(BaseModel):
     left_path: str
     right_path: str
     exclude_files: List[str] = []
     exclude_folders: List[str] = []
+    # Per-directory ignore files to honor, e.g. [".gitignore"]; their rules apply below the directory they are in
+    ignore_file_names: List[str] = []
+    # Symbolic links: "follow" them, "skip" them, or compare them as "link"s (by target)
+    symlinks: Literal["follow", "skip", "link"] = "follow"
+    # Pair left-only and right-only files with the same content as moved/renamed (not for lazy compares)
+    detect_moves: bool = False
+    # Tree format: keep a content index of all files in a compare session for /compare/{session_id}/duplicates
+    build_index: bool = False
+    # Tree format: directories whose whole subtree is the same come back unexplored, expandable through the compare session
+    collapse_same: bool = False
+    compare_mode: Literal["quick", "sampled", "full"] = "full"
+    # "columnar": flat parallel arrays as JSON, "binary": the same arrays as a binary frame
+    result_format: Literal["tree", "columnar", "binary"] = "tree"
+    # Lazy compare (tree format only): expand only this many levels and open a compare session
+    max_depth: Optional[int] = None
+    # The path on that side is a manifest file (see /api/manifest) standing in for the tree it was made from
+    left_manifest: bool = False
+    right_manifest: bool = False
+
+class ManifestRequest(BaseModel):
+    path: str
+    output_path: str
+    exclude_files: List[str] = []
+    exclude_folders: List[str] = []
+    ignore_file_names: List[str] = []
+    symlinks: Literal["follow", "skip", "link"] = "follow"
+
+class SubtreeRequest(BaseModel):
+    session_id: str
+    path: str  # Relative to the compared roots
+    max_depth: Optional[int] = 1
+    refresh: bool = False  # Ignore the session's cached result for this path
 
 class ContentRequest(BaseModel):
     path: str
@@ -23,14 +68,42 @@ class DiffRequest(BaseModel):
     left_path: str
     right_path: str
     mode: Literal["unified", "side-by-side", "combined", "raw"] = "unified"
+    # Line matching for side-by-side rows; "ndiff" is the previous difflib.ndiff behaviour
+    algorithm: Literal["myers", "patience", "ndiff"] = "myers"
+    # Intra-line highlighting caps (None = server defaults); beyond them rows are highlighted whole
+    intraline_max_length: Optional[int] = None
+    intraline_max_cost: Optional[int] = None
+
+class DiffWindowRequest(BaseModel):
+    left_path: str
+    right_path: str
+    algorithm: Literal["myers", "patience", "ndiff"] = "myers"
+    # Side-by-side rows [offset, offset + limit) of the whole diff
+    offset: int = 0
+    limit: int = 500
+    # Hunk index ([start, end) row ranges of changes) for next/prev-change navigation
+    include_hunks: bool = True
+    intraline_max_length: Optional[int] = None
+    intraline_max_cost: Optional[int] = None
 
 class CopyRequest(BaseModel):
     source_path: str
     dest_path: str
     is_dir: bool
+    # Folders only: "replace" swaps in a fresh copy, "sync" copies just what differs
+    mode: Literal["replace", "sync"] = "replace"
+    # Sync: remove destination entries missing from the source
+    delete_extraneous: bool = False
+    # Sync: return the plan without touching the destination
+    dry_run: bool = False
+    # Sync: how same-size files are checked, as in CompareRequest. "full" by default, since
+    # "quick" treats a same-size edit within the mtime tolerance as unchanged and skips it
+    compare_mode: Literal["quick", "sampled", "full"] = "full"
 
 class BatchCopyRequest(BaseModel):
     items: List[CopyRequest]
+    # Parallel file copies (None = server default)
+    workers: Optional[int] = None
 
 class DeleteRequest(BaseModel):
     path: str
@@ -38,6 +111,13 @@ class DeleteRequest(BaseModel):
 class BatchDeleteRequest(BaseModel):
     paths: List[str]
 
+class JobRequest(BaseModel):
+    type: Literal["compare", "diff", "batch-copy", "batch-delete", "manifest"]
+    # Body of the matching endpoint: CompareRequest, DiffRequest, BatchCopyRequest, BatchDeleteRequest or ManifestRequest
+    params: dict
+    # Lower runs first; None = the type's default
+    priority: Optional[int] = None
+
 class HistoryRequest(BaseModel):
     left_path: str
     right_path: str
@@ -1,40 +1,518 @@
 
-from fastapi import APIRouter, HTTPException
-from ..models import CompareRequest, DiffRequest, FileNode
-from ..comparator import compare_folders
-from ..core.differ import generate_side_by_side_diff, generate_unified_diff
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from ..models import CompareRequest, DiffRequest, DiffWindowRequest, FileNode, ManifestRequest, SubtreeRequest
+from ..comparator import compare_folders, compare_folders_columnar, iter_compare_records, export_manifest
+from ..global_state import GlobalState
+from ..core.compare_engine import default_compare_workers
+from ..core.hash_cache import HashCache, DEFAULT_MAX_ENTRIES
+from ..core.compare_session import CompareSession, CompareSessionStore
+from ..core.content_index import ContentIndex, DEFAULT_REPORT_GROUPS
+from ..core.manifest import Manifest
+from ..core.filesystem import FsPath, is_remote, local_copy, open_root
+from ..core.watch_session import WatchSession
+from ..core.differ import DiffDocument, side_by_side_result, iter_unified_lines, iter_raw_lines
+from ..core.diff_window import DiffSkeleton
+from ..core.diff_cache import DiffCache, DEFAULT_MAX_BYTES, diff_key
+from ..core.diff_stream import stream_diff_result
+from ..core.file_type import classify_pair, binary_summary, DEFAULT_MAX_TEXT_BYTES
+from ..core.file_equality import DIGEST_ALGO, file_digest
 import os
+import json
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Optional
 
 router = APIRouter()
+_hash_cache_lock = threading.Lock()
+_diff_cache_lock = threading.Lock()
+compare_sessions = CompareSessionStore()
+# Each watch session holds a full tree and OS watches, so keep only a few
+watch_sessions = CompareSessionStore(max_sessions=4)
+
+def get_compare_workers() -> int:
+    workers = getattr(GlobalState.args, "compare_workers", None)
+    return workers if workers else default_compare_workers()
+
+def get_hash_cache():
+    """Shared persistent hash cache, opened on first use. None when disabled with --hash-cache-size 0."""
+    size = getattr(GlobalState.args, "hash_cache_size", DEFAULT_MAX_ENTRIES)
+    if size is None or size <= 0:
+        return None
+    with _hash_cache_lock:
+        if GlobalState.hash_cache is None:
+            GlobalState.hash_cache = HashCache(max_entries=size)
+    return GlobalState.hash_cache
+
+def get_diff_cache():
+    """Shared in-memory diff cache. None when disabled with --diff-cache-mb 0."""
+    limit_mb = getattr(GlobalState.args, "diff_cache_mb", DEFAULT_MAX_BYTES // (1024 * 1024))
+    if limit_mb is None or limit_mb <= 0:
+        return None
+    with _diff_cache_lock:
+        if GlobalState.diff_cache is None:
+            GlobalState.diff_cache = DiffCache(max_bytes=limit_mb * 1024 * 1024)
+    return GlobalState.diff_cache
+
+def _compare_roots(req: CompareRequest):
+    """
+    The two roots of a compare request, with manifest files loaded and remote
+    URLs opened (with a metadata cache that lives as long as the compare session).
+    """
+    roots = []
+    for side, path, is_manifest in (("Left", req.left_path, req.left_manifest), ("Right", req.right_path, req.right_manifest)):
+        try:
+            if is_remote(path):
+                if is_manifest:
+                    raise ValueError("Manifests are read from local files")
+                root = open_root(path, cached=True)
+                exists = root.fs.exists(root.path)
+            else:
+                root = path
+                exists = os.path.exists(path)
+            if not exists:
+                raise HTTPException(status_code=400, detail=f"{side} path does not exist")
+            roots.append(Manifest.load(path) if is_manifest else root)
+        except (ValueError, OSError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return roots
 
 @router.post("/compare", response_model=FileNode)
 def compare(req: CompareRequest):
+    return run_compare(req)
+
+def run_compare(req: CompareRequest, cancelled: Optional[threading.Event] = None):
+    """The /compare response; setting `cancelled` (a background job's cancel) stops the walk."""
+    left_root, right_root = _compare_roots(req)
+    if req.build_index and not (isinstance(left_root, str) and isinstance(right_root, str)):
+        raise HTTPException(status_code=400, detail="build_index needs both trees on local disk")
+
+    try:
+        if req.result_format != "tree":
+            columnar = compare_folders_columnar(
+                left_root,
+                right_root,
+                req.exclude_files,
+                req.exclude_folders,
+                workers=get_compare_workers(),
+                hash_cache=get_hash_cache(),
+                compare_mode=req.compare_mode,
+                ignore_file_names=req.ignore_file_names,
+                symlinks=req.symlinks,
+                detect_moves=req.detect_moves,
+                cancelled=cancelled
+            )
+            # Returning a Response skips response_model validation/serialization
+            if req.result_format == "binary":
+                return Response(content=columnar.to_binary(), media_type="application/octet-stream")
+            return Response(content=columnar.to_json(), media_type="application/json")
+
+        session = None
+        if req.max_depth is not None or req.build_index or req.collapse_same:
+            session = CompareSession(
+                left_root, right_root, req.exclude_files, req.exclude_folders, req.compare_mode,
+                req.ignore_file_names, req.symlinks
+            )
+            if req.build_index:
+                session.content_index = ContentIndex()
+
+        result = compare_folders(
+            left_root,
+            right_root,
+            req.exclude_files,
+            req.exclude_folders,
+            workers=get_compare_workers(),
+            hash_cache=get_hash_cache(),
+            compare_mode=req.compare_mode,
+            max_depth=req.max_depth,
+            ignore_file_names=req.ignore_file_names,
+            symlinks=req.symlinks,
+            detect_moves=req.detect_moves,
+            content_index=session.content_index if session else None,
+            collapse_same=req.collapse_same,
+            cancelled=cancelled
+        )
+        if session is not None:
+            compare_sessions.add(session)
+            result.session_id = session.id
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/compare/subtree", response_model=FileNode)
+def compare_subtree(req: SubtreeRequest):
+    """Compares one directory of a lazy compare session on demand. Results are cached per session."""
+    session = compare_sessions.get(req.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Compare session not found or expired")
+
+    key = f"{req.path}|{req.max_depth}"
+    with session.lock:
+        cached = session.subtrees.get(key)
+    if cached is not None and not req.refresh:
+        return cached
+    if req.refresh:
+        for root in (session.left_root, session.right_root):
+            if isinstance(root, FsPath):
+                root.fs.refresh()
+
+    try:
+        result = compare_folders(
+            session.left_root,
+            session.right_root,
+            session.exclude_files,
+            session.exclude_folders,
+            workers=get_compare_workers(),
+            hash_cache=get_hash_cache(),
+            compare_mode=session.compare_mode,
+            rel_path=req.path,
+            max_depth=req.max_depth,
+            ignore_file_names=session.ignore_file_names,
+            symlinks=session.symlinks
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    with session.lock:
+        session.subtrees[key] = result
+    return result
+
+@router.get("/compare/{session_id}/duplicates")
+def compare_duplicates(session_id: str, min_size: int = 1, limit: int = DEFAULT_REPORT_GROUPS):
+    """
+    Duplicate report of a compare run with build_index: groups of identical
+    files, bytes wasted by extra copies on each side and the left/right overlap.
+    Only files whose size collides are hashed, once per session.
+    """
+    session = compare_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Compare session not found or expired")
+    if session.content_index is None:
+        raise HTTPException(status_code=400, detail="Compare was run without build_index")
+    hash_cache = get_hash_cache()
+    hash_file = (lambda path: hash_cache.hash_file(path, file_digest, algo=DIGEST_ALGO)) if hash_cache else None
+    try:
+        return session.content_index.duplicate_report(
+            session.left_root, session.right_root, hash_file,
+            min_size=max(1, min_size), limit=limit, workers=get_compare_workers()
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if hash_cache is not None:
+            hash_cache.flush()
+
+@router.post("/manifest")
+def create_manifest(req: ManifestRequest):
+    """
+    Snapshots a folder into a manifest file (sizes, mtimes and content digests)
+    that /compare accepts in place of that folder with left_manifest/right_manifest.
+    """
+    if not os.path.isdir(req.path):
+        raise HTTPException(status_code=400, detail="Path is not a folder")
+    if os.path.isdir(req.output_path):
+        raise HTTPException(status_code=400, detail="Output path is a folder")
+    try:
+        return export_manifest(
+            req.path,
+            req.output_path,
+            req.exclude_files,
+            req.exclude_folders,
+            workers=get_compare_workers(),
+            hash_cache=get_hash_cache(),
+            ignore_file_names=req.ignore_file_names,
+            symlinks=req.symlinks
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/compare/stream")
+def compare_stream(req: CompareRequest):
+    """NDJSON variant of /compare: one line per node as directories finish, then a summary line."""
+    left_root, right_root = _compare_roots(req)
+
+    records = iter_compare_records(
+        left_root,
+        right_root,
+        req.exclude_files,
+        req.exclude_folders,
+        workers=get_compare_workers(),
+        hash_cache=get_hash_cache(),
+        compare_mode=req.compare_mode,
+        ignore_file_names=req.ignore_file_names,
+        symlinks=req.symlinks,
+        detect_moves=req.detect_moves
+    )
+
+    def generate():
+        try:
+            for rec in records:
+                yield json.dumps(rec, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            yield json.dumps({"kind": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@router.post("/compare/watch", response_model=FileNode)
+def compare_watch(req: CompareRequest):
+    """Full compare that stays live: the returned root carries a session_id for /compare/watch/{id}/events."""
+    if is_remote(req.left_path) or is_remote(req.right_path):
+        raise HTTPException(status_code=400, detail="A remote folder cannot be watched")
     if not os.path.exists(req.left_path):
         raise HTTPException(status_code=400, detail="Left path does not exist")
     if not os.path.exists(req.right_path):
         raise HTTPException(status_code=400, detail="Right path does not exist")
-    
+    if req.left_manifest or req.right_manifest:
+        raise HTTPException(status_code=400, detail="A manifest cannot be watched")
+
     try:
-        result = compare_folders(
-            req.left_path, 
-            req.right_path,
-            req.exclude_files,
-            req.exclude_folders
+        session = WatchSession(
+            req.left_path, req.right_path, req.exclude_files, req.exclude_folders, req.compare_mode,
+            workers=get_compare_workers(), hash_cache=get_hash_cache(),
+            ignore_file_names=req.ignore_file_names, symlinks=req.symlinks
         )
-        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    watch_sessions.add(session)
+    return session.tree
+
+def _get_watch_session(session_id: str) -> WatchSession:
+    session = watch_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Watch session not found or expired")
+    return session
+
+@router.get("/compare/watch/{session_id}", response_model=FileNode)
+def compare_watch_tree(session_id: str):
+    session = _get_watch_session(session_id)
+    with session.lock:
+        return session.tree
+
+@router.get("/compare/watch/{session_id}/events")
+async def compare_watch_events(session_id: str, request: Request):
+    """Server-sent events with the subtrees refreshed by the watcher."""
+    session = _get_watch_session(session_id)
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    unsubscribe = session.subscribe(lambda event: loop.call_soon_threadsafe(queue.put_nowait, event))
+
+    async def generate():
+        try:
+            yield f"event: ready\ndata: {json.dumps({'version': session.version})}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            unsubscribe()
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.delete("/compare/watch/{session_id}")
+def compare_watch_stop(session_id: str):
+    watch_sessions.remove(session_id)
+    return {"status": "success"}
+
+@contextmanager
+def _local_files(req):
+    """
+    The diff request with remote files replaced by local copies (see
+    local_copy), so the text diff views read and cache them like local ones.
+    The copies are held until the with block ends.
+    """
+    if not is_remote(req.left_path) and not is_remote(req.right_path):
+        yield req
+        return
+    with ExitStack() as held:
+        try:
+            left_path = held.enter_context(local_copy(req.left_path))
+            right_path = held.enter_context(local_copy(req.right_path))
+        except (ValueError, OSError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        yield req.model_copy(update={"left_path": left_path, "right_path": right_path})
+
+def _intraline_limits(req) -> dict:
+    limits = {}
+    if req.intraline_max_length is not None:
+        limits["intraline_max_length"] = req.intraline_max_length
+    if req.intraline_max_cost is not None:
+        limits["intraline_max_cost"] = req.intraline_max_cost
+    return limits
+
+def _cached_diff(kind: str, left_path: str, right_path: str, compute, *options):
+    cache = get_diff_cache()
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(diff_key(kind, left_path, right_path, *options), compute)
+
+def get_max_text_bytes() -> int:
+    limit_mb = getattr(GlobalState.args, "diff_max_text_mb", None)
+    return limit_mb * 1024 * 1024 if limit_mb else DEFAULT_MAX_TEXT_BYTES
+
+def _binary(req) -> dict:
+    """Sizes, digests and first differing offset instead of a line diff."""
+    if is_remote(req.left_path) or is_remote(req.right_path):
+        # Summarized from stats and ranged reads; the cache keys on local files only
+        return binary_summary(req.left_path, req.right_path)
+    hash_cache = get_hash_cache()
+    hash_file = None
+    if hash_cache is not None:
+        hash_file = lambda path: hash_cache.hash_file(path, file_digest, algo=DIGEST_ALGO)
+    try:
+        return _cached_diff("binary", req.left_path, req.right_path, lambda: binary_summary(req.left_path, req.right_path, hash_file=hash_file))
+    finally:
+        if hash_cache is not None:
+            hash_cache.flush()
+
+def _streamed(req, left_info, right_info) -> dict:
+    """Hunks of text files above the in-memory limit, read line by line in one pass for all views."""
+    limits = _intraline_limits(req)
+    return _cached_diff(
+        "stream", req.left_path, req.right_path,
+        lambda: stream_diff_result(req.left_path, req.right_path, left_info.encoding, right_info.encoding, **limits),
+        tuple(sorted(limits.items()))
+    )
+
+def _document(req) -> DiffDocument:
+    """Both files read and diffed once per version and algorithm; every output format renders from it."""
+    return _cached_diff(
+        "document", req.left_path, req.right_path,
+        lambda: DiffDocument.from_files(req.left_path, req.right_path, req.algorithm),
+        req.algorithm
+    )
+
+def _document_loader(req):
+    """Loads the request's document at most once, even with the diff cache disabled."""
+    loaded = []
+    def load() -> DiffDocument:
+        if not loaded:
+            loaded.append(_document(req))
+        return loaded[0]
+    return load
+
+def _side_by_side(req, load):
+    limits = _intraline_limits(req)
+    return _cached_diff(
+        "side-by-side", req.left_path, req.right_path,
+        lambda: side_by_side_result(load(), **limits),
+        req.algorithm, tuple(sorted(limits.items()))
+    )
+
+def _unified(req, load):
+    return _cached_diff(
+        "unified", req.left_path, req.right_path,
+        lambda: {"diff": list(iter_unified_lines(load()))},
+        req.algorithm
+    )
+
+def _classify(req):
+    """classify_pair on the request's own paths: remote files are sniffed with a stat and a ranged read."""
+    try:
+        return classify_pair(req.left_path, req.right_path, get_max_text_bytes())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/diff")
 def get_diff(req: DiffRequest):
+    kind, left_info, right_info = _classify(req)
+    try:
+        if kind == "binary":
+            return {"diff": [], "left_rows": [], "right_rows": [], "binary": _binary(req), "mode": req.mode}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    # Only a rendered text diff needs remote files downloaded
+    with _local_files(req) as req:
+        return _diff(req, kind, left_info, right_info)
+
+def _diff(req, kind: str, left_info, right_info) -> dict:
+    load = _document_loader(req)
     try:
+        if kind == "large":
+            result = _streamed(req, left_info, right_info)
+            if req.mode == "side-by-side":
+                return {**result, "diff": []}
+            if req.mode == "combined":
+                return {**result, "mode": "combined"}
+            return {"diff": result["diff"], "streamed": True, "truncated": result["truncated"]}
+
         if req.mode == "side-by-side":
-            return generate_side_by_side_diff(req.left_path, req.right_path)
+            return _side_by_side(req, load)
         elif req.mode == "combined":
-            sbs = generate_side_by_side_diff(req.left_path, req.right_path)
-            unified = generate_unified_diff(req.left_path, req.right_path)
-            return {**sbs, **unified, "mode": "combined"}
+            # Both halves render from one document and are cached, so switching modes reuses them
+            return {**_side_by_side(req, load), **_unified(req, load), "mode": "combined"}
+        elif req.mode == "raw":
+            return {"diff": list(iter_raw_lines(load())), "mode": "raw"}
         else:
-            return generate_unified_diff(req.left_path, req.right_path)
+            return _unified(req, load)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/diff/window")
+def get_diff_window(req: DiffWindowRequest):
+    """
+    One window of side-by-side rows. The row skeleton is computed once per file
+    pair and version, so scrolling only renders the rows asked for.
+    """
+    if req.offset < 0 or req.limit < 0:
+        raise HTTPException(status_code=400, detail="offset and limit must not be negative")
+    kind, _, _ = _classify(req)
+    try:
+        if kind == "binary":
+            return {"total_rows": 0, "offset": req.offset, "left_rows": [], "right_rows": [], "hunks": [], "binary": _binary(req)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if kind == "large":
+        raise HTTPException(status_code=413, detail="File too large for the windowed diff; use /api/diff for a streamed diff")
+    with _local_files(req) as req:
+        return _diff_window(req)
+
+def _diff_window(req) -> dict:
+    try:
+        skeleton = _cached_diff("skeleton", req.left_path, req.right_path, lambda: DiffSkeleton(_document(req)), req.algorithm)
+        left_rows, right_rows = skeleton.rows(req.offset, req.limit, **_intraline_limits(req))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    result = {
+        "total_rows": len(skeleton),
+        "offset": req.offset,
+        "left_rows": left_rows,
+        "right_rows": right_rows,
+    }
+    if req.include_hunks:
+        result["hunks"] = [list(h) for h in skeleton.hunks]
+    return result
+
+@router.get("/diff/cache")
+def diff_cache_stats():
+    cache = get_diff_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.delete("/diff/cache")
+def clear_diff_cache():
+    cache = get_diff_cache()
+    if cache is not None:
+        cache.clear()
+    return {"status": "success"}
+
+@router.get("/compare/hash-cache")
+def hash_cache_stats():
+    cache = get_hash_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.delete("/compare/hash-cache")
+def clear_hash_cache():
+    cache = get_hash_cache()
+    if cache is not None:
+        cache.clear()
+    return {"status": "success"}
@@ -1,138 +1,238 @@
 
-import shutil
 import os
-import base64
+import json
+import threading
+import asyncio
 import mimetypes
 import platform as sys_platform
-from fastapi import APIRouter, HTTPException
+from typing import Optional, Tuple
+from urllib.parse import quote
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from ..models import CopyRequest, SaveRequest, DeleteRequest, ListDirRequest, BatchCopyRequest, BatchDeleteRequest
+from ..core.file_ranges import file_etag, read_byte_range, size_mtime_etag, read_line_range
+from ..core.copy_job import BatchCopyJob, CopyJobStore, DEFAULT_COPY_WORKERS
+from ..core.dir_sync import plan_sync, apply_sync
+from ..core.filesystem import LOCAL, FileSystem, copy_between, is_remote, local_copy, redact_url, resolve
+from ..comparator import compare_folders
+from .comparison import get_compare_workers, get_hash_cache
 
 router = APIRouter()
 
+PROGRESS_INTERVAL_SECONDS = 0.5
+copy_jobs = CopyJobStore()
+
 IMAGE_EXTENSIONS = {'.webp', '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.tiff', '.tif', '.avif'}
 
+def _resolve(path: str) -> Tuple[FileSystem, str]:
+    """The filesystem of a local path or remote URL (see core.filesystem) and the path on it."""
+    try:
+        return resolve(path)
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _reject_remote(*paths: str, action: str):
+    if any(is_remote(path) for path in paths):
+        raise HTTPException(status_code=400, detail=f"{action} works on local paths only")
+
 @router.get("/serve")
-def serve_file(path: str):
-    """Serve a file as raw binary with appropriate Content-Type. Used for markdown image embedding."""
-    if not os.path.exists(path):
+def serve_file(path: str, request: Request):
+    """
+    Serve a file as raw binary with appropriate Content-Type. Used for markdown image embedding
+    and the diff viewer's images. Supports If-None-Match (304) and Range requests
+    (remote files are streamed whole).
+    """
+    fs, inner = _resolve(path)
+    info = fs.stat(inner)
+    if info is None:
         raise HTTPException(status_code=404, detail="File not found")
-    if not os.path.isfile(path):
+    if info.is_dir:
         raise HTTPException(status_code=400, detail="Not a file")
-    mime = mimetypes.guess_type(path)[0] or 'application/octet-stream'
-    from fastapi.responses import FileResponse
-    return FileResponse(path, media_type=mime)
+    st = os.stat(path) if fs is LOCAL else None
+    etag = file_etag(st) if st else size_mtime_etag(info.size, info.mtime_ns)
+    # Always revalidate: the file may be edited or merged while the app is open
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    mime = mimetypes.guess_type(inner)[0] or 'application/octet-stream'
+    if fs is LOCAL:
+        return FileResponse(path, media_type=mime, headers=headers, stat_result=st)
+    return StreamingResponse(fs.iter_read(inner), media_type=mime, headers={**headers, "Content-Length": str(info.size)})
 
 @router.get("/content")
 def get_content(path: str):
-    if not os.path.exists(path):
+    fs, inner = _resolve(path)
+    info = fs.stat(inner)
+    if info is None:
         raise HTTPException(status_code=404, detail="File not found")
-    if not os.path.isfile(path):
+    if info.is_dir:
         raise HTTPException(status_code=400, detail="path is not a file")
 
-    ext = os.path.splitext(path)[1].lower()
+    ext = os.path.splitext(inner)[1].lower()
     try:
         if ext in IMAGE_EXTENSIONS:
-            with open(path, 'rb') as f:
-                data = base64.b64encode(f.read()).decode('ascii')
-            mime = mimetypes.guess_type(path)[0] or 'application/octet-stream'
-            return {"content": data, "type": "image", "mime": mime}
-        else:
+            # Served raw (and cacheable) through /serve instead of inlined as base64
+            mime = mimetypes.guess_type(inner)[0] or 'application/octet-stream'
+            return {"type": "image", "mime": mime, "url": f"/api/serve?path={quote(path)}", "etag": file_etag(os.stat(path)) if fs is LOCAL else size_mtime_etag(info.size, info.mtime_ns)}
+        elif fs is LOCAL:
             with open(path, 'r', encoding='utf-8', errors='replace') as f:
                 content = f.read()
             return {"content": content, "type": "text"}
+        else:
+            return {"content": fs.read_bytes(inner).decode('utf-8', errors='replace'), "type": "text"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/content/range")
+def get_content_range(path: str, offset: Optional[int] = None, length: int = 65536,
+                      line: Optional[int] = None, count: int = 1000):
+    """
+    Part of a text file: bytes [offset, offset + length) or lines [line, line + count) (0-based).
+    Line ranges report total_lines once the file has been read to its end.
+    Remote files are read from a local copy (see local_copy).
+    """
+    try:
+        with local_copy(path) as local:
+            if not os.path.isfile(local):
+                raise HTTPException(status_code=404, detail="File not found")
+            if (offset is None) == (line is None):
+                raise HTTPException(status_code=400, detail="Give either offset or line")
+            if min(offset or 0, line or 0, length, count) < 0:
+                raise HTTPException(status_code=400, detail="Range values must not be negative")
+            try:
+                if line is not None:
+                    return {"type": "text", **read_line_range(local, line, count)}
+                return {"type": "text", **read_byte_range(local, offset, length)}
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/copy")
 def copy_item(req: CopyRequest):
-    if not os.path.exists(req.source_path):
+    """Copies a file or folder; either side may be remote, content then streams between them."""
+    src_fs, source = _resolve(req.source_path)
+    dst_fs, dest = _resolve(req.dest_path)
+    if not src_fs.exists(source):
         raise HTTPException(status_code=400, detail="Source does not exist")
-    
-    dest_parent = os.path.dirname(req.dest_path)
+    if req.is_dir and req.mode == "sync":
+        _reject_remote(req.source_path, req.dest_path, action="Sync")
+        # Creates the destination itself when applied; a dry run leaves it untouched
+        try:
+            return _sync_folder(req)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
-    if not os.path.exists(dest_parent):
-        os.makedirs(dest_parent, exist_ok=True)
+    dest_parent = dst_fs.dirname(dest)
+
+    if not dst_fs.exists(dest_parent):
+        dst_fs.makedirs(dest_parent)
 
     try:
         if req.is_dir:
-            if os.path.exists(req.dest_path):
-                 shutil.rmtree(req.dest_path)
-            shutil.copytree(req.source_path, req.dest_path)
-        else:
-            shutil.copy2(req.source_path, req.dest_path)
+            if dst_fs.exists(dest):
+                 dst_fs.rmtree(dest)
+        copy_between(src_fs, source, dst_fs, dest, req.is_dir)
         return {"status": "success"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sync_folder(req: CopyRequest) -> dict:
+    tree = None
+    if os.path.isdir(req.dest_path):
+        tree = compare_folders(
+            req.source_path,
+            req.dest_path,
+            workers=get_compare_workers(),
+            hash_cache=get_hash_cache(),
+            compare_mode=req.compare_mode
+        )
+    plan = plan_sync(req.source_path, req.dest_path, tree, req.delete_extraneous)
+    if req.dry_run:
+        return {"status": "plan", **plan.to_dict()}
+    return {"status": "success", "summary": apply_sync(plan)}
+
 @router.post("/save-file")
 def save_file(req: SaveRequest):
+    fs, path = _resolve(req.path)
     try:
-        parent_dir = os.path.dirname(req.path)
-        if not os.path.exists(parent_dir):
-            os.makedirs(parent_dir, exist_ok=True)
-
-        temp_path = req.path + ".tmp"
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            f.write(req.content)
-            
-        os.replace(temp_path, req.path)
+        parent_dir = fs.dirname(path)
+        if not fs.exists(parent_dir):
+            fs.makedirs(parent_dir)
+
+        # Written to a temporary file that replaces the target (on a WebDAV server, one PUT)
+        fs.write_text(path, req.content)
         return {"status": "success"}
     except Exception as e:
-        if os.path.exists(req.path + ".tmp"):
-            try:
-                os.remove(req.path + ".tmp")
-            except:
-                pass
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/batch-copy")
 def batch_copy_items(req: BatchCopyRequest):
-    created_paths = []
-    try:
-        for item in req.items:
-            # 1. Check Source
-            if not os.path.exists(item.source_path):
-                raise Exception(f"Source not found: {item.source_path}")
-
-            # 2. Prepare Dest
-            dest_parent = os.path.dirname(item.dest_path)
-            if not os.path.exists(dest_parent):
-                os.makedirs(dest_parent, exist_ok=True)
-            
-            # 3. Copy
-            if item.is_dir:
-                if os.path.exists(item.dest_path):
-                    shutil.rmtree(item.dest_path)
-                shutil.copytree(item.source_path, item.dest_path)
-            else:
-                shutil.copy2(item.source_path, item.dest_path)
-            
-            created_paths.append(item.dest_path)
+    """
+    Starts copying the items in the background and returns the job id at once.
+    Progress: GET /batch-copy/{id} or the SSE stream at /batch-copy/{id}/events.
+    The whole batch is rolled back if any item fails or the job is cancelled.
+    """
+    job = start_batch_copy(req)
+    return {"status": "started", "job_id": job.id}
 
-        return {"status": "success", "processed": len(created_paths)}
+def start_batch_copy(req: BatchCopyRequest) -> BatchCopyJob:
+    # Rollback restores local backups, so remote items go through /copy one by one
+    _reject_remote(*(path for item in req.items for path in (item.source_path, item.dest_path)), action="Batch copy")
+    # Items are copied whole; sync options would be silently ignored
+    if any(item.mode != "replace" or item.delete_extraneous or item.dry_run for item in req.items):
+        raise HTTPException(status_code=400, detail="Batch copy only replaces; sync folders with /copy and mode \"sync\"")
+    items = [(item.source_path, item.dest_path, item.is_dir) for item in req.items]
+    job = copy_jobs.add(BatchCopyJob(items, workers=req.workers or DEFAULT_COPY_WORKERS))
+    return job.start()
 
-    except Exception as e:
-        # Rollback: Delete all files/folders created during this transaction
-        print(f"Batch Copy Failed: {e}. Rolling back {len(created_paths)} items.")
-        for path in reversed(created_paths):
-            try:
-                if os.path.isdir(path):
-                    shutil.rmtree(path)
-                else:
-                    os.remove(path)
-            except Exception as rollback_error:
-                print(f"Rollback failed for {path}: {rollback_error}")
-        
-        raise HTTPException(status_code=500, detail=f"Transaction Failed: {str(e)}")
+def _get_copy_job(job_id: str) -> BatchCopyJob:
+    job = copy_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Copy job not found")
+    return job
+
+@router.get("/batch-copy/{job_id}")
+def batch_copy_status(job_id: str):
+    return _get_copy_job(job_id).snapshot()
+
+@router.get("/batch-copy/{job_id}/events")
+async def batch_copy_events(job_id: str, request: Request):
+    """Server-sent progress snapshots until the job finishes."""
+    job = _get_copy_job(job_id)
+
+    async def generate():
+        last = None
+        while not await request.is_disconnected():
+            snapshot = job.snapshot()
+            if snapshot != last:
+                yield f"data: {json.dumps(snapshot)}\n\n"
+                last = snapshot
+            if job.done:
+                break
+            await asyncio.sleep(PROGRESS_INTERVAL_SECONDS)
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.delete("/batch-copy/{job_id}")
+def cancel_batch_copy(job_id: str):
+    job = _get_copy_job(job_id)
+    job.cancel()
+    return {"status": "cancelling" if not job.done else job.state}
 
 @router.post("/batch-delete")
 def batch_delete_items(req: BatchDeleteRequest):
+    return delete_items(req)
+
+def delete_items(req: BatchDeleteRequest, cancelled: Optional[threading.Event] = None):
+    """The /batch-delete response; once `cancelled` is set, the remaining paths are left alone."""
     # Note: Rollback for delete is not supported without a Trash bin.
     # We will perform a 'check all' pass first to minimize partial failure risk, then delete.
     
     # 1. Validation Pass
-    for path in req.paths:
-        if not os.path.exists(path):
+    targets = [_resolve(path) for path in req.paths]
+    for path, (fs, inner) in zip(req.paths, targets):
+        if not fs.exists(inner):
             # We can either fail strict or ignore. 
             # For transaction-like behavior, failing strict is better.
             raise HTTPException(status_code=404, detail=f"Path not found: {path}")
@@ -140,11 +240,13 @@ def batch_delete_items(req: BatchDeleteRequest):
     # 2. Execution Pass
     deleted_paths = []
     try:
-        for path in req.paths:
-            if os.path.isdir(path):
-                shutil.rmtree(path)
+        for path, (fs, inner) in zip(req.paths, targets):
+            if cancelled is not None and cancelled.is_set():
+                break
+            if fs.isdir(inner):
+                fs.rmtree(inner)
             else:
-                os.remove(path)
+                fs.remove(inner)
             deleted_paths.append(path)
         
         return {"status": "success", "processed": len(deleted_paths)}
@@ -162,14 +264,15 @@ def batch_delete_items(req: BatchDeleteRequest):
 
 @router.post("/delete")
 def delete_item(req: DeleteRequest):
-    print(f"DEBUG: DELETE request for path: {req.path}")
-    if not os.path.exists(req.path):
+    print(f"DEBUG: DELETE request for path: {redact_url(req.path)}")
+    fs, path = _resolve(req.path)
+    if not fs.exists(path):
         raise HTTPException(status_code=404, detail="Path does not exist")
     try:
-        if os.path.isdir(req.path):
-            shutil.rmtree(req.path)
+        if fs.isdir(path):
+            fs.rmtree(path)
         else:
-            os.remove(req.path)
+            fs.remove(path)
         return {"status": "success"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -200,6 +303,9 @@ def list_dirs(req: ListDirRequest):
             "is_drive_list": True
         }
 
+    if is_remote(path):
+        return _list_remote_dirs(path, req.include_files)
+
     if not path:
         path = os.path.expanduser("~")
 
@@ -237,3 +343,23 @@ def list_dirs(req: ListDirRequest):
         "platform": sys_platform.system().lower(),
         "is_drive_list": False
     }
+
+def _list_remote_dirs(url: str, include_files: bool) -> dict:
+    fs, path = _resolve(url)
+    try:
+        entries = fs.listdir(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=400, detail="Invalid directory path")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    dirs = sorted(name for name, info in entries.items() if info.is_dir and not name.startswith('.'))
+    files = sorted(name for name, info in entries.items() if include_files and not info.is_dir and not name.startswith('.'))
+    parent = fs.dirname(path)
+    return {
+        "current": fs.url(path),
+        "parent": fs.url(parent) if parent != path.rstrip("/") and path.rstrip("/") else None,
+        "dirs": dirs,
+        "files": files,
+        "platform": fs.scheme,
+        "is_drive_list": False
+    }
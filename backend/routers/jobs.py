@@ -0,0 +1,104 @@
+import json
+import threading
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+from pydantic import ValidationError
+from ..models import JobRequest, CompareRequest, DiffRequest, BatchCopyRequest, BatchDeleteRequest, ManifestRequest
+from ..global_state import GlobalState
+from ..core.job_scheduler import Job, JobScheduler, DEFAULT_RESULT_TTL_SECONDS
+from .comparison import run_compare, get_diff, create_manifest
+from .files import start_batch_copy, delete_items, PROGRESS_INTERVAL_SECONDS
+
+router = APIRouter()
+
+_job_scheduler_lock = threading.Lock()
+
+def get_job_scheduler() -> JobScheduler:
+    with _job_scheduler_lock:
+        if GlobalState.job_scheduler is None:
+            GlobalState.job_scheduler = JobScheduler(
+                limits=getattr(GlobalState.args, "job_limits", None),
+                result_ttl=getattr(GlobalState.args, "job_result_ttl", DEFAULT_RESULT_TTL_SECONDS)
+            )
+    return GlobalState.job_scheduler
+
+def _run_batch_copy(req: BatchCopyRequest, job: Job):
+    # The copy runs as a regular batch-copy job, so its own progress stream works too
+    copy_job = start_batch_copy(req)
+    while not copy_job.wait(PROGRESS_INTERVAL_SECONDS):
+        if job.cancelled.is_set():
+            copy_job.cancel()
+        job.progress = copy_job.snapshot()
+    job.progress = snapshot = copy_job.snapshot()
+    if snapshot["state"] == "failed":
+        raise Exception(snapshot["error"])
+    return snapshot
+
+# Job type -> (request model, runner)
+JOB_TYPES = {
+    "compare": (CompareRequest, lambda req, job: run_compare(req, job.cancelled)),
+    "diff": (DiffRequest, lambda req, job: get_diff(req)),
+    "batch-copy": (BatchCopyRequest, _run_batch_copy),
+    "batch-delete": (BatchDeleteRequest, lambda req, job: delete_items(req, job.cancelled)),
+    "manifest": (ManifestRequest, lambda req, job: create_manifest(req)),
+}
+# Job types whose runner stops on job.cancelled; the others can only be cancelled while pending
+STOPPABLE_JOB_TYPES = {"compare", "batch-copy", "batch-delete"}
+
+@router.post("/jobs")
+def submit_job(req: JobRequest):
+    """
+    Queues a compare, diff, batch copy, batch delete or manifest export and returns its job id at
+    once. An identical request that is still pending or running returns the
+    existing job (deduplicated: true).
+    """
+    model, run = JOB_TYPES[req.type]
+    try:
+        params = model(**req.params)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    key = f"{req.type}:{json.dumps(params.model_dump(), sort_keys=True)}"
+    job, deduplicated = get_job_scheduler().submit(req.type, lambda job: run(params, job), key=key, priority=req.priority)
+    return {"job_id": job.id, "state": job.state, "deduplicated": deduplicated}
+
+@router.get("/jobs")
+def list_jobs():
+    scheduler = get_job_scheduler()
+    return {"jobs": [job.snapshot() for job in scheduler.list()], **scheduler.stats()}
+
+def _get_job(job_id: str) -> Job:
+    job = get_job_scheduler().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return _get_job(job_id).snapshot()
+
+@router.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """The job's response as the direct endpoint would have returned it; 409 until it is done."""
+    job = _get_job(job_id)
+    if job.state == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.state != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.state}")
+    if isinstance(job.result, Response):
+        # Columnar compare results are prebuilt responses; hand out a fresh one each time
+        return Response(content=job.result.body, media_type=job.result.media_type)
+    return job.result
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """
+    Cancels a pending job, or stops a running compare, batch copy or batch
+    delete. Running diffs and manifest exports can't be interrupted: 409.
+    """
+    job = _get_job(job_id)
+    if job.state == "running" and job.type not in STOPPABLE_JOB_TYPES:
+        raise HTTPException(status_code=409, detail=f"A running {job.type} job can't be cancelled")
+    job = get_job_scheduler().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return {"status": "cancelling" if not job.done else job.state}
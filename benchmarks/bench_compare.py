@@ -0,0 +1,81 @@
+"""
+Folder-compare scaling benchmark.
+
+Builds a synthetic left/right tree pair in a temp directory and times
+compare_folders() for a range of worker counts.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_compare --dirs 200 --files 50 --workers 1,2,4,8,16
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from backend.comparator import compare_folders
+
+
+def build_tree(root: str, dirs: int, files: int, file_size: int, change_ratio: float, seed: int = 0):
+    rng = random.Random(seed)
+    left = os.path.join(root, "left")
+    right = os.path.join(root, "right")
+    payload = os.urandom(file_size)
+
+    for d in range(dirs):
+        rel_dir = os.path.join(f"group_{d % 10}", f"dir_{d}")
+        os.makedirs(os.path.join(left, rel_dir), exist_ok=True)
+        os.makedirs(os.path.join(right, rel_dir), exist_ok=True)
+        for f in range(files):
+            name = os.path.join(rel_dir, f"file_{f}.bin")
+            with open(os.path.join(left, name), "wb") as fh:
+                fh.write(payload)
+            # Same size on both sides so every pair goes through the content check
+            data = payload
+            if rng.random() < change_ratio:
+                data = payload[:-1] + bytes([payload[-1] ^ 0xFF])
+            with open(os.path.join(right, name), "wb") as fh:
+                fh.write(data)
+    return left, right
+
+
+def count_nodes(node) -> int:
+    return 1 + sum(count_nodes(c) for c in (node.children or []))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dirs", type=int, default=200)
+    parser.add_argument("--files", type=int, default=50, help="Files per directory")
+    parser.add_argument("--file-size", type=int, default=16 * 1024)
+    parser.add_argument("--change-ratio", type=float, default=0.05)
+    parser.add_argument("--workers", default="1,2,4,8,16", help="Comma separated worker counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--root", default=None, help="Existing scratch directory (default: a temp dir)")
+    args = parser.parse_args()
+
+    scratch = args.root or tempfile.mkdtemp(prefix="jfm_bench_")
+    try:
+        t0 = time.perf_counter()
+        left, right = build_tree(scratch, args.dirs, args.files, args.file_size, args.change_ratio)
+        print(f"Built {args.dirs * args.files} file pairs in {time.perf_counter() - t0:.2f}s under {scratch}")
+
+        baseline = None
+        print(f"{'workers':>8} {'best (s)':>10} {'speedup':>8} {'nodes':>8}")
+        for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+            timings = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                tree = compare_folders(left, right, [], [], workers=workers)
+                timings.append(time.perf_counter() - t0)
+            best = min(timings)
+            baseline = baseline or best
+            print(f"{workers:>8} {best:>10.3f} {baseline / best:>7.2f}x {count_nodes(tree):>8}")
+    finally:
+        if not args.root:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
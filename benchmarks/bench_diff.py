@@ -0,0 +1,86 @@
+"""
+Side-by-side diff engine benchmark.
+
+Generates a synthetic corpus and times the line-matching stage
+(compute_opcodes) for each algorithm:
+  small           200 lines, a handful of edits
+  large-barely    50k lines, 20 scattered edits
+  large-heavily   20k lines, ~30% of lines rewritten
+  generated       30k lines of repetitive generated code, 2% edits
+
+ndiff is skipped above --ndiff-limit lines because it is close to
+quadratic there and would dominate the run.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_diff --algorithms myers,patience,ndiff
+"""
+import argparse
+import random
+import time
+
+from backend.core.differ import compute_opcodes
+
+
+def _text_lines(rng, n):
+    words = ["alpha", "beta", "gamma", "delta", "value", "index", "result", "return", "config", "item"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(3, 10))) + f" {i}" for i in range(n)]
+
+
+def _generated_lines(rng, n):
+    lines = []
+    for i in range(n // 5):
+        lines += [f"export const item{i} = {{", f"    id: {i},", "    enabled: true,", "};", ""]
+    return lines
+
+
+def _mutate(rng, lines, edits):
+    out = list(lines)
+    for _ in range(edits):
+        pos = rng.randrange(len(out))
+        kind = rng.random()
+        if kind < 0.4:
+            out[pos] = out[pos] + " // changed"
+        elif kind < 0.7:
+            del out[pos]
+        else:
+            out.insert(pos, f"inserted line {rng.random():.6f}")
+    return out
+
+
+def build_corpus(seed: int = 0):
+    rng = random.Random(seed)
+    small = _text_lines(rng, 200)
+    barely = _text_lines(rng, 50_000)
+    heavily = _text_lines(rng, 20_000)
+    generated = _generated_lines(rng, 30_000)
+    return [
+        ("small", small, _mutate(rng, small, 5)),
+        ("large-barely", barely, _mutate(rng, barely, 20)),
+        ("large-heavily", heavily, _mutate(rng, heavily, 6_000)),
+        ("generated", generated, _mutate(rng, generated, 600)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithms", default="myers,patience,ndiff")
+    parser.add_argument("--ndiff-limit", type=int, default=5_000)
+    args = parser.parse_args()
+
+    algorithms = [a.strip() for a in args.algorithms.split(",") if a.strip()]
+    print(f"{'case':>14} {'lines':>7} {'changed':>8} " + " ".join(f"{a + ' (s)':>14}" for a in algorithms))
+    for name, left, right in build_corpus():
+        cells = []
+        changed = None
+        for algorithm in algorithms:
+            if algorithm == "ndiff" and max(len(left), len(right)) > args.ndiff_limit:
+                cells.append(f"{'skipped':>14}")
+                continue
+            t0 = time.perf_counter()
+            count = sum((i2 - i1) + (j2 - j1) for tag, i1, i2, j1, j2 in compute_opcodes(left, right, algorithm) if tag != "equal")
+            cells.append(f"{time.perf_counter() - t0:>14.3f}")
+            changed = count if changed is None else changed
+        print(f"{name:>14} {max(len(left), len(right)):>7} {changed if changed is not None else '-':>8} " + " ".join(cells))
+
+if __name__ == "__main__":
+    main()
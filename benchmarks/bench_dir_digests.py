@@ -0,0 +1,76 @@
+"""
+Repeat full compares with a warm hash cache, with and without directory records.
+
+Builds a synthetic tree pair, runs one full compare to fill a scratch hash
+cache, then times further compares:
+  per-file cache    every same-size pair looks up both digests in the cache
+  directory records file digests come from the record of each directory
+                    whose listing is unchanged (see backend/core/dir_digest.py)
+and prints the per-file cache lookups each one made.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_dir_digests --dirs 200 --files 50 --workers 8
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from backend.comparator import _cached_hash, compare_folders
+from backend.core.compare_engine import CompareEngine
+from backend.core.compare_policy import make_policy
+from backend.core.hash_cache import HashCache
+from benchmarks.bench_compare import build_tree
+
+
+def timed(label: str, cache: HashCache, run, repeat: int):
+    best = None
+    lookups = 0
+    for _ in range(repeat):
+        before = cache.hits + cache.misses
+        t0 = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - t0
+        lookups = cache.hits + cache.misses - before
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<20} {best:>9.3f}s {lookups:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dirs", type=int, default=200)
+    parser.add_argument("--files", type=int, default=50, help="Files per directory")
+    parser.add_argument("--file-size", type=int, default=16 * 1024)
+    parser.add_argument("--change-ratio", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="jfm_bench_")
+    try:
+        left, right = build_tree(scratch, args.dirs, args.files, args.file_size, args.change_ratio)
+        cache = HashCache(os.path.join(scratch, "hash_cache.db"))
+        print(f"{args.dirs} directories x {args.files} file pairs, workers={args.workers}")
+
+        def with_records():
+            compare_folders(left, right, workers=args.workers, hash_cache=cache, compare_mode="full")
+
+        def per_file():
+            engine = CompareEngine(make_policy("full", _cached_hash(cache)), workers=args.workers)
+            engine.compare(left, right, [], [])
+            cache.flush()
+
+        t0 = time.perf_counter()
+        with_records()
+        print(f"cold compare (fills the cache): {time.perf_counter() - t0:.3f}s")
+        print(f"{'warm compare':<20} {'best':>10} {'lookups':>10}")
+        timed("per-file cache", cache, per_file, args.repeat)
+        timed("directory records", cache, with_records, args.repeat)
+        cache.close()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+File equality microbenchmark.
+
+For a matrix of file sizes and positions of the first differing byte, times:
+  md5-both   - MD5 of both files in 64 KB chunks (the previous get_file_hash path)
+  bytes      - files_equal(): lockstep readinto, stops at the first differing block
+  <digest>   - file_digest() of both files with the default cacheable algorithm
+               (xxh3-128 when xxhash is installed, BLAKE2b-128 otherwise)
+
+Files are read from the page cache after the first run, so the numbers show
+CPU cost and early-exit savings rather than disk throughput.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_file_equality --sizes 4K,1M,64M,256M
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from backend.core.file_equality import DIGEST_ALGO, file_digest, files_equal
+
+POSITIONS = ("none", "start", "middle", "end")
+
+
+def parse_size(text: str) -> int:
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper()
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def md5_both(left: str, right: str) -> bool:
+    def md5(path):
+        hasher = hashlib.md5()
+        with open(path, 'rb') as f:
+            buf = f.read(65536)
+            while buf:
+                hasher.update(buf)
+                buf = f.read(65536)
+        return hasher.hexdigest()
+    return md5(left) == md5(right)
+
+
+def digest_both(left: str, right: str) -> bool:
+    return file_digest(left) == file_digest(right)
+
+
+METHODS = [("md5-both", md5_both), ("bytes", files_equal), (DIGEST_ALGO, digest_both)]
+
+
+def make_pair(scratch: str, size: int, position: str):
+    data = bytearray(os.urandom(size))
+    left = os.path.join(scratch, f"l_{size}_{position}")
+    right = os.path.join(scratch, f"r_{size}_{position}")
+    with open(left, "wb") as f:
+        f.write(data)
+    offset = {"start": 0, "middle": size // 2, "end": size - 1}.get(position)
+    if offset is not None:
+        data[offset] ^= 0xFF
+    with open(right, "wb") as f:
+        f.write(data)
+    return left, right
+
+
+def best_of(fn, left, right, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(left, right)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="4K,1M,64M")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="jfm_bench_")
+    try:
+        header = f"{'size':>8} {'diff at':>8} " + " ".join(f"{name + ' (ms)':>18}" for name, _ in METHODS)
+        print(header)
+        for size_text in args.sizes.split(","):
+            size = parse_size(size_text)
+            for position in POSITIONS:
+                left, right = make_pair(scratch, size, position)
+                cells = [f"{best_of(fn, left, right, args.repeat) * 1000:>18.3f}" for _, fn in METHODS]
+                print(f"{size_text.strip():>8} {position:>8} " + " ".join(cells))
+                os.remove(left)
+                os.remove(right)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare result format benchmark: nested FileNode tree vs columnar arrays.
+
+Builds a synthetic tree pair and reports, per format, wall time for
+compare + serialization, peak traced Python memory and payload size.
+The walk uses the quick compare mode so that the numbers are dominated by
+result building and encoding rather than file hashing.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_result_format --dirs 500 --files 200
+"""
+import argparse
+import gc
+import json
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from backend.comparator import compare_folders, compare_folders_columnar
+from benchmarks.bench_compare import build_tree
+
+
+def run_tree(left, right):
+    tree = compare_folders(left, right, [], [], compare_mode="quick")
+    # What FastAPI does for response_model=FileNode: dump to jsonable dicts, then JSONResponse encodes them
+    return json.dumps(tree.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def run_columnar(left, right):
+    return compare_folders_columnar(left, right, [], [], compare_mode="quick").to_json()
+
+
+def run_binary(left, right):
+    return compare_folders_columnar(left, right, [], [], compare_mode="quick").to_binary()
+
+
+FORMATS = [("tree", run_tree), ("columnar", run_columnar), ("binary", run_binary)]
+
+
+def measure(fn, left, right):
+    gc.collect()
+    t0 = time.perf_counter()
+    fn(left, right)
+    elapsed = time.perf_counter() - t0
+
+    gc.collect()
+    tracemalloc.start()
+    payload = fn(left, right)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dirs", type=int, default=500)
+    parser.add_argument("--files", type=int, default=200, help="Files per directory")
+    parser.add_argument("--root", default=None, help="Existing scratch directory (default: a temp dir)")
+    args = parser.parse_args()
+
+    scratch = args.root or tempfile.mkdtemp(prefix="jfm_bench_")
+    try:
+        left, right = build_tree(scratch, args.dirs, args.files, file_size=16, change_ratio=0.05)
+        print(f"{args.dirs * args.files} file pairs under {scratch}")
+        print(f"{'format':>10} {'time (s)':>10} {'peak MB':>10} {'payload MB':>11}")
+        for name, fn in FORMATS:
+            elapsed, peak, size = measure(fn, left, right)
+            print(f"{name:>10} {elapsed:>10.3f} {peak / 2**20:>10.1f} {size / 2**20:>11.2f}")
+    finally:
+        if not args.root:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Filesystem calls per entry of the compare walk.
+
+Builds a synthetic tree pair and runs a quick-mode compare (size + mtime, so
+no file is opened) while counting the calls that reach the filesystem:
+  listdir / scandir   one per directory and side
+  stat / lstat        os.stat, os.lstat and everything built on them (os.path.*)
+  entry.stat          DirEntry.stat() calls that are not served from its cache
+                      (free on Windows; DirEntry.is_dir()/is_symlink() are free
+                      wherever the directory listing reports entry types)
+  readlink            symlink targets (symlinks="link" only)
+For reference the same tree is also walked the way the engine used to: one
+listdir per directory and an os.stat per entry and side.
+
+With --strace (Linux, strace on PATH) the compare runs in a child process
+under `strace -f -c` and the kernel's own per-syscall counts are printed.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_walk_syscalls --dirs 200 --files 50
+"""
+import argparse
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+
+from backend.comparator import compare_folders
+from benchmarks.bench_compare import build_tree, count_nodes
+
+STRACE_CALLS = "stat,lstat,fstat,newfstatat,statx,openat,getdents64,readlink,readlinkat"
+
+
+class _CountingEntry:
+    """DirEntry proxy that counts stat() calls the real entry would make."""
+
+    def __init__(self, entry, counts):
+        self._entry = entry
+        self._counts = counts
+        self._stat_done = set()
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_dir(self, follow_symlinks=True):
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_symlink(self):
+        return self._entry.is_symlink()
+
+    def stat(self, follow_symlinks=True):
+        if follow_symlinks not in self._stat_done:
+            self._stat_done.add(follow_symlinks)
+            if os.name != "nt" or self._entry.is_symlink():
+                self._counts["entry.stat"] += 1
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+
+class _CountingScandir:
+    def __init__(self, it, counts):
+        self._it = it
+        self._counts = counts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+    def __iter__(self):
+        for entry in self._it:
+            yield _CountingEntry(entry, self._counts)
+
+
+@contextmanager
+def counting_calls():
+    counts = Counter()
+    real = {name: getattr(os, name) for name in ("stat", "lstat", "listdir", "scandir", "readlink")}
+
+    def counted(name):
+        def call(*args, **kwargs):
+            counts[name] += 1
+            return real[name](*args, **kwargs)
+        return call
+
+    for name in ("stat", "lstat", "listdir", "readlink"):
+        setattr(os, name, counted(name))
+    os.scandir = lambda path=".": (counts.update(["scandir"]), _CountingScandir(real["scandir"](path), counts))[1]
+    try:
+        yield counts
+    finally:
+        for name, fn in real.items():
+            setattr(os, name, fn)
+
+
+def legacy_walk(left: str, right: str):
+    """The previous scan: listdir both sides, then os.stat every child on each side it exists on."""
+    pending = [(left, right)]
+    while pending:
+        l_dir, r_dir = pending.pop()
+        l_items = set(os.listdir(l_dir)) if l_dir else set()
+        r_items = set(os.listdir(r_dir)) if r_dir else set()
+        for item in sorted(l_items | r_items):
+            l_st = os.stat(os.path.join(l_dir, item)) if item in l_items else None
+            r_st = os.stat(os.path.join(r_dir, item)) if item in r_items else None
+            if any(st is not None and stat.S_ISDIR(st.st_mode) for st in (l_st, r_st)):
+                pending.append((os.path.join(l_dir, item) if l_st else None, os.path.join(r_dir, item) if r_st else None))
+
+
+def count_entries(left: str, right: str) -> int:
+    return sum(len(dirs) + len(files) for root in (left, right) for _, dirs, files in os.walk(root))
+
+
+def report(label: str, counts: Counter, entries: int):
+    total = sum(counts.values())
+    detail = ", ".join(f"{name}={n}" for name, n in sorted(counts.items()))
+    print(f"{label:<22} {total:>9} {total / entries:>10.2f}   {detail}")
+
+
+def run_strace(left: str, right: str, symlinks: str):
+    code = (
+        "from backend.comparator import compare_folders; "
+        f"compare_folders({left!r}, {right!r}, [], [], workers=1, compare_mode='quick', symlinks={symlinks!r})"
+    )
+    subprocess.run(["strace", "-f", "-c", "-e", f"trace={STRACE_CALLS}", sys.executable, "-c", code], check=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dirs", type=int, default=200)
+    parser.add_argument("--files", type=int, default=50, help="Files per directory")
+    parser.add_argument("--symlinks", default="follow", choices=("follow", "skip", "link"))
+    parser.add_argument("--strace", action="store_true", help="Also count the real syscalls with strace")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="jfm_bench_")
+    try:
+        left, right = build_tree(scratch, args.dirs, args.files, 16, 0.0)
+        entries = count_entries(left, right)
+        print(f"{entries} entries on both sides, {args.dirs * args.files} file pairs")
+        print(f"{'walk':<22} {'calls':>9} {'per entry':>10}")
+
+        with counting_calls() as counts:
+            legacy_walk(left, right)
+        report("listdir + stat (old)", counts, entries)
+
+        with counting_calls() as counts:
+            tree = compare_folders(left, right, [], [], workers=1, compare_mode="quick", symlinks=args.symlinks)
+        report("scandir (engine)", counts, entries)
+        print(f"{count_nodes(tree)} nodes compared")
+
+        if args.strace:
+            if shutil.which("strace") is None:
+                print("strace not found on PATH; skipping")
+            else:
+                run_strace(left, right, args.symlinks)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -45,6 +45,7 @@ export const api = {
         });
     },
 
+    // Exclude patterns use .gitignore syntax
     async compareFolders(leftPath: string, rightPath: string, excludeFiles: string[], excludeFolders: string[]): Promise<TreeData> {
         return request<TreeData>('/api/compare', {
             method: 'POST',
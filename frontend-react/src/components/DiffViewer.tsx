@@ -119,6 +119,7 @@ export const DiffViewer = React.forwardRef<DiffViewerHandle, DiffViewerProps>(({
                 const getStr = (val: any) => {
                     if (!val) return "";
                     if (typeof val === 'string') return val;
+                    if (val.type === 'image' && val.url) return val.url; // served raw by /api/serve
                     if (val.content !== undefined) return val.content;
                     return JSON.stringify(val, null, 2);
                 };
@@ -391,18 +392,7 @@ export const DiffViewer = React.forwardRef<DiffViewerHandle, DiffViewerProps>(({
     if (error) return <div className="error-diff">Error: {error}</div>;
     if (!hasData) return <div className="empty-diff">Select a file to compare</div>;
 
-    const getImageMime = (path: string) => {
-        const ext = path.split('.').pop()?.toLowerCase() || '';
-        const mimes: Record<string, string> = {
-            webp: 'image/webp', png: 'image/png', jpg: 'image/jpeg', jpeg: 'image/jpeg',
-            gif: 'image/gif', bmp: 'image/bmp', ico: 'image/x-icon',
-            tiff: 'image/tiff', tif: 'image/tiff', avif: 'image/avif'
-        };
-        return mimes[ext] || 'image/png';
-    };
-
     if (isImageFile && rawContent) {
-        const mime = getImageMime(relPath);
         const imgStyle: React.CSSProperties = { maxWidth: '100%', maxHeight: '100%', objectFit: 'contain', borderRadius: '4px' };
         return (
             <div style={{ display: 'flex', flex: 1, minHeight: 0 }}>
@@ -410,7 +400,7 @@ export const DiffViewer = React.forwardRef<DiffViewerHandle, DiffViewerProps>(({
                     <div style={{ color: '#888', padding: '10px', background: '#0f172a', borderBottom: '1px solid #333', fontSize: '12px' }}>Left</div>
                     <div style={{ flex: 1, display: 'flex', alignItems: 'center', justifyContent: 'center', padding: '20px', background: '#0f172a', overflow: 'auto' }}>
                         {rawContent.left
-                            ? <img src={`data:${mime};base64,${rawContent.left}`} alt="left" style={imgStyle} />
+                            ? <img src={rawContent.left} alt="left" style={imgStyle} />
                             : <span style={{ color: '#475569' }}>No file</span>}
                     </div>
                 </div>
@@ -418,7 +408,7 @@ export const DiffViewer = React.forwardRef<DiffViewerHandle, DiffViewerProps>(({
                     <div style={{ color: '#888', padding: '10px', background: '#0f172a', borderBottom: '1px solid #333', fontSize: '12px' }}>Right</div>
                     <div style={{ flex: 1, display: 'flex', alignItems: 'center', justifyContent: 'center', padding: '20px', background: '#0f172a', overflow: 'auto' }}>
                         {rawContent.right
-                            ? <img src={`data:${mime};base64,${rawContent.right}`} alt="right" style={imgStyle} />
+                            ? <img src={rawContent.right} alt="right" style={imgStyle} />
                             : <span style={{ color: '#475569' }}>No file</span>}
                     </div>
                 </div>
@@ -443,6 +433,31 @@ export const DiffViewer = React.forwardRef<DiffViewerHandle, DiffViewerProps>(({
                     )}
                 </div>
             )}
+            {diffData?.binary && (
+                <div className="binary-diff-summary" style={{ padding: '12px', color: '#cbd5e1', fontSize: '12px', fontFamily: 'monospace' }}>
+                    <div>Binary files {diffData.binary.identical ? 'are identical' : 'differ'}</div>
+                    {(['left', 'right'] as const).map(side => (
+                        <div key={side}>
+                            {side}: {diffData.binary![side] ? `${diffData.binary![side]!.size} bytes${diffData.binary![side]!.digest ? `, ${diffData.binary!.algo} ${diffData.binary![side]!.digest}` : ''}` : 'missing'}
+                        </div>
+                    ))}
+                    {diffData.binary.first_difference !== null && (
+                        <>
+                            <div>First difference at byte {diffData.binary.first_difference}</div>
+                            {diffData.binary.hex.map(row => (
+                                <div key={row.offset} style={{ whiteSpace: 'pre' }}>
+                                    {row.offset.toString(16).padStart(8, '0')}  {row.left.padEnd(47)}  |  {row.right}
+                                </div>
+                            ))}
+                        </>
+                    )}
+                </div>
+            )}
+            {diffData?.streamed && (
+                <div className="streamed-diff-notice" style={{ padding: '4px 8px', color: '#94a3b8', fontSize: '11px' }}>
+                    Large file: showing changed regions only{diffData.truncated ? ' (output truncated)' : ''}
+                </div>
+            )}
             <div className={`diff-content ${mode}`}>
                 {mode === 'unified' && diffData && <UnifiedView diff={diffData.diff} filters={config.diffFilters} />}
                 {mode === 'side-by-side' && diffData && (
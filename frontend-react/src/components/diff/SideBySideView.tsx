@@ -408,7 +408,8 @@ const DiffRow: React.FC<{
                 </div>
             ) : (
                 <span className={`diff-text ${wrap === false ? 'no-wrap' : ''} ${focusedZone === 'content' ? 'is-focused-text' : ''}`}
-                    style={getFocusStyle('content')}>
+                    style={getFocusStyle('content')}
+                    title={row.highlight_skipped ? 'Line too long for word-level highlighting' : undefined}>
                     {Array.isArray(row.text) ? (
                         row.text.map((seg: any, si: number) => (
                             <span key={si} className={seg.type !== 'same' ? `diff-span-${seg.type}` : ''}>{seg.text}</span>
@@ -39,12 +39,24 @@ export interface Config {
     };
 }
 
+export interface BinaryDiffSummary {
+    algo: string;
+    left: { size: number; digest: string } | null;
+    right: { size: number; digest: string } | null;
+    identical: boolean;
+    first_difference: number | null;
+    hex: { offset: number; left: string; right: string }[];
+}
+
 export interface DiffResult {
     // Generic typing for now, to be refined when moving DiffViewer
     left_rows?: any[]; // For side-by-side
     right_rows?: any[]; // For side-by-side
     diff?: string[]; // For unified
     mode: DiffMode;
+    binary?: BinaryDiffSummary; // Set instead of rows for binary files
+    streamed?: boolean; // Large text file: only hunks with context are included
+    truncated?: boolean;
 }
 
 export interface ListDirResult {
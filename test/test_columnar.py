@@ -0,0 +1,111 @@
+import json
+import os
+import struct
+
+from fastapi.testclient import TestClient
+
+from backend.comparator import compare_folders, compare_folders_columnar
+from backend.core.columnar import BINARY_MAGIC, BINARY_VERSION
+from backend.main import app
+
+client = TestClient(app)
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _trees(tmp_path):
+    left, right = tmp_path / "left", tmp_path / "right"
+    _write(str(left / "a" / "same.txt"), b"same")
+    _write(str(right / "a" / "same.txt"), b"same")
+    _write(str(left / "a" / "changed.txt"), b"one")
+    _write(str(right / "a" / "changed.txt"), b"two")
+    _write(str(left / "a" / "b" / "same.txt"), b"a name used twice")
+    _write(str(right / "a" / "b" / "same.txt"), b"a name used twice")
+    _write(str(left / "gone" / "x.txt"), b"x")
+    _write(str(right / "new" / "y.txt"), b"y")
+    _write(str(left / "old_place" / "moved.bin"), b"moved content")
+    _write(str(right / "new_place" / "moved.bin"), b"moved content")
+    _write(str(left / "naïve.txt"), b"unicode name")
+    _write(str(right / "naïve.txt"), b"unicode name")
+    return str(left), str(right)
+
+
+def _tree_rows(node):
+    rows = {node.path.replace(os.sep, "/"): (node.type, node.status)}
+    for child in node.children or []:
+        rows.update(_tree_rows(child))
+    return rows
+
+
+def _columnar_rows(data):
+    """path -> (type, status) from a to_dict() payload, paths rebuilt from the parent links."""
+    paths = []
+    for i, parent in enumerate(data["parent"]):
+        name = data["names"][data["name"][i]]
+        paths.append("" if parent < 0 else (paths[parent] + "/" + name).lstrip("/"))
+    types, statuses = data["type_codes"], data["status_codes"]
+    return {path: (types[data["type"][i]], statuses[data["status"][i]]) for i, path in enumerate(paths)}, paths
+
+
+def _decode_binary(frame):
+    """The to_binary() frame back into to_dict() form, following its documented layout."""
+    assert frame[:4] == BINARY_MAGIC
+    version, count, name_count = struct.unpack_from("<BII", frame, 4)
+    pos = 13
+    (header_len,) = struct.unpack_from("<I", frame, pos)
+    header = json.loads(frame[pos + 4:pos + 4 + header_len])
+    pos += 4 + header_len
+    (names_len,) = struct.unpack_from("<I", frame, pos)
+    names = frame[pos + 4:pos + 4 + names_len].decode("utf-8").split("\0")
+    pos += 4 + names_len
+    name = list(struct.unpack_from(f"<{count}I", frame, pos))
+    parent = list(struct.unpack_from(f"<{count}i", frame, pos + 4 * count))
+    pos += 8 * count
+    types, statuses = list(frame[pos:pos + count]), list(frame[pos + count:pos + 2 * count])
+    assert pos + 2 * count == len(frame)
+    assert version == BINARY_VERSION and len(names) == name_count
+    return {**header, "names": names, "name": name, "parent": parent, "type": types, "status": statuses}
+
+
+def test_columnar_holds_the_same_nodes_as_the_tree(tmp_path):
+    left, right = _trees(tmp_path)
+    columnar = compare_folders_columnar(left, right, workers=4)
+    data = columnar.to_dict()
+    rows, _ = _columnar_rows(data)
+    assert rows == _tree_rows(compare_folders(left, right, workers=4))
+    assert len(columnar) == len(rows)
+    # Names are interned: "same.txt" occurs twice in the tree but once in the table
+    assert data["names"].count("same.txt") == 1
+    assert json.loads(columnar.to_json()) == data
+
+
+def test_binary_frame_decodes_to_the_json_form(tmp_path):
+    left, right = _trees(tmp_path)
+    columnar = compare_folders_columnar(left, right, detect_moves=True)
+    data = columnar.to_dict()
+    decoded = _decode_binary(columnar.to_binary())
+    for key in ("names", "name", "parent", "type", "status", "moves", "type_codes", "status_codes", "left_name", "right_name"):
+        assert decoded[key] == data[key], key
+
+    rows, paths = _columnar_rows(decoded)
+    assert rows["old_place/moved.bin"] == ("file", "moved")
+    assert rows["new_place/moved.bin"] == ("file", "moved")
+    assert [[paths[i] for i in pair] for pair in decoded["moves"]] == [["old_place/moved.bin", "new_place/moved.bin"]]
+
+
+def test_compare_endpoint_formats(tmp_path):
+    left, right = _trees(tmp_path)
+    body = {"left_path": left, "right_path": right, "exclude_files": [], "exclude_folders": []}
+    tree = client.post("/api/compare", json=body)
+    as_json = client.post("/api/compare", json={**body, "result_format": "columnar"})
+    as_binary = client.post("/api/compare", json={**body, "result_format": "binary"})
+    assert tree.status_code == as_json.status_code == as_binary.status_code == 200
+    assert as_binary.headers["content-type"] == "application/octet-stream"
+    assert _decode_binary(as_binary.content) == {k: v for k, v in as_json.json().items() if k not in ("format", "version")}
+    rows, _ = _columnar_rows(as_json.json())
+    assert rows["a/changed.txt"] == ("file", "modified")
+    assert rows["gone"] == ("directory", "removed")
@@ -0,0 +1,96 @@
+import fnmatch
+import hashlib
+import os
+
+import pytest
+
+from backend.comparator import compare_folders
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _reference_walk(left_root, right_root, exclude_files, exclude_folders, rel_path=""):
+    """The recursive compare compare_folders used before CompareEngine: (path, type, status) in preorder."""
+    left_abs, right_abs = os.path.join(left_root, rel_path), os.path.join(right_root, rel_path)
+    left_exists, right_exists = os.path.exists(left_abs), os.path.exists(right_abs)
+    is_dir = os.path.isdir(left_abs) if left_exists else os.path.isdir(right_abs)
+    if not left_exists:
+        status = "added"
+    elif not right_exists:
+        status = "removed"
+    elif is_dir != os.path.isdir(right_abs):
+        status = "modified"
+    elif is_dir:
+        status = "same"
+    elif os.path.getsize(left_abs) != os.path.getsize(right_abs):
+        status = "modified"
+    else:
+        digests = [hashlib.md5(open(path, "rb").read()).hexdigest() for path in (left_abs, right_abs)]
+        status = "same" if digests[0] == digests[1] else "modified"
+    rows = [(rel_path, "directory" if is_dir else "file", status)]
+    if is_dir:
+        names = set()
+        for path in (left_abs, right_abs):
+            if os.path.isdir(path):
+                names.update(os.listdir(path))
+        for name in sorted(names):
+            left_item = os.path.join(left_abs, name)
+            item_is_dir = os.path.isdir(left_item) if os.path.exists(left_item) else os.path.isdir(os.path.join(right_abs, name))
+            patterns = exclude_folders if item_is_dir else exclude_files
+            if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                continue
+            rows += _reference_walk(left_root, right_root, exclude_files, exclude_folders, os.path.join(rel_path, name))
+    return rows
+
+
+def _rows(node):
+    rows = [(node.path, node.type, node.status)]
+    for child in node.children or []:
+        rows += _rows(child)
+    return rows
+
+
+@pytest.fixture
+def trees(tmp_path):
+    left, right = tmp_path / "left", tmp_path / "right"
+    for i in range(6):
+        for j in range(5):
+            _write(str(left / f"d{i}" / f"f{j}.txt"), b"same %d %d\n" % (i, j))
+            _write(str(right / f"d{i}" / f"f{j}.txt"), b"same %d %d\n" % (i, j))
+    _write(str(left / "d0" / "same_size.txt"), b"aaaa")
+    _write(str(right / "d0" / "same_size.txt"), b"bbbb")
+    _write(str(left / "d1" / "grown.txt"), b"short")
+    _write(str(right / "d1" / "grown.txt"), b"much longer")
+    _write(str(left / "only_left" / "deep" / "x.txt"), b"x")
+    _write(str(right / "only_right" / "y.txt"), b"y")
+    _write(str(left / "kind"), b"a file on the left")
+    _write(str(right / "kind" / "inner.txt"), b"a folder on the right")
+    _write(str(left / "d2" / "debug.log"), b"excluded")
+    _write(str(right / "node_modules" / "pkg.js"), b"excluded")
+    _write(str(left / "empty.bin"), b"")
+    _write(str(right / "empty.bin"), b"")
+    return str(left), str(right)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize("compare_mode", ["full", "sampled"])
+def test_engine_matches_the_recursive_walk(trees, workers, compare_mode):
+    left, right = trees
+    expected = _reference_walk(left, right, ["*.log"], ["node_modules"])
+    tree = compare_folders(left, right, ["*.log"], ["node_modules"], workers=workers, compare_mode=compare_mode)
+    assert _rows(tree) == expected
+
+
+def test_statuses_of_the_fixture(trees):
+    left, right = trees
+    statuses = {path: status for path, _, status in _rows(compare_folders(left, right, ["*.log"], ["node_modules"], workers=4))}
+    assert statuses[os.path.join("d0", "same_size.txt")] == "modified"
+    assert statuses[os.path.join("d1", "grown.txt")] == "modified"
+    assert statuses[os.path.join("d3", "f2.txt")] == "same"
+    assert statuses["only_left"] == "removed" and statuses["only_right"] == "added"
+    assert statuses["kind"] == "modified"
+    assert os.path.join("d2", "debug.log") not in statuses and "node_modules" not in statuses
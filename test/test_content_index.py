@@ -0,0 +1,109 @@
+import os
+
+from fastapi.testclient import TestClient
+
+from backend.comparator import compare_folders
+from backend.core.content_index import ContentIndex
+from backend.main import app
+
+client = TestClient(app)
+
+
+def _write(root, rel, data):
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _trees(tmp_path):
+    left, right = str(tmp_path / "left"), str(tmp_path / "right")
+    # Two copies on the left, one of them also unchanged on the right
+    _write(left, "a/big.bin", b"B" * 1000)
+    _write(left, "b/big_copy.bin", b"B" * 1000)
+    _write(right, "a/big.bin", b"B" * 1000)
+    # Three copies on the right only
+    for rel in ("x/1.txt", "y/2.txt", "z/3.txt"):
+        _write(right, rel, b"triple")
+    # Same size, different content: not duplicates
+    _write(left, "c/one.dat", b"1234567")
+    _write(left, "c/two.dat", b"7654321")
+    # Changed at the same path; its new content equals a left file elsewhere
+    _write(left, "m/file.txt", b"version 1")
+    _write(right, "m/file.txt", b"version 2")
+    _write(left, "m/version2.txt", b"version 2")
+    _write(left, "empty1", b"")
+    _write(left, "empty2", b"")
+    return left, right
+
+
+def _hashing(paths):
+    def hash_file(path):
+        paths.append(os.path.basename(path))
+        with open(path, "rb") as f:
+            return f.read().hex()
+    return hash_file
+
+
+def test_duplicate_report(tmp_path):
+    left, right = _trees(tmp_path)
+    index = ContentIndex()
+    compare_folders(left, right, workers=4, content_index=index)
+    assert len(index) == 13
+
+    hashed = []
+    report = index.duplicate_report(left, right, _hashing(hashed))
+    groups = {(g["size"], tuple(g["left"]), tuple(g["right"])): g["wasted_bytes"] for g in report["groups"]}
+    assert groups == {
+        (1000, ("a/big.bin", "b/big_copy.bin"), ("a/big.bin",)): 1000,
+        (6, (), ("x/1.txt", "y/2.txt", "z/3.txt")): 12,
+    }
+    assert report["group_count"] == 2
+    assert [g["size"] for g in report["groups"]] == [1000, 6]
+    assert report["wasted_bytes"] == {"left": 1000, "right": 12, "total": 1012}
+    # big.bin, "version 2" and nothing else appears on both sides
+    assert report["overlap"] == {"contents": 2, "bytes": 1009}
+
+    # The unchanged same-path pair is one candidate: its right file is never read
+    assert hashed.count("big.bin") == 1
+    assert "empty1" not in hashed
+    assert report["hashed"] == len(hashed)
+
+    hashed.clear()
+    assert index.duplicate_report(left, right, _hashing(hashed), limit=1)["groups"] == report["groups"][:1]
+    assert hashed == []
+
+
+def test_min_size_and_unique_sizes_skip_hashing(tmp_path):
+    left, right = str(tmp_path / "left"), str(tmp_path / "right")
+    _write(left, "a.txt", b"a")
+    _write(right, "b.txt", b"bb")
+    _write(left, "big1", b"x" * 50)
+    _write(right, "big2", b"x" * 50)
+    index = ContentIndex()
+    compare_folders(left, right, content_index=index)
+
+    hashed = []
+    report = index.duplicate_report(left, right, _hashing(hashed), min_size=10)
+    assert sorted(hashed) == ["big1", "big2"]
+    assert report["overlap"] == {"contents": 1, "bytes": 50}
+    assert report["groups"] == []
+
+
+def test_duplicates_endpoint(tmp_path):
+    left, right = _trees(tmp_path)
+    body = {"left_path": left, "right_path": right, "exclude_files": [], "exclude_folders": []}
+
+    plain = client.post("/api/compare", json=body).json()
+    assert plain.get("session_id") is None
+
+    indexed = client.post("/api/compare", json={**body, "build_index": True}).json()
+    response = client.get(f"/api/compare/{indexed['session_id']}/duplicates", params={"limit": 1})
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["group_count"] == 2 and len(report["groups"]) == 1
+    assert report["groups"][0]["left"] == ["a/big.bin", "b/big_copy.bin"]
+
+    assert client.get("/api/compare/no-such-session/duplicates").status_code == 404
+    lazy = client.post("/api/compare", json={**body, "max_depth": 1}).json()
+    assert client.get(f"/api/compare/{lazy['session_id']}/duplicates").status_code == 400
@@ -0,0 +1,54 @@
+import os
+
+from backend.core.copy_job import BatchCopyJob
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_failed_item_keeps_untouched_destinations(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    os.makedirs(src / "folder")
+    _write(str(src / "f2"), "new")
+    _write(str(dst / "f2"), "user data")
+    _write(str(dst / "kept" / "x"), "user folder")
+    job = BatchCopyJob([
+        # A directory given as a file source fails when it is opened
+        (str(src / "folder"), str(dst / "bad"), False),
+        (str(src / "f2"), str(dst / "f2"), False),
+        (str(src / "folder"), str(dst / "kept"), True),
+    ], workers=1)
+    job.start().wait()
+
+    assert job.state == "failed"
+    assert _read(dst / "f2") == "user data"
+    assert _read(dst / "kept" / "x") == "user folder"
+
+
+def test_copies_files_and_folders(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    _write(str(src / "a.txt"), "a")
+    _write(str(src / "tree" / "sub" / "b.txt"), "b")
+    os.makedirs(src / "empty")
+    _write(str(dst / "tree" / "old.txt"), "replaced")
+    job = BatchCopyJob([
+        (str(src / "a.txt"), str(dst / "out" / "a.txt"), False),
+        (str(src / "tree"), str(dst / "tree"), True),
+        (str(src / "empty"), str(dst / "empty"), True),
+    ], workers=2)
+    job.start().wait()
+
+    assert job.state == "done", job.error
+    assert _read(dst / "out" / "a.txt") == "a"
+    assert _read(dst / "tree" / "sub" / "b.txt") == "b"
+    assert not os.path.exists(dst / "tree" / "old.txt")
+    assert os.path.isdir(dst / "empty")
+    assert job.files_done == job.total_files == 2
@@ -0,0 +1,30 @@
+import threading
+
+from backend.core.diff_cache import DiffCache
+
+
+def test_result_is_sized_outside_the_lock():
+    cache = DiffCache()
+    cache.get_or_compute(("cached",), lambda: "hit")
+    sizing = threading.Event()
+    release = threading.Event()
+
+    def slow_sizeof(value):
+        sizing.set()
+        release.wait(5)
+        return 1
+
+    worker = threading.Thread(target=cache.get_or_compute, args=(("big",), lambda: ["rows"], slow_sizeof))
+    worker.start()
+    try:
+        assert sizing.wait(5)
+        # Another key's lookup doesn't wait for the sizing
+        looked_up = []
+        reader = threading.Thread(target=lambda: looked_up.append(cache.get_or_compute(("cached",), lambda: "miss")))
+        reader.start()
+        reader.join(1)
+        assert looked_up == ["hit"]
+    finally:
+        release.set()
+        worker.join()
+    assert cache.get_or_compute(("big",), lambda: ["recomputed"]) == ["rows"]
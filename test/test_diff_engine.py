@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+from backend.core.diff_engine import get_opcodes
+
+
+def _apply(a, b, opcodes):
+    """b rebuilt from a and the opcodes, checking they tile both sequences in order."""
+    out = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        assert i1 <= i2 and j1 <= j2 and (i1 < i2 or j1 < j2)
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+            out += a[i1:i2]
+        else:
+            assert tag == {(True, True): "replace", (True, False): "delete", (False, True): "insert"}[(i1 < i2, j1 < j2)]
+            out += b[j1:j2]
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    return out
+
+
+def _matched(opcodes):
+    return sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == "equal")
+
+
+def _lcs_length(a, b):
+    row = [0] * (len(b) + 1)
+    for x in a:
+        prev = 0
+        for j, y in enumerate(b):
+            prev, row[j + 1] = row[j + 1], prev + 1 if x == y else max(row[j + 1], row[j])
+    return row[-1]
+
+
+def _random_pair(rng, alphabet, length):
+    a = [rng.choice(alphabet) for _ in range(rng.randint(0, length))]
+    b = list(a)
+    for _ in range(rng.randint(0, 6)):
+        pos = rng.randint(0, len(b))
+        if b and rng.random() < 0.5:
+            del b[pos:pos + rng.randint(1, 3)]
+        else:
+            b[pos:pos] = [rng.choice(alphabet) for _ in range(rng.randint(1, 3))]
+    return a, b
+
+
+@pytest.mark.parametrize("algorithm", ["myers", "patience"])
+def test_opcodes_turn_a_into_b(algorithm):
+    rng = random.Random(7)
+    for _ in range(300):
+        a, b = _random_pair(rng, ["}", "", "x = 1", "y = 2", "return", "{"], 30)
+        assert _apply(a, b, get_opcodes(a, b, algorithm)) == b
+
+
+def test_myers_finds_a_longest_common_subsequence():
+    rng = random.Random(11)
+    for _ in range(300):
+        a, b = _random_pair(rng, list("abcdef"), 25)
+        assert _matched(get_opcodes(a, b, "myers")) == _lcs_length(a, b)
+
+
+def test_patience_keeps_unique_lines_aligned():
+    rng = random.Random(3)
+    for _ in range(100):
+        # Unique markers in the same order on both sides, separated by noisy common lines
+        a, b = [], []
+        for n in range(8):
+            a += [rng.choice(["}", "", "{"]) for _ in range(rng.randint(0, 4))] + [f"def f{n}():"]
+            b += [rng.choice(["}", "", "{"]) for _ in range(rng.randint(0, 4))] + [f"def f{n}():"]
+        opcodes = get_opcodes(a, b, "patience")
+        _apply(a, b, opcodes)
+        equal = {}
+        for tag, i1, i2, j1, _ in opcodes:
+            if tag == "equal":
+                equal.update((i1 + k, j1 + k) for k in range(i2 - i1))
+        for n in range(8):
+            assert equal.get(a.index(f"def f{n}():")) == b.index(f"def f{n}():")
+
+
+def test_patience_prefers_unique_anchors_over_common_braces():
+    a = ["def a():", "    one", "}", "def b():", "    two", "}"]
+    b = ["def b():", "    two", "}", "def a():", "    one", "}"]
+    opcodes = get_opcodes(a, b, "patience")
+    assert _apply(a, b, opcodes) == b
+    # The moved function's unique lines stay paired; the other one is deleted and re-inserted
+    assert opcodes == [("delete", 0, 3, 0, 0), ("equal", 3, 5, 0, 2), ("insert", 5, 5, 2, 5), ("equal", 5, 6, 5, 6)]
+
+
+@pytest.mark.parametrize("algorithm", ["myers", "patience"])
+def test_edge_cases(algorithm):
+    assert get_opcodes([], [], algorithm) == []
+    assert get_opcodes(["a"], [], algorithm) == [("delete", 0, 1, 0, 0)]
+    assert get_opcodes([], ["a", "b"], algorithm) == [("insert", 0, 0, 0, 2)]
+    assert get_opcodes(["a", "b"], ["a", "b"], algorithm) == [("equal", 0, 2, 0, 2)]
+    assert get_opcodes(["a", "b"], ["c", "d"], algorithm) == [("replace", 0, 2, 0, 2)]
+
+
+@pytest.mark.parametrize("algorithm", ["myers", "patience"])
+def test_cost_limit_still_gives_a_valid_script(algorithm):
+    rng = random.Random(5)
+    a = [rng.choice("abcdefgh") for _ in range(400)]
+    b = [rng.choice("abcdefgh") for _ in range(400)]
+    assert _apply(a, b, get_opcodes(a, b, algorithm, max_cost=2)) == b
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        get_opcodes(["a"], ["b"], "histogram")
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from backend.comparator import compare_folders
+from backend.core.dir_digest import DirDigestStore, directory_digest, listing_signature
+from backend.core.hash_cache import HashCache
+from backend.core.compare_policy import EntryInfo
+
+
+def _write(root, rel, data):
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _nodes(node, out=None):
+    out = {} if out is None else out
+    out[node.path.replace(os.sep, "/")] = node
+    for child in node.children or []:
+        _nodes(child, out)
+    return out
+
+
+@pytest.fixture
+def trees(tmp_path):
+    left, right = str(tmp_path / "left"), str(tmp_path / "right")
+    for root in (left, right):
+        _write(root, "lib/a.txt", b"alpha")
+        _write(root, "lib/deep/b.txt", b"bravo")
+        _write(root, "docs/readme.md", b"read me")
+    _write(left, "changed.txt", b"one")
+    _write(right, "changed.txt", b"two")
+    return left, right
+
+
+@pytest.fixture
+def hash_cache(tmp_path):
+    cache = HashCache(str(tmp_path / "hash_cache.db"))
+    yield cache
+    cache.close()
+
+
+def test_equal_subtrees_collapse(trees, hash_cache):
+    left, right = trees
+    for run in range(2):
+        nodes = _nodes(compare_folders(left, right, workers=4, hash_cache=hash_cache, collapse_same=True))
+        assert nodes["lib"].unexplored and nodes["lib"].children is None
+        assert nodes["lib"].hint.left_entries == 2
+        assert nodes["docs"].unexplored
+        assert "lib/a.txt" not in nodes
+        assert nodes["changed.txt"].status == "modified"
+        # The root itself is never collapsed
+        assert nodes[""].children
+
+    plain = _nodes(compare_folders(left, right, workers=4, hash_cache=hash_cache))
+    assert plain["lib/deep/b.txt"].status == "same" and not plain["lib"].unexplored
+
+
+def test_in_place_rewrite_invalidates_the_collapse(trees, hash_cache):
+    left, right = trees
+    compare_folders(left, right, workers=4, hash_cache=hash_cache, collapse_same=True)
+
+    # Same size, new content, written in place: the directory's own mtime does not move
+    deep = os.path.join(left, "lib", "deep")
+    dir_times = os.stat(deep)
+    path = os.path.join(deep, "b.txt")
+    st = os.stat(path)
+    with open(path, "r+b") as f:
+        f.write(b"BRAVO")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    os.utime(deep, ns=(dir_times.st_atime_ns, dir_times.st_mtime_ns))
+
+    for workers in (1, 4):
+        nodes = _nodes(compare_folders(left, right, workers=workers, hash_cache=hash_cache, collapse_same=True))
+        assert not nodes["lib"].unexplored and not nodes["lib/deep"].unexplored
+        assert nodes["lib/deep/b.txt"].status == "modified"
+        assert nodes["lib/a.txt"].status == "same"
+        assert nodes["docs"].unexplored
+
+
+def test_records_are_keyed_on_the_listing_signature(tmp_path, hash_cache):
+    store = DirDigestStore(hash_cache)
+    entries = [("a.txt", EntryInfo(False, 5, 100)), ("sub", EntryInfo(True, 0, 0))]
+    signature = listing_signature(entries)
+    digest = directory_digest({"a.txt": ("f", "aa"), "sub": ("d", "bb")})
+    store.save(str(tmp_path), signature, digest, {"a.txt": "aa"})
+
+    assert store.load(str(tmp_path), signature) == (digest, {"a.txt": "aa"})
+    touched = listing_signature([("a.txt", EntryInfo(False, 5, 101)), ("sub", EntryInfo(True, 0, 0))])
+    assert store.load(str(tmp_path), touched) is None
+
+
+def test_directory_digest_covers_names_kinds_and_content():
+    base = {"a": ("f", "11"), "b": ("d", "22")}
+    assert directory_digest(base) == directory_digest(dict(reversed(list(base.items()))))
+    assert directory_digest(base) != directory_digest({"a": ("f", "11"), "c": ("d", "22")})
+    assert directory_digest(base) != directory_digest({"a": ("f", "11"), "b": ("f", "22")})
+    assert directory_digest(base) != directory_digest({"a": ("f", "12"), "b": ("d", "22")})
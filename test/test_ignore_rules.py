@@ -0,0 +1,101 @@
+import os
+
+from backend.comparator import compare_folders
+from backend.core.ignore_rules import IgnoreMatcher, parse_ignore_text
+
+
+def _matcher(text, base=""):
+    return IgnoreMatcher().extend(parse_ignore_text(text), base)
+
+
+def test_plain_names_match_at_any_depth():
+    m = _matcher("*.log\nbuild\n")
+    assert m.is_excluded("a.log", False)
+    assert m.is_excluded("src/deep/a.log", False)
+    assert m.is_excluded("build", True) and m.is_excluded("src/build", False)
+    assert not m.is_excluded("a.log.txt", False)
+    assert not m.is_excluded("src/building", True)
+
+
+def test_negation_re_includes_and_the_last_match_wins():
+    m = _matcher("*.log\n!keep.log\n")
+    assert m.is_excluded("x.log", False)
+    assert not m.is_excluded("keep.log", False)
+    assert not m.is_excluded("sub/keep.log", False)
+
+    m = _matcher("!keep.log\n*.log\n")
+    assert m.is_excluded("keep.log", False)
+
+    # A deeper ignore file overrides its parent's rules below its directory only
+    m = _matcher("*.tmp\n").extend(["!wanted.tmp"], "sub")
+    assert not m.is_excluded("sub/wanted.tmp", False)
+    assert m.is_excluded("wanted.tmp", False)
+    assert m.is_excluded("sub/other.tmp", False)
+
+
+def test_double_star():
+    m = _matcher("**/cache\nlogs/**\ndocs/**/draft.md\n")
+    assert m.is_excluded("cache", True) and m.is_excluded("a/b/cache", True)
+    assert m.is_excluded("logs/today.txt", False) and m.is_excluded("logs/2024/jan.txt", False)
+    assert not m.is_excluded("logs", True)
+    assert m.is_excluded("docs/draft.md", False)
+    assert m.is_excluded("docs/a/b/draft.md", False)
+    assert not m.is_excluded("other/docs/draft.md", False)
+
+
+def test_directory_only_rules():
+    m = _matcher("out/\n")
+    assert m.is_excluded("out", True) and m.is_excluded("src/out", True)
+    assert not m.is_excluded("out", False)
+    assert not m.is_excluded("src/out", False)
+
+
+def test_slashes_anchor_a_rule_to_its_directory():
+    m = _matcher("/root.txt\nsrc/gen\n")
+    assert m.is_excluded("root.txt", False)
+    assert not m.is_excluded("sub/root.txt", False)
+    assert m.is_excluded("src/gen", True)
+    assert not m.is_excluded("lib/src/gen", True)
+
+    m = IgnoreMatcher().extend(["/x.txt"], "sub")
+    assert m.is_excluded("sub/x.txt", False)
+    assert not m.is_excluded("x.txt", False) and not m.is_excluded("sub/deeper/x.txt", False)
+
+
+def test_wildcards_stay_within_one_segment():
+    m = _matcher("a*z\nfile?.txt\n[abc].md\n[!x]y.md\n\\!bang\n")
+    assert m.is_excluded("abcz", False) and not m.is_excluded("a/z", False)
+    assert m.is_excluded("file1.txt", False) and not m.is_excluded("file10.txt", False)
+    assert m.is_excluded("b.md", False) and not m.is_excluded("d.md", False)
+    assert m.is_excluded("zy.md", False) and not m.is_excluded("xy.md", False)
+    assert m.is_excluded("!bang", False)
+
+
+def test_request_excludes_apply_to_their_entry_type():
+    m = IgnoreMatcher.from_excludes(["*.bak"], ["node_modules"])
+    assert m.is_excluded("x.bak", False) and not m.is_excluded("x.bak", True)
+    assert m.is_excluded("a/node_modules", True) and not m.is_excluded("node_modules", False)
+    assert not IgnoreMatcher()
+
+
+def test_compare_reads_ignore_files_in_subdirectories(tmp_path):
+    for side in ("left", "right"):
+        for rel in ("a.txt", "a.log", "keep.log", "sub/b.txt", "sub/b.gen", "sub/out/c.txt", "out"):
+            path = tmp_path / side / rel
+            os.makedirs(path.parent, exist_ok=True)
+            path.write_text(side)
+    (tmp_path / "right" / ".gitignore").write_text("*.log\n!keep.log\nout/\n")
+    (tmp_path / "right" / "sub" / ".gitignore").write_text("*.gen\n")
+
+    tree = compare_folders(str(tmp_path / "left"), str(tmp_path / "right"), ignore_file_names=[".gitignore"])
+    paths = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        paths.add(node.path.replace(os.sep, "/"))
+        stack += node.children or []
+    assert "a.log" not in paths and "keep.log" in paths
+    assert "sub/b.gen" not in paths and "sub/b.txt" in paths
+    assert "sub/out" not in paths
+    # "out/" only excludes directories; the file named out stays
+    assert "out" in paths
@@ -0,0 +1,51 @@
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.comparator import CompareCancelled, compare_folders
+from backend.main import app
+from backend.models import BatchDeleteRequest
+from backend.routers.files import delete_items
+from backend.routers.jobs import get_job_scheduler
+
+client = TestClient(app)
+
+
+def _make_tree(root, dirs):
+    for i in range(dirs):
+        os.makedirs(os.path.join(root, f"d{i}"))
+        with open(os.path.join(root, f"d{i}", "f.txt"), "w") as f:
+            f.write(str(i))
+
+
+def test_cancelled_compare_stops_walk(tmp_path):
+    _make_tree(str(tmp_path / "L"), 5)
+    _make_tree(str(tmp_path / "R"), 5)
+    cancelled = threading.Event()
+    cancelled.set()
+    with pytest.raises(CompareCancelled):
+        compare_folders(str(tmp_path / "L"), str(tmp_path / "R"), workers=2, cancelled=cancelled)
+
+
+def test_cancelled_batch_delete_leaves_remaining_paths(tmp_path):
+    paths = []
+    for name in ("a", "b"):
+        (tmp_path / name).write_text(name)
+        paths.append(str(tmp_path / name))
+    cancelled = threading.Event()
+    cancelled.set()
+    delete_items(BatchDeleteRequest(paths=paths), cancelled)
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_running_diff_job_cannot_be_cancelled():
+    release = threading.Event()
+    job, _ = get_job_scheduler().submit("diff", lambda job: release.wait(5))
+    try:
+        response = client.delete(f"/api/jobs/{job.id}")
+        assert response.status_code == 409
+        assert not job.cancelled.is_set()
+    finally:
+        release.set()
@@ -0,0 +1,138 @@
+import gzip
+import json
+import os
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.comparator import compare_folders, export_manifest
+from backend.core.file_equality import DIGEST_ALGO, file_digest
+from backend.core.manifest import MANIFEST_FORMAT, MANIFEST_VERSION, Manifest
+from backend.main import app
+
+client = TestClient(app)
+
+
+def _write(root, rel, data):
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _rows(node, out=None):
+    out = {} if out is None else out
+    out[node.path.replace(os.sep, "/")] = (node.type, node.status)
+    for child in node.children or []:
+        _rows(child, out)
+    return out
+
+
+@pytest.fixture
+def trees(tmp_path):
+    left, right = str(tmp_path / "left"), str(tmp_path / "right")
+    for root in (left, right):
+        _write(root, "same.txt", b"same")
+        _write(root, "sub/deep/same.bin", b"\0\1\2")
+    _write(left, "same_size.txt", b"aaaa")
+    _write(right, "same_size.txt", b"bbbb")
+    _write(left, "only_left/x.txt", b"x")
+    _write(right, "only_right.txt", b"y")
+    _write(left, "naïve €.txt", b"unicode")
+    _write(left, "debug.log", b"excluded")
+    os.makedirs(os.path.join(left, "empty_dir"))
+    return left, right
+
+
+def test_save_and_load_round_trip(trees, tmp_path):
+    left, _ = trees
+    output = str(tmp_path / "left.jfm")
+    summary = export_manifest(left, output, exclude_files=["*.log"], workers=4)
+    assert summary["entries"] == 9
+    assert summary["algo"] == DIGEST_ALGO and summary["bytes"] == os.path.getsize(output)
+
+    manifest = Manifest.load(output)
+    assert manifest.root == os.path.abspath(left) and manifest.algo == DIGEST_ALGO
+    loaded = {rel.replace(os.sep, "/"): (info, digest) for rel, info, digest in manifest.iter_entries()}
+    assert "debug.log" not in loaded
+    assert loaded["empty_dir"][0].is_dir and loaded["empty_dir"][1] == ""
+    for rel in ("same.txt", "sub/deep/same.bin", "naïve €.txt"):
+        info, digest = loaded[rel]
+        st = os.stat(os.path.join(left, *rel.split("/")))
+        assert (info.is_dir, info.size, info.mtime_ns) == (False, st.st_size, st.st_mtime_ns)
+        assert digest == file_digest(os.path.join(left, *rel.split("/")), DIGEST_ALGO)
+
+    # Saving what was loaded gives the same entries back
+    again = str(tmp_path / "again.jfm")
+    manifest.save(again)
+    assert list(Manifest.load(again).iter_entries()) == list(manifest.iter_entries())
+
+
+def test_manifest_stands_in_for_its_tree(trees, tmp_path):
+    left, right = trees
+    output = str(tmp_path / "left.jfm")
+    export_manifest(left, output)
+    modes = ("quick", "sampled", "full")
+    expected = {mode: _rows(compare_folders(left, right, workers=4, compare_mode=mode)) for mode in modes}
+
+    # The manifest side is never read from disk
+    shutil.rmtree(left)
+    for mode in modes:
+        rows = _rows(compare_folders(Manifest.load(output), right, workers=4, compare_mode=mode))
+        assert rows == expected[mode]
+    assert rows["same_size.txt"] == ("file", "modified")
+    assert rows["sub/deep/same.bin"] == ("file", "same")
+
+
+def _write_manifest(path, header, rows=()):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+def test_load_rejects_other_digest_algorithms_and_formats(tmp_path):
+    path = str(tmp_path / "m.jfm")
+    header = {"format": MANIFEST_FORMAT, "version": MANIFEST_VERSION, "root": "/r", "algo": "md5", "symlinks": "follow", "created": 0, "entries": 1}
+    _write_manifest(path, header, [["a.txt", 0, 1, 0, "0cc175b9c0f1b6a831c399e269772661", None]])
+    with pytest.raises(ValueError, match="md5"):
+        Manifest.load(path)
+
+    _write_manifest(path, {**header, "algo": DIGEST_ALGO, "version": MANIFEST_VERSION + 1})
+    with pytest.raises(ValueError, match="version"):
+        Manifest.load(path)
+
+    _write_manifest(path, {**header, "algo": DIGEST_ALGO}, [["a.txt", 0]])
+    with pytest.raises(ValueError):
+        Manifest.load(path)
+
+    with open(path, "wb") as f:
+        f.write(b"plain text")
+    with pytest.raises(ValueError):
+        Manifest.load(path)
+
+
+def test_manifest_endpoints(trees, tmp_path):
+    left, right = trees
+    output = str(tmp_path / "right.jfm")
+    response = client.post("/api/manifest", json={"path": right, "output_path": output})
+    assert response.status_code == 200, response.text
+    assert response.json()["entries"] == 6
+
+    body = {"left_path": left, "right_path": output, "exclude_files": [], "exclude_folders": [], "right_manifest": True}
+    response = client.post("/api/compare", json=body)
+    assert response.status_code == 200, response.text
+    assert _rows(compare_folders(left, right)) == {k: v for k, v in _rows_json(response.json()).items()}
+
+    header = {"format": MANIFEST_FORMAT, "version": MANIFEST_VERSION, "root": right, "algo": "sha1", "entries": 0}
+    _write_manifest(output, header)
+    assert client.post("/api/compare", json=body).status_code == 400
+
+
+def _rows_json(node, out=None):
+    out = {} if out is None else out
+    out[node["path"].replace(os.sep, "/")] = (node["type"], node["status"])
+    for child in node.get("children") or []:
+        _rows_json(child, out)
+    return out
@@ -0,0 +1,96 @@
+import os
+
+from backend.comparator import compare_folders
+from backend.core.move_detection import find_moves
+
+
+def _write(root, rel, data):
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _nodes(node, out=None):
+    out = {} if out is None else out
+    out[node.path.replace(os.sep, "/")] = node
+    for child in node.children or []:
+        _nodes(child, out)
+    return out
+
+
+def test_pairs_by_content_and_names_the_kind_of_move(tmp_path):
+    left, right = str(tmp_path / "left"), str(tmp_path / "right")
+    _write(left, "a/report.txt", b"report")
+    _write(right, "b/report.txt", b"report")
+    _write(left, "a/old_name.txt", b"renamed content")
+    _write(right, "a/new_name.txt", b"renamed content")
+    _write(left, "a/deleted.txt", b"no match")
+    _write(right, "a/created.txt", b"no match either")
+
+    pairs = find_moves(left, right, ["a/report.txt", "a/old_name.txt", "a/deleted.txt"], ["b/report.txt", "a/new_name.txt", "a/created.txt"])
+    assert pairs == [("a/old_name.txt", "a/new_name.txt", "renamed"), ("a/report.txt", "b/report.txt", "moved")]
+
+
+def test_equal_candidates_prefer_the_same_name_then_the_same_directory(tmp_path):
+    left, right = str(tmp_path / "left"), str(tmp_path / "right")
+    for rel in ("x/one.txt", "x/two.txt", "y/three.txt"):
+        _write(left, rel, b"identical")
+    for rel in ("z/two.txt", "x/other.txt", "w/any.txt"):
+        _write(right, rel, b"identical")
+
+    pairs = find_moves(left, right, ["x/one.txt", "x/two.txt", "y/three.txt"], ["z/two.txt", "x/other.txt", "w/any.txt"])
+    assert sorted(pairs) == [
+        ("x/one.txt", "x/other.txt", "renamed"),
+        ("x/two.txt", "z/two.txt", "moved"),
+        ("y/three.txt", "w/any.txt", "moved"),
+    ]
+
+
+def test_each_file_pairs_once_and_empty_files_never(tmp_path):
+    left, right = str(tmp_path / "left"), str(tmp_path / "right")
+    _write(left, "a.txt", b"dup")
+    _write(left, "b.txt", b"dup")
+    _write(right, "c.txt", b"dup")
+    _write(left, "empty1", b"")
+    _write(right, "empty2", b"")
+
+    pairs = find_moves(left, right, ["a.txt", "b.txt", "empty1"], ["c.txt", "empty2"])
+    assert pairs == [("a.txt", "c.txt", "renamed")]
+    assert find_moves(left, right, ["a.txt"], []) == []
+
+
+def test_only_hashes_sizes_present_on_both_sides(tmp_path):
+    left, right = str(tmp_path / "left"), str(tmp_path / "right")
+    _write(left, "small.txt", b"12")
+    _write(left, "big.txt", b"1234")
+    _write(right, "big2.txt", b"1234")
+    hashed = []
+
+    def hash_file(path):
+        hashed.append(os.path.basename(path))
+        with open(path, "rb") as f:
+            return f.read().hex()
+
+    assert find_moves(left, right, ["small.txt", "big.txt"], ["big2.txt"], hash_file=hash_file) == [("big.txt", "big2.txt", "renamed")]
+    assert sorted(hashed) == ["big.txt", "big2.txt"]
+
+
+def test_compare_marks_both_ends_of_a_move(tmp_path):
+    left, right = str(tmp_path / "left"), str(tmp_path / "right")
+    _write(left, "src/util.py", b"def helper(): pass\n")
+    _write(right, "lib/util.py", b"def helper(): pass\n")
+    _write(left, "notes.txt", b"n")
+    _write(right, "notes.md", b"n")
+    _write(left, "gone.txt", b"gone")
+
+    for workers in (1, 4):
+        nodes = _nodes(compare_folders(left, right, workers=workers, detect_moves=True))
+        source, target = nodes["src/util.py"], nodes["lib/util.py"]
+        assert (source.status, target.status) == ("moved", "moved")
+        assert (source.moved_to, target.moved_from) == ("lib/util.py", "src/util.py")
+        assert (nodes["notes.txt"].status, nodes["notes.md"].status) == ("renamed", "renamed")
+        assert nodes["gone.txt"].status == "removed" and nodes["gone.txt"].moved_to is None
+
+    plain = _nodes(compare_folders(left, right))
+    assert (plain["src/util.py"].status, plain["lib/util.py"].status) == ("removed", "added")
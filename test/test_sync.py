@@ -0,0 +1,87 @@
+import os
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+
+client = TestClient(app)
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _tree(root):
+    found = set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel = os.path.relpath(dirpath, root)
+        found.update(os.path.join(rel, name) for name in dirnames + filenames)
+    return found
+
+
+def test_dry_run_sync_leaves_destination_unchanged(tmp_path):
+    source, dest_root = tmp_path / "src", tmp_path / "dst"
+    _write(str(source / "a.txt"), "a")
+    _write(str(source / "sub" / "b.txt"), "b")
+    os.makedirs(dest_root)
+    before = _tree(str(tmp_path))
+
+    response = client.post("/api/copy", json={
+        "source_path": str(source), "dest_path": str(dest_root / "missing" / "target"),
+        "is_dir": True, "mode": "sync", "dry_run": True,
+    })
+
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "plan"
+    assert _tree(str(tmp_path)) == before
+
+
+def test_sync_creates_destination(tmp_path):
+    source, dest = tmp_path / "src", tmp_path / "dst" / "missing" / "target"
+    _write(str(source / "sub" / "b.txt"), "b")
+
+    response = client.post("/api/copy", json={"source_path": str(source), "dest_path": str(dest), "is_dir": True, "mode": "sync"})
+
+    assert response.status_code == 200, response.text
+    assert os.path.isfile(dest / "sub" / "b.txt")
+
+
+def test_sync_copies_same_size_edits_with_close_mtimes(tmp_path):
+    source, dest = tmp_path / "src", tmp_path / "dst"
+    _write(str(source / "a.txt"), "new!")
+    _write(str(dest / "a.txt"), "old!")
+    mtime = os.stat(source / "a.txt").st_mtime
+    os.utime(dest / "a.txt", (mtime - 1, mtime - 1))
+
+    response = client.post("/api/copy", json={"source_path": str(source), "dest_path": str(dest), "is_dir": True, "mode": "sync"})
+
+    assert response.status_code == 200, response.text
+    assert (dest / "a.txt").read_text() == "new!"
+
+
+def test_sync_leaves_neighbouring_temp_names_alone(tmp_path):
+    source, dest = tmp_path / "src", tmp_path / "dst"
+    _write(str(source / "a.txt"), "new")
+    _write(str(dest / "a.txt"), "older")
+    _write(str(dest / "a.txt.sync-tmp"), "the user's own file")
+
+    response = client.post("/api/copy", json={"source_path": str(source), "dest_path": str(dest), "is_dir": True, "mode": "sync"})
+
+    assert response.status_code == 200, response.text
+    assert (dest / "a.txt").read_text() == "new"
+    assert (dest / "a.txt.sync-tmp").read_text() == "the user's own file"
+    assert sorted(os.listdir(dest)) == ["a.txt", "a.txt.sync-tmp"]
+
+
+def test_batch_copy_rejects_sync_items(tmp_path):
+    source, dest = tmp_path / "src", tmp_path / "dst"
+    _write(str(source / "a.txt"), "a")
+    _write(str(dest / "keep.txt"), "keep")
+
+    for options in ({"mode": "sync"}, {"delete_extraneous": True}, {"dry_run": True}):
+        item = {"source_path": str(source), "dest_path": str(dest), "is_dir": True, **options}
+        response = client.post("/api/batch-copy", json={"items": [item]})
+        assert response.status_code == 400, response.text
+    assert sorted(os.listdir(dest)) == ["keep.txt"]
@@ -0,0 +1,33 @@
+import os
+
+from backend.core.watch_session import WatchSession
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _status(node, rel_path):
+    for part in rel_path.split(os.sep):
+        node = next(c for c in node.children if c.name == part)
+    return node.status
+
+
+def test_nested_change_in_same_batch_as_parent_change(tmp_path):
+    left, right = str(tmp_path / "L"), str(tmp_path / "R")
+    _write(os.path.join(left, "a", "x.txt"), "same")
+    _write(os.path.join(right, "a", "x.txt"), "different")
+    session = WatchSession(left, right, [], [], "full", polling=True)
+    try:
+        assert _status(session.tree, os.path.join("a", "x.txt")) == "modified"
+        _write(os.path.join(right, "a", "x.txt"), "same")
+        _write(os.path.join(right, "newfile"), "new")
+        # Both directories reported in one debounce window
+        session._on_change({"", "a"})
+
+        assert _status(session.tree, os.path.join("a", "x.txt")) == "same"
+        assert _status(session.tree, "newfile") == "added"
+    finally:
+        session.close()
@@ -0,0 +1,48 @@
+import os
+import threading
+import types
+
+import pytest
+
+from backend.core import watcher as watcher_module
+from backend.core.watcher import MAX_DEBOUNCE_SECONDS, InotifyWatcher
+
+
+class _AlwaysReadable:
+    """select.poll() stand-in for an inotify queue that never runs dry (e.g. a log being written)."""
+
+    def register(self, fd, events):
+        pass
+
+    def poll(self, timeout_ms):
+        return [(0, 1)]
+
+
+def test_continuous_events_still_report_changes(tmp_path, monkeypatch):
+    batches = []
+    reported = threading.Event()
+
+    def on_change(rel_dirs):
+        batches.append(rel_dirs)
+        reported.set()
+
+    try:
+        watcher = InotifyWatcher([str(tmp_path)], on_change)
+    except (OSError, AttributeError):
+        pytest.skip("inotify not available")
+    watcher.watch("")
+    wd = next(iter(watcher._wd_map))
+    name = b"growing.log\0\0\0\0\0"
+    event = watcher._EVENT_HEADER.pack(wd, InotifyWatcher.IN_MODIFY, 0, len(name)) + name
+    fake_os = types.SimpleNamespace(**{k: getattr(os, k) for k in dir(os) if not k.startswith("__")})
+    fake_os.read = lambda fd, size: event
+    monkeypatch.setattr(watcher_module, "os", fake_os)
+    monkeypatch.setattr(watcher_module.select, "poll", _AlwaysReadable)
+
+    watcher.start()
+    try:
+        # Events never pause, so only the maximum delay lets a batch out
+        assert reported.wait(MAX_DEBOUNCE_SECONDS + 2)
+        assert batches[0] == {""}
+    finally:
+        watcher.stop()